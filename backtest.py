@@ -0,0 +1,134 @@
+import argparse
+import warnings
+from concurrent.futures import as_completed
+
+import numpy as np
+
+from logistic_fit import FITTED, SCENARIOS, project_series
+from population_data import historical_population_data
+from process_pool import ProcessPool
+
+# Every model the projection pages offer: the free fit and the fixed-rate scenarios
+MODELS = (FITTED, *SCENARIOS)
+
+# Fewest observations up to a cutoff for a fit; the free logistic model has three parameters
+MIN_TRAINING_POINTS = 3
+
+
+def default_cutoffs(population_data, countries):
+    """
+    Every observation year that leaves at least MIN_TRAINING_POINTS observations up to it and
+    one after it for some country.
+    """
+    cutoffs = set()
+    for country in countries:
+        years = population_data[country]["years"]
+        cutoffs.update(int(year) for year in years[MIN_TRAINING_POINTS - 1:-1])
+    return np.array(sorted(cutoffs))
+
+
+def country_errors(years, population, cutoffs, model, max_horizon):
+    """
+    Fit one country on its observations up to every cutoff (all cutoffs in one batched fit)
+    and score the forecasts of the following observations.
+    :return: array (cutoffs, max_horizon) of percentage errors (forecast - actual) / actual of the
+             1st, 2nd, ... held-out observation; NaN where a cutoff has too little data on either side
+    """
+    years = np.asarray(years)
+    population = np.asarray(population, dtype=float)
+    errors = np.full((len(cutoffs), max_horizon), np.nan)
+    n_train = np.searchsorted(years, cutoffs, side="right")
+    usable = np.flatnonzero((n_train >= MIN_TRAINING_POINTS) & (n_train < len(years)))
+    if not len(usable):
+        return errors
+
+    series = [(years[:n] - years[0], population[:n]) for n in n_train[usable]]
+    held_out = n_train[usable, None] + np.arange(max_horizon)
+    valid = held_out < len(years)
+    held_out = np.minimum(held_out, len(years) - 1)
+    forecast = project_series(series, model, years[held_out] - years[0])
+    actual = population[held_out]
+    errors[usable] = np.where(valid, 100 * (forecast - actual) / actual, np.nan)
+    return errors
+
+
+def _job(args):
+    # Process-pool entry point; returns the cube position with the country's errors
+    country_index, model_index, years, population, cutoffs, model, max_horizon = args
+    return country_index, model_index, country_errors(years, population, cutoffs, model, max_horizon)
+
+
+def run_backtest(population_data=historical_population_data, countries=None, models=MODELS, cutoffs=None,
+                 max_horizon=None, max_workers=None, progress=None):
+    """
+    Rolling-origin backtest of every (country, cutoff, model) combination on a process pool.
+    One job is one (country, model) pair; its cutoffs are fitted together in a single batch.
+    :param cutoffs: last training year of every origin (default: default_cutoffs)
+    :param max_horizon: held-out observations scored per origin (default: as many as any country has)
+    :param progress: optional callable(done_jobs, total_jobs)
+    :return: (countries, cutoffs, models, errors array of shape (countries, cutoffs, models, horizons))
+    """
+    countries = list(population_data) if countries is None else list(countries)
+    models = list(models)
+    cutoffs = default_cutoffs(population_data, countries) if cutoffs is None else np.asarray(cutoffs)
+    if max_horizon is None:
+        max_horizon = max(len(population_data[c]["years"]) for c in countries) - MIN_TRAINING_POINTS
+    max_horizon = max(max_horizon, 1)
+
+    errors = np.full((len(countries), len(cutoffs), len(models), max_horizon), np.nan)
+    jobs = [
+        (i, m, population_data[c]["years"], population_data[c]["population"], cutoffs, model, max_horizon)
+        for i, c in enumerate(countries)
+        for m, model in enumerate(models)
+    ]
+    if progress:
+        progress(0, len(jobs))
+
+    with ProcessPool(max_workers=max_workers) as pool:
+        futures = [pool.submit(_job, job) for job in jobs]
+        for n, future in enumerate(as_completed(futures), start=1):
+            i, m, country_cube = future.result()
+            errors[i, :, m] = country_cube
+            if progress:
+                progress(n, len(jobs))
+
+    return countries, cutoffs, models, errors
+
+
+def mape(errors, axis=(1, 3)):
+    """
+    Mean absolute percentage error over the given axes of an error cube, ignoring NaN.
+    The default averages over cutoffs and horizons, giving one value per (country, model).
+    """
+    with warnings.catch_warnings():
+        # Countries too short for any cutoff have no scores and stay NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanmean(np.abs(errors), axis=axis)
+
+
+def mape_table(countries, models, errors):
+    """
+    MAPE per country (rows) and model (columns) as a DataFrame.
+    """
+    import pandas as pd
+
+    return pd.DataFrame(mape(errors), index=pd.Index(countries, name="country"), columns=models)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of the logistic projections for every country.")
+    parser.add_argument("--models", nargs="*", choices=list(MODELS), default=list(MODELS), help="models to score")
+    parser.add_argument("--max-horizon", type=int, default=None, help="held-out observations scored per cutoff")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    parser.add_argument("--output", default=None, help="optional .npz file for the full error cube")
+    args = parser.parse_args()
+
+    def report(done, total):
+        print(f"\r{done}/{total} jobs", end="", flush=True)
+
+    countries, cutoffs, models, errors = run_backtest(models=args.models, max_horizon=args.max_horizon,
+                                                      max_workers=args.workers, progress=report)
+    print()
+    if args.output:
+        np.savez(args.output, countries=np.array(countries), cutoffs=cutoffs, models=np.array(models), errors=errors)
+    print(mape_table(countries, models, errors).round(2).to_string())
@@ -0,0 +1,180 @@
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from logistic_fit import FITTED, SCENARIOS, project_series
+from population_engine import (
+    COUNTRY_CRUDE_BIRTH_RATE, GLOBAL_PERIODS, BirthsIndex, fractional_year, people_ever_lived_series, region_births,
+    region_years,
+)
+from process_pool import ProcessPool
+
+# Headless batch runs of the engines behind the Streamlit pages: nothing here imports streamlit,
+# pandas or matplotlib, so the CLI starts in a fraction of a second and runs under cron.
+
+SCENARIO_NAMES = (FITTED, *SCENARIOS)
+
+# Projection years written by default (inclusive)
+DEFAULT_START = 2023
+DEFAULT_END = 2100
+
+# Most countries per worker job when several processes are used
+CHUNK_COUNTRIES = 64
+
+SECTIONS = ("ever_lived", "births", "projections")
+FORMATS = ("json", "jsonl")
+
+
+def ever_lived_totals(moment=None):
+    """
+    People ever lived: the global period model's total and the live counter at a moment.
+    """
+    total, _ = people_ever_lived_series(GLOBAL_PERIODS, resolution="yearly")
+    as_of = fractional_year(moment)
+    return {
+        "global_total_billions": float(total),
+        "live_counter": {"as_of_year": as_of, "total_born": float(BirthsIndex().births_as_of(as_of))},
+    }
+
+
+def country_results(countries, sections=SECTIONS, scenarios=SCENARIO_NAMES, years=None,
+                    crude_birth_rate=COUNTRY_CRUDE_BIRTH_RATE):
+    """
+    Births totals and projections of a list of countries; countries missing from a dataset
+    are left out of that section.
+    :return: {country: {"births": {...}, "projections": {scenario: [values]}}}
+    """
+    from population_data import historical_population_data, store
+
+    results = {country: {} for country in countries}
+    if "births" in sections:
+        table = store.period_table(crude_birth_rate)
+        table = table[np.isin(table["region"], countries)]
+        names, totals = region_births(table)
+        _, first_years, last_years = region_years(table)
+        for name, total, first_year, last_year in zip(names, totals, first_years, last_years):
+            results[str(name)]["births"] = {
+                "first_year": int(first_year),
+                "last_year": int(last_year),
+                "total_births_millions": float(total),
+            }
+
+    if "projections" in sections:
+        projected = [c for c in countries if c in historical_population_data]
+        if projected:
+            series = [
+                (historical_population_data[c]["years"] - historical_population_data[c]["years"][0],
+                 np.asarray(historical_population_data[c]["population"], dtype=float))
+                for c in projected
+            ]
+            origin = np.array([historical_population_data[c]["years"][0] for c in projected])[:, None]
+            for scenario in scenarios:
+                values = project_series(series, scenario, years[None, :] - origin)
+                for country, row in zip(projected, values):
+                    results[country].setdefault("projections", {})[scenario] = row.tolist()
+    return results
+
+
+def _job(args):
+    # Process-pool entry point
+    return country_results(*args)
+
+
+def all_countries():
+    from population_data import store
+
+    return list(dict.fromkeys([*store.countries("series"), *store.countries("periods")]))
+
+
+def run_batch(countries=None, sections=SECTIONS, scenarios=SCENARIO_NAMES, start=DEFAULT_START, end=DEFAULT_END,
+              crude_birth_rate=COUNTRY_CRUDE_BIRTH_RATE, max_workers=None, moment=None):
+    """
+    Run the selected sections for the selected countries (default: every country in either dataset).
+    With several countries and max_workers > 1, chunks of countries run on a process pool.
+    :return: JSON-serializable dict
+    """
+    countries = all_countries() if not countries else list(countries)
+    unknown = sorted(set(countries) - set(all_countries()))
+    if unknown:
+        raise ValueError(f"Unknown countries: {', '.join(unknown)}")
+    years = np.arange(start, end + 1)
+
+    output = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "crude_birth_rate": crude_birth_rate,
+        "projection_years": years.tolist() if "projections" in sections else [],
+    }
+    if "ever_lived" in sections:
+        output["ever_lived"] = ever_lived_totals(moment)
+
+    workers = max_workers or os.cpu_count() or 1
+    chunk = max(1, min(CHUNK_COUNTRIES, -(-len(countries) // workers)))
+    jobs = [
+        (countries[i:i + chunk], sections, scenarios, years, crude_birth_rate)
+        for i in range(0, len(countries), chunk)
+    ]
+    results = {}
+    if len(jobs) > 1:
+        with ProcessPool(max_workers=workers) as pool:
+            for chunk in pool.map(_job, jobs):
+                results.update(chunk)
+    else:
+        for job in jobs:
+            results.update(_job(job))
+    output["countries"] = results
+    return output
+
+
+def write_output(output, target, fmt="json"):
+    """
+    Write a run_batch result as one JSON document, or as JSON Lines with one record per
+    country after a header record without the countries.
+    :param target: path, or "-" for stdout
+    """
+    stream = sys.stdout if target == "-" else open(target, "w")
+    try:
+        if fmt == "jsonl":
+            header = {key: value for key, value in output.items() if key != "countries"}
+            stream.write(json.dumps({"record": "header", **header}) + "\n")
+            for country, result in output["countries"].items():
+                stream.write(json.dumps({"record": "country", "country": country, **result}) + "\n")
+        else:
+            json.dump(output, stream)
+            stream.write("\n")
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the ever-lived, births and projection engines without the UI.")
+    parser.add_argument("countries", nargs="*", help="countries to run (default: all)")
+    parser.add_argument("--sections", nargs="+", choices=SECTIONS, default=list(SECTIONS), help="what to compute")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIO_NAMES, default=list(SCENARIO_NAMES))
+    parser.add_argument("--start", type=int, default=DEFAULT_START, help="first projection year")
+    parser.add_argument("--end", type=int, default=DEFAULT_END, help="last projection year")
+    parser.add_argument("--crude-birth-rate", type=float, default=COUNTRY_CRUDE_BIRTH_RATE,
+                        help="births per person per year assumed by the country counters")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="process pool size (1: no pool)")
+    parser.add_argument("--format", choices=FORMATS, default="json")
+    parser.add_argument("--output", default="-", help="output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    try:
+        output = run_batch(args.countries, args.sections, args.scenarios, args.start, args.end,
+                           args.crude_birth_rate, args.workers)
+    except ValueError as error:
+        parser.error(str(error))
+    write_output(output, args.output, args.format)
+    print(f"{len(output['countries'])} countries in {time.perf_counter() - started:.2f} s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,302 @@
+import argparse
+import importlib
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import matplotlib
+
+# Headless rendering; must be selected before pyplot is imported anywhere
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import streamlit.config
+import streamlit.logger
+
+import instrumentation
+
+# Silence the bare-mode warning every st call logs without a runtime. Streamlit sets the level of
+# each of its loggers when it parses its config, so the config is parsed before lowering them.
+streamlit.config.get_config_options()
+streamlit.logger.set_log_level("error")
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+# Allowed slowdown relative to the baseline before a benchmark counts as a regression
+DEFAULT_THRESHOLD = 0.25
+
+# Frames rendered per animated run; real playback skips frames once the frame budget is spent,
+# so rendering every scheduled frame back to back would not reflect page cost
+MAX_FRAMES = 25
+
+BENCHMARKS = {}
+
+PAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Cold first paint of every page in a fresh interpreter: a wall-time budget in seconds and the
+# modules the page must not import until the user asks for the feature that needs them
+STARTUP_BUDGET = {
+    "app.py": {"seconds": 1.5, "forbidden": ["scipy", "matplotlib.pyplot"]},
+    "global_population_evolution.py": {"seconds": 1.5, "forbidden": ["scipy", "matplotlib.pyplot"]},
+    "live_people_counter.py": {"seconds": 1.5, "forbidden": ["scipy", "matplotlib.pyplot"]},
+    "country_population_counter.py": {"seconds": 3.0, "forbidden": ["scipy"]},
+    "future_population_projection.py": {"seconds": 2.0, "forbidden": ["scipy"]},
+    "refined_population_projection.py": {"seconds": 2.5, "forbidden": ["cohort_model", "monte_carlo"]},
+}
+
+# Heavy modules reported for every page, loaded or not
+WATCHED_MODULES = ("scipy", "matplotlib.pyplot", "pandas", "cohort_model", "monte_carlo")
+
+# Runs in a child interpreter so nothing this script imports counts against the page
+_STARTUP_PROBE = """
+import json, sys, time
+import streamlit.config, streamlit.logger
+from streamlit.testing.v1 import AppTest
+streamlit.config.get_config_options()
+streamlit.logger.set_log_level("error")
+started = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=120).run()
+print(json.dumps({
+    "seconds": time.perf_counter() - started,
+    "loaded": [m for m in sys.argv[2:] if m in sys.modules],
+    "exception": at.exception[0].message if at.exception else None,
+}))
+"""
+
+
+def benchmark(name):
+    # Register a benchmark; the function returns a zero-argument callable to be timed
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def import_page(module_name):
+    """
+    Import a Streamlit page script headlessly. Without a Streamlit runtime, widgets return
+    their defaults and buttons are not pressed, so only module-level setup runs.
+    """
+    return importlib.import_module(module_name)
+
+
+def _play_without_sleep(playback):
+    # Step through about MAX_FRAMES evenly spaced frames (always including the last) on a fake
+    # clock, with no pacing, then emit the playback's log line
+    now = 0.0
+    playback.clock = lambda: now
+    interval = max(len(playback.frames) / MAX_FRAMES, 1) / playback.fps
+    while not playback.step():
+        now += interval
+    return playback.close()
+
+
+@benchmark("global_population_evolution.people_ever_lived")
+def bench_people_ever_lived():
+    from population_engine import GLOBAL_PERIODS, people_ever_lived_series
+    return lambda: people_ever_lived_series(GLOBAL_PERIODS, resolution="yearly")
+
+
+@benchmark("live_people_counter.people_ever_lived")
+def bench_live_counter():
+    page = import_page("live_people_counter")
+
+    def run():
+        _play_without_sleep(page.people_ever_lived())
+    return run
+
+
+@benchmark("country_population_counter.estimate_population_ever_lived")
+def bench_country_counter():
+    page = import_page("country_population_counter")
+
+    def run():
+        for country in page.countries_data:
+            estimate = page.estimate_population_ever_lived(page.countries_data[country])
+            _play_without_sleep(page.births_playback(*estimate[:3]))
+            page.show_estimate(country, *estimate)
+    return run
+
+
+@benchmark("future_population_projection.fit")
+def bench_future_fit():
+    from logistic_fit import fit_logistic
+    from population_data import historical_population_data
+
+    def run():
+        for country in historical_population_data:
+            data = historical_population_data[country]
+            fit_logistic(data["years"], data["population"])
+    return run
+
+
+def _refined_run(page, use_artifact):
+    # Every country under every scenario, through curve_fit or through the projection artifact
+    from logistic_fit import SCENARIOS
+
+    def run():
+        for country in page.historical_population_data:
+            data = page.historical_population_data[country]
+            row = page.artifact.row(country, data["years"], data["population"]) if use_artifact else None
+            for scenario, preset in SCENARIOS.items():
+                page.project_and_render(country, scenario, data["years"], data["population"], preset["r"],
+                                        preset["K_factor"] * max(data["population"]), row)
+    return run
+
+
+@benchmark("refined_population_projection.fit")
+def bench_refined_fit():
+    # Always the curve_fit path, whether or not data/projections.bin exists
+    return _refined_run(import_page("refined_population_projection"), use_artifact=False)
+
+
+@benchmark("refined_population_projection.artifact")
+def bench_refined_artifact():
+    page = import_page("refined_population_projection")
+    if page.artifact is None:
+        raise RuntimeError("no current projection artifact; run projection_artifact.py first")
+    return _refined_run(page, use_artifact=True)
+
+
+@benchmark("matplotlib.frame_render")
+def bench_frame_render():
+    from projection_cache import figure_to_png
+    years = np.arange(-190000, 2025)
+    values = np.cumsum(np.ones(len(years)))
+
+    def run():
+        fig, ax = plt.subplots()
+        ax.plot(years, values, color='blue')
+        ax.grid(True)
+        figure_to_png(fig)
+    return run
+
+
+def measure(run, repeat):
+    """
+    Time run() repeat times and report the best wall time, peak traced memory and
+    the number of matplotlib figures one run creates.
+    """
+    # The traced run doubles as warm-up (imports, caches, first-call allocations)
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    timings = []
+    for _ in range(repeat):
+        # Figures are counted by the instrumentation's figure hook, as on the pages
+        perf = instrumentation.Instrumentation("benchmark")
+        instrumentation.install_figure_hook()
+        with instrumentation.active(perf):
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+    return {
+        "seconds": min(timings),
+        "peak_memory_mb": peak / 1e6,
+        "figures_created": perf.figures,
+    }
+
+
+def compare(results, baseline, threshold):
+    # "name (metric)" for every wall time or peak memory above baseline * (1 + threshold)
+    regressions = []
+    for name, result in results.items():
+        for metric in ("seconds", "peak_memory_mb"):
+            reference = baseline.get(name, {}).get(metric)
+            if reference and result[metric] > reference * (1 + threshold):
+                regressions.append(f"{name} ({metric})")
+    return regressions
+
+
+def measure_startup(page):
+    """
+    First paint of a page script in a fresh interpreter.
+    :return: dict with wall seconds, the watched modules loaded and the exception raised, if any
+    """
+    process = subprocess.run(
+        [sys.executable, "-c", _STARTUP_PROBE, os.path.join(PAGE_DIR, page), *WATCHED_MODULES],
+        capture_output=True, text=True, cwd=PAGE_DIR, check=True,
+    )
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def check_startup(results, budget=STARTUP_BUDGET):
+    # "page (reason)" for every page over its time budget, importing a forbidden module or failing
+    violations = []
+    for page, result in results.items():
+        limits = budget.get(page, {})
+        if result["exception"]:
+            violations.append(f"{page} (raised {result['exception']!r})")
+        if result["seconds"] > limits.get("seconds", float("inf")):
+            violations.append(f"{page} ({result['seconds']:.2f} s > {limits['seconds']:.2f} s)")
+        violations += [f"{page} (imported {m})" for m in limits.get("forbidden", []) if m in result["loaded"]]
+    return violations
+
+
+def main_startup(args):
+    pages = args.only or list(STARTUP_BUDGET)
+    results = {page: measure_startup(page) for page in pages}
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for page, result in results.items():
+            limit = STARTUP_BUDGET.get(page, {}).get("seconds")
+            budget = f" (budget {limit:.2f} s)" if limit else ""
+            print(f"{page:40s} {result['seconds'] * 1000:10.0f} ms{budget}  loaded: {', '.join(result['loaded']) or '-'}")
+    violations = check_startup(results)
+    if violations:
+        print(f"Startup budget exceeded: {', '.join(violations)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the simulation, fitting and rendering hot paths.")
+    parser.add_argument("--only", nargs="*", help="benchmark names (or page scripts with --startup) to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed repetitions per benchmark (best is kept)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed relative slowdown")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--startup", action="store_true", help="check every page's cold first paint against STARTUP_BUDGET")
+    args = parser.parse_args(argv)
+
+    if args.startup:
+        return main_startup(args)
+
+    names = args.only or list(BENCHMARKS)
+    results = {name: measure(BENCHMARKS[name](), args.repeat) for name in names}
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, result in results.items():
+            reference = baseline.get(name, {}).get("seconds")
+            change = f" ({result['seconds'] / reference - 1:+.0%} vs baseline)" if reference else ""
+            print(f"{name:60s} {result['seconds'] * 1000:10.2f} ms  {result['peak_memory_mb']:8.2f} MB  "
+                  f"{result['figures_created']:3d} figures{change}")
+
+    if args.save_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2)
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"Regressions beyond {args.threshold:.0%}: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
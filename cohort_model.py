@@ -0,0 +1,108 @@
+import numpy as np
+
+# Single-year age groups 0..100, the last one open-ended (100+)
+AGES = np.arange(101)
+
+# Fertility window and age profiles (shapes only; levels are calibrated per country)
+FERTILITY_MEAN_AGE = 28.0
+FERTILITY_SD = 6.0
+FERTILITY_AGES = (15, 49)
+MIGRATION_MEAN_AGE = 27.0
+MIGRATION_SD = 8.0
+
+# Gompertz-style mortality shape with an infant-mortality term
+_MORTALITY_SHAPE = 0.0005 * np.exp(0.085 * AGES)
+_MORTALITY_SHAPE[0] += 0.02
+
+# Scenario multipliers on fertility, mortality and migration, matched to the logistic scenarios
+COHORT_SCENARIOS = {
+    "High Growth": {"fertility": 1.15, "mortality": 0.95, "migration": 1.2},
+    "Moderate Growth": {"fertility": 1.0, "mortality": 1.0, "migration": 1.0},
+    "Low Growth": {"fertility": 0.85, "mortality": 1.05, "migration": 0.8},
+}
+
+
+def _profile(mean, sd, ages=AGES, window=None):
+    shape = np.exp(-0.5 * ((ages - mean) / sd) ** 2)
+    if window is not None:
+        shape = np.where((ages >= window[0]) & (ages <= window[1]), shape, 0.0)
+    return shape / shape.sum()
+
+
+FERTILITY_PROFILE = _profile(FERTILITY_MEAN_AGE, FERTILITY_SD, window=FERTILITY_AGES)
+MIGRATION_PROFILE = _profile(MIGRATION_MEAN_AGE, MIGRATION_SD)
+
+
+def calibrate(birth_rate, death_rate, iterations=8):
+    """
+    Build per-country age schedules consistent with the crude rates.
+    The initial age structure is the stable population l(a) * exp(-g a) for the natural
+    growth rate g; the mortality level is rescaled until the crude death rate matches.
+    :param birth_rate: crude birth rates per 1000 people, shape (C,)
+    :param death_rate: crude death rates per 1000 people, shape (C,)
+    :return: (age distribution, fertility rates, survival probabilities), each of shape (C, ages)
+    """
+    b = np.asarray(birth_rate, dtype=np.float64)[:, None] / 1000
+    d = np.asarray(death_rate, dtype=np.float64)[:, None] / 1000
+    g = b - d
+    scale = np.ones_like(b)
+    for _ in range(iterations):
+        mortality = np.minimum(scale * _MORTALITY_SHAPE, 1.0)
+        survivorship = np.cumprod(np.concatenate([np.ones_like(b), 1 - mortality[:, :-1]], axis=1), axis=1)
+        distribution = survivorship * np.exp(-g * AGES)
+        distribution /= distribution.sum(axis=1, keepdims=True)
+        scale *= d / (mortality * distribution).sum(axis=1, keepdims=True)
+    mortality = np.minimum(scale * _MORTALITY_SHAPE, 1.0)
+    # Fertility level such that births / population equals the crude birth rate
+    fertility = b * FERTILITY_PROFILE / (FERTILITY_PROFILE * distribution).sum(axis=1, keepdims=True)
+    return distribution, fertility, 1 - mortality
+
+
+def project_cohorts(population, birth_rate, death_rate, migration_rate, years=77, scenarios=COHORT_SCENARIOS):
+    """
+    Cohort-component projection for every country and scenario at once.
+    The state is a (scenarios, countries, ages) tensor; each yearly step applies the banded
+    Leslie operator (fertility row plus survival sub-diagonal, open-ended last age) and adds
+    net migrants by age, all as batched array operations.
+    :param population: starting total population per country, shape (C,)
+    :param birth_rate, death_rate, migration_rate: crude rates per 1000 people, shape (C,)
+    :param years: number of yearly steps
+    :return: totals array of shape (scenarios, countries, years + 1), including the start year
+    """
+    distribution, fertility, survival = calibrate(birth_rate, death_rate)
+    multipliers = np.array([[s["fertility"], s["mortality"], s["migration"]] for s in scenarios.values()])
+    f = multipliers[:, 0, None, None] * fertility[None]
+    s = 1 - np.minimum(multipliers[:, 1, None, None] * (1 - survival[None]), 1.0)
+    migration = (multipliers[:, 2, None] * np.asarray(migration_rate, dtype=np.float64)[None] / 1000)[..., None] * MIGRATION_PROFILE
+
+    state = np.broadcast_to(np.asarray(population, dtype=np.float64)[:, None] * distribution, f.shape).copy()
+    totals = np.empty(f.shape[:2] + (years + 1,))
+    totals[..., 0] = state.sum(axis=-1)
+    for step in range(1, years + 1):
+        total = totals[..., step - 1]
+        births = (f * state).sum(axis=-1)
+        survivors = s * state
+        state[..., 1:] = survivors[..., :-1]
+        state[..., -1] += survivors[..., -1]
+        state[..., 0] = births
+        state += migration * total[..., None]
+        np.maximum(state, 0, out=state)
+        totals[..., step] = state.sum(axis=-1)
+    return totals
+
+
+def project_countries(population_data, start_year=2023, end_year=2100, scenarios=COHORT_SCENARIOS):
+    """
+    Run project_cohorts for every country of a historical_population_data style dict.
+    :return: (countries, scenario names, projection years, totals of shape (scenarios, countries, years))
+    """
+    countries = list(population_data)
+    totals = project_cohorts(
+        [population_data[c]["population"][-1] for c in countries],
+        [population_data[c]["birth_rate"] for c in countries],
+        [population_data[c]["death_rate"] for c in countries],
+        [population_data[c]["migration_rate"] for c in countries],
+        years=end_year - start_year,
+        scenarios=scenarios,
+    )
+    return countries, list(scenarios), np.arange(start_year, end_year + 1), totals
@@ -1,98 +1,144 @@
-import time
+import numpy as np
+import pandas as pd
 import streamlit as st
-import matplotlib.pyplot as plt
+from downsample import downsample, pixel_width
+from instrumentation import ENCODE, FIGURE, SIMULATION, instrumented_page, stage
+from population_data import countries_data
+from population_engine import (
+    COUNTRY_CRUDE_BIRTH_RATE, IncrementalPeriods, country_period_curve, region_births, region_births_at, region_years,
+)
+from playback import DEFAULT_FPS, Playback, frame_indices, run_playback, start_playback
+from projection_cache import array_key, figure_to_png
+from resources import country_period_table, projection_cache
+
+# Estimate the number of births per year based on a crude birth rate (CBR) assumption
+CRUDE_BIRTH_RATE = COUNTRY_CRUDE_BIRTH_RATE  # Example: 30 births per 1,000 people
+
+# Pause per simulated year of the live plot (the frame rate itself is capped at DEFAULT_FPS)
+SECONDS_PER_YEAR = 0.05
+
+
+def country_births_series(country_data):
+    """
+    Cumulative births per year for one country.
+    :param country_data: list of {"start", "end", "growth_rate", "initial_population"} periods
+    :return: (years array, cumulative births array in millions)
+    """
+    years = []
+    yearly_births = []
+    for period in country_data:
+        # Apply the growth rate and calculate yearly population
+        period_years = np.arange(period["start"], period["end"] + 1)
+        yearly_population = period["initial_population"] * (1 + period["growth_rate"]) ** (period_years - period["start"])
+        years.append(period_years)
+        yearly_births.append(yearly_population * CRUDE_BIRTH_RATE)
+    return np.concatenate(years), np.cumsum(np.concatenate(yearly_births))
 
-# Function to calculate population evolution for a given country
-def estimate_population_ever_lived(country_data):
-    total_births = 0
-    population_data = {"years": [], "total_births": []}  # Store data for plotting
 
-    # Create a Streamlit placeholder for the plot
-    plot_placeholder = st.empty()
+def plot_births_evolution(years, total_births, boundaries=None):
+    # Static matplotlib render of the whole series, capped at the figure's pixel width
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots()
+    ax.plot(*downsample(years, total_births, pixel_width(fig), keep=boundaries), color="blue")
+    ax.set_xlabel("Year")
+    ax.set_ylabel("Total Births (Millions)")
+    ax.set_title(f"Population Births Evolution for the Selected Country")
+    ax.grid(True)
+    return fig
+
+
+# Function to calculate population evolution for a given country
+def estimate_population_ever_lived(country_data, periods=None):
+    """
+    Cumulative births of one country.
+    :return: (years, cumulative births in millions, period start years, first year)
+    """
+    # An edited table's IncrementalPeriods reuses its cached period curves
+    with stage(SIMULATION):
+        years, total_births = country_births_series(country_data) if periods is None else periods.series()
 
     # Get the start year of the data for "since" statement
     start_year = country_data[0]["start"]
-
-    # Loop through each period in the country's historical data
-    for period in country_data:
-        initial_population = period["initial_population"]
-        growth_rate = period["growth_rate"]
-
-        for year in range(period["start"], period["end"] + 1):
-            # Apply the growth rate and calculate yearly population
-            yearly_population = initial_population * (1 + growth_rate) ** (year - period["start"])
-
-            # Estimate the number of births per year based on a crude birth rate (CBR) assumption
-            crude_birth_rate = 30 / 1000  # Example: 30 births per 1,000 people
-            yearly_births = yearly_population * crude_birth_rate
-
-            total_births += yearly_births
-
-            # Store the population data for plotting
-            population_data["years"].append(year)
-            population_data["total_births"].append(total_births)
-
-            # Update the live plot every year
-            fig, ax = plt.subplots()
-            ax.plot(population_data["years"], population_data["total_births"], color="blue")
-            ax.set_xlabel("Year")
-            ax.set_ylabel("Total Births (Millions)")
-            ax.set_title(f"Population Births Evolution for the Selected Country")
-            ax.grid(True)
-
-            # Update the single plot using the placeholder
-            plot_placeholder.pyplot(fig)
-
-            # Add a brief pause to simulate live plotting
-            time.sleep(0.05)  # Adjust this time for faster or slower plotting
-
-    return total_births, start_year
-
-# Country data with comments explaining each country's estimation details
-countries_data = {
-    "Brazil": [
-        {"start": 1500, "end": 1800, "growth_rate": 0.005, "initial_population": 0.5},  # Colonial Brazil
-        {"start": 1800, "end": 1900, "growth_rate": 0.01, "initial_population": 5},    # Early Modern Brazil
-        {"start": 1900, "end": 2000, "growth_rate": 0.03, "initial_population": 25},   # Modern Era Brazil
-        {"start": 2000, "end": 2024, "growth_rate": 0.015, "initial_population": 170}, # 21st Century Brazil
-        {"start": 2025, "end": 2050, "growth_rate": 0.004, "initial_population": 215.3},  # Future Brazil projection
-    ],
-    "Poland": [
-        {"start": 1000, "end": 1500, "growth_rate": 0.002, "initial_population": 2},   # Early Poland
-        {"start": 1500, "end": 1800, "growth_rate": 0.005, "initial_population": 4},   # Renaissance Poland
-        {"start": 1800, "end": 1900, "growth_rate": 0.01, "initial_population": 10},   # Modern Era Poland
-        {"start": 1900, "end": 2023, "growth_rate": 0.015, "initial_population": 25},  # 20th and 21st Century Poland
-        {"start": 2024, "end": 2050, "growth_rate": 0.005, "initial_population": 40},  # Future Poland projection
-    ],
-    "USA": [
-        {"start": 1600, "end": 1800, "growth_rate": 0.01, "initial_population": 0.5},  # Colonial America
-        {"start": 1800, "end": 1900, "growth_rate": 0.02, "initial_population": 5},    # 19th Century USA
-        {"start": 1900, "end": 2000, "growth_rate": 0.03, "initial_population": 75},   # 20th Century USA
-        {"start": 2000, "end": 2024, "growth_rate": 0.01, "initial_population": 300},  # 21st Century USA
-        {"start": 2025, "end": 2050, "growth_rate": 0.008, "initial_population": 340}, # Future USA projection
-    ],
-    "China": [
-        {"start": -2000, "end": 1500, "growth_rate": 0.002, "initial_population": 20}, # Ancient China
-        {"start": 1500, "end": 1800, "growth_rate": 0.005, "initial_population": 150}, # Imperial China
-        {"start": 1800, "end": 1900, "growth_rate": 0.01, "initial_population": 300},  # Late Qing China
-        {"start": 1900, "end": 2023, "growth_rate": 0.015, "initial_population": 400}, # 20th and 21st Century China
-        {"start": 2024, "end": 2050, "growth_rate": 0.005, "initial_population": 1400}, # Future China projection
-    ],
-    "India": [
-        {"start": -2000, "end": 1500, "growth_rate": 0.002, "initial_population": 20}, # Ancient India
-        {"start": 1500, "end": 1800, "growth_rate": 0.005, "initial_population": 150}, # Mughal Empire
-        {"start": 1800, "end": 1900, "growth_rate": 0.01, "initial_population": 300},  # Colonial India
-        {"start": 1900, "end": 2023, "growth_rate": 0.015, "initial_population": 400}, # 20th and 21st Century India
-        {"start": 2024, "end": 2050, "growth_rate": 0.01, "initial_population": 1400},# Future India projection
-    ],
-    "Sweden": [
-        {"start": 1500, "end": 1800, "growth_rate": 0.003, "initial_population": 1},   # Early Sweden
-        {"start": 1800, "end": 1900, "growth_rate": 0.01, "initial_population": 4},    # Modern Sweden
-        {"start": 1900, "end": 2000, "growth_rate": 0.02, "initial_population": 7},    # 20th Century Sweden
-        {"start": 2000, "end": 2024, "growth_rate": 0.01, "initial_population": 9.8},  # 21st Century Sweden
-        {"start": 2025, "end": 2050, "growth_rate": 0.005, "initial_population": 10.67}, # Future Sweden projection
-    ]
-}
+    boundaries = [period["start"] for period in country_data]
+    return years, total_births, boundaries, start_year
+
+
+def births_playback(years, total_births, boundaries, fps=DEFAULT_FPS, result=None):
+    """
+    Streaming chart of a births series as a playback (see playback.start_playback).
+    """
+    column = "Total Births (Millions)"
+
+    def prepare(index):
+        # Downsampling caps every frame at DEFAULT_MAX_POINTS points however long the series is
+        shown_years, shown_births = downsample(years[:index + 1], total_births[:index + 1], keep=boundaries)
+        return pd.DataFrame({column: shown_births}, index=shown_years)
+
+    def show(frame):
+        # Native line chart redrawn per frame. Streamlit has no append-only chart update in the
+        # supported versions (add_rows was removed), so every frame re-sends the chart data.
+        with stage(ENCODE):
+            st.line_chart(frame)
+
+    frames = frame_indices(len(years), len(years) * SECONDS_PER_YEAR, fps=fps)
+    return Playback("country_population_counter", frames, prepare, show, fps=fps, result=result)
+
+
+def show_estimate(country, years, total_births, boundaries, start_year):
+    # Final static render keeps the matplotlib look
+    with stage(FIGURE):
+        fig = plot_births_evolution(years, total_births, boundaries)
+    st.image(figure_to_png(fig))
+    st.success(f"According to our Estimation, {total_births[-1]:.2f} million people have been born in {country} since {start_year}")
+
+
+def comparison_png(table):
+    """
+    Chart of several countries from one pass of the multi-region engine, as PNG bytes.
+    :param table: PERIOD_DTYPE rows of the selected countries
+    """
+    import matplotlib.pyplot as plt
+
+    with stage(FIGURE):
+        fig, ax = plt.subplots()
+    # One evaluation year per pixel column, plus every period boundary
+    span = np.linspace(table["start"].min(), table["end"].max(), pixel_width(fig)).round().astype(int)
+    years = np.union1d(span, np.concatenate((table["start"], table["end"])))
+    with stage(SIMULATION):
+        regions, births = region_births_at(table, years)
+        _, first_years, _ = region_years(table)
+
+    with stage(FIGURE):
+        for region, series, first_year in zip(regions, births, first_years):
+            started = years >= first_year
+            ax.plot(years[started], series[started], label=region)
+        ax.set_yscale("log")
+        ax.set_xlabel("Year")
+        ax.set_ylabel("Total Births (Millions)")
+        ax.set_title("Population Births Evolution by Country")
+        ax.grid(True)
+        ax.legend()
+    return figure_to_png(fig)
+
+
+def render_comparison(table):
+    """
+    Chart and leaderboard of several countries; the chart is shared by all sessions showing the same table.
+    :param table: PERIOD_DTYPE rows of the selected countries
+    """
+    st.image(projection_cache().get_or_compute(("comparison", array_key(table)), lambda: comparison_png(table)))
+
+    with stage(SIMULATION):
+        regions, totals = region_births(table)
+        _, first_years, _ = region_years(table)
+    leaderboard = pd.DataFrame({
+        "Country": regions,
+        "Since": first_years.astype(int),
+        "Total Births (Millions)": totals,
+    }).sort_values("Total Births (Millions)", ascending=False, ignore_index=True)
+    leaderboard.index += 1
+    st.dataframe(leaderboard, width="stretch")
 
 # Comments about each country
 comments = {
@@ -105,13 +151,42 @@ comments = {
 }
 
 # Streamlit UI
-st.title("Estimated Population Ever Born in Specific Countries")
-country = st.selectbox('Select a Country', list(countries_data.keys()))
-
-# Show the comment for the selected country
-st.write(comments[country])
-
-if st.button('Start Counting'):
-    country_data = countries_data[country]
-    total_people_estimate, start_year = estimate_population_ever_lived(country_data)
-    st.success(f"According to our Estimation, {total_people_estimate:.2f} million people have been born in {country} since {start_year}")
+with instrumented_page("country_population_counter"):
+    st.title("Estimated Population Ever Born in Specific Countries")
+    country = st.selectbox('Select a Country', list(countries_data.keys()))
+
+    # Show the comment for the selected country
+    st.write(comments[country])
+
+    # Streaming animates a native chart before the final one; static draws the final chart once
+    chart_mode = st.radio("Chart Mode", ["Streaming", "Static"], horizontal=True)
+
+    # Editable periods of the selected country; each country keeps its engine for the session
+    engines = st.session_state.setdefault("country_periods", {})
+    if country not in engines:
+        engines[country] = IncrementalPeriods(countries_data[country], country_period_curve)
+    with st.expander("Edit Periods"):
+        edited = st.data_editor(pd.DataFrame(countries_data[country]), num_rows="fixed", disabled=["start", "end"], key=f"country_period_editor_{country}")
+        with stage(SIMULATION):
+            recomputed = engines[country].apply(edited.to_dict("records"))
+        if recomputed:
+            st.caption(f"Recomputed {recomputed} period(s); later periods were shifted by the change in total.")
+
+    # Streaming frames are prepared by the playback event loop and shown by a fragment, so no
+    # script thread waits between frames
+    if st.button('Start Counting'):
+        estimate = estimate_population_ever_lived(engines[country].periods, periods=engines[country])
+        if chart_mode == "Streaming":
+            start_playback("country_playback", births_playback(*estimate[:3], result=(country, *estimate)))
+        else:
+            show_estimate(country, *estimate)
+    finished = run_playback("country_playback")
+    if finished is not None:
+        show_estimate(*finished)
+
+    # Every country in one vectorized pass over the structured period table
+    st.subheader("Compare Countries")
+    compared = st.multiselect("Countries to Compare", list(countries_data.keys()), default=list(countries_data.keys()))
+    if compared:
+        period_rows = country_period_table(CRUDE_BIRTH_RATE)
+        render_comparison(period_rows[np.isin(period_rows["region"], compared)])
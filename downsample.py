@@ -0,0 +1,66 @@
+import numpy as np
+
+# Point budget for charts without a matplotlib figure (e.g. st.line_chart)
+DEFAULT_MAX_POINTS = 800
+
+
+def pixel_width(fig):
+    """
+    Width of a matplotlib figure in device pixels, the useful number of points along x.
+    """
+    return int(fig.get_figwidth() * fig.dpi)
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets selection of n_out points that keep the visual shape of y(x).
+    The first and last points are always kept; every bucket in between contributes the point
+    forming the largest triangle with the previous pick and the mean of the next bucket.
+    :return: sorted int64 indices into x and y
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n, dtype=np.int64)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Bucket edges over the interior points 1 .. n-2
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    # Mean of each bucket, padded with the last point as the "next bucket" of the final one
+    sums_x = np.add.reduceat(x[:n - 1], edges[:-1])
+    sums_y = np.add.reduceat(y[:n - 1], edges[:-1])
+    sizes = np.diff(edges)
+    mean_x = np.append(sums_x / sizes, x[-1])
+    mean_y = np.append(sums_y / sizes, y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for bucket in range(n_out - 2):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        # Twice the triangle area; the constant factor does not change the argmax
+        area = np.abs((x[previous] - mean_x[bucket + 1]) * (y[lo:hi] - y[previous])
+                      - (x[previous] - x[lo:hi]) * (mean_y[bucket + 1] - y[previous]))
+        previous = lo + int(np.argmax(area))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def downsample(x, y, max_points=DEFAULT_MAX_POINTS, keep=None):
+    """
+    Reduce a long series to about max_points points before plotting.
+    :param x: increasing x values (e.g. years)
+    :param y: y values
+    :param max_points: point budget, usually the pixel width of the target figure
+    :param keep: x values that must survive (e.g. period boundaries)
+    :return: (x, y) arrays; the input itself when it already fits the budget
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if len(x) <= max_points:
+        return x, y
+    index = lttb_indices(x, y, max_points)
+    if keep is not None:
+        index = np.union1d(index, np.flatnonzero(np.isin(x, keep)))
+    return x[index], y[index]
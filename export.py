@@ -0,0 +1,204 @@
+import argparse
+import io
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from population_engine import GLOBAL_PERIODS, people_ever_lived_chunks, period_arrays, region_births_at, region_starts, region_years
+
+# Rows per exported chunk (and per Parquet row group)
+CHUNK_ROWS = 100_000
+
+# Years covered by the exported logistic projections
+PROJECTION_YEARS = np.arange(2023, 2101)
+
+FORMATS = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+# Largest dataset offered as a download in the app. Streamlit keeps a download's whole file in
+# server memory; bigger exports are written with this module's command line instead.
+MAX_DOWNLOAD_ROWS = 1_000_000
+
+
+def _rebatch(pieces, chunk_rows):
+    """
+    Regroup a stream of DataFrames into chunks of exactly chunk_rows rows (the last may be shorter).
+    """
+    pending = []
+    size = 0
+    for piece in pieces:
+        while len(piece):
+            take = piece.iloc[:chunk_rows - size]
+            piece = piece.iloc[len(take):]
+            pending.append(take)
+            size += len(take)
+            if size == chunk_rows:
+                yield pd.concat(pending, ignore_index=True)
+                pending, size = [], 0
+    if pending:
+        yield pd.concat(pending, ignore_index=True)
+
+
+def global_chunks(chunk_rows=CHUNK_ROWS, periods=GLOBAL_PERIODS):
+    """
+    Yearly people_ever_lived series ("Global Population Evolution").
+    """
+    for years, total in people_ever_lived_chunks(periods, chunk_years=chunk_rows):
+        yield pd.DataFrame({"year": years, "total_people_billions": total})
+
+
+def series_chunks(years, total_people, chunk_rows=CHUNK_ROWS):
+    """
+    A yearly series already in memory, e.g. an edited period table's, in the layout of global_chunks.
+    :param total_people: cumulative people in billions
+    """
+    for first in range(0, len(years), chunk_rows):
+        yield pd.DataFrame({
+            "year": years[first:first + chunk_rows],
+            "total_people_billions": total_people[first:first + chunk_rows],
+        })
+
+
+def country_chunks(table, chunk_rows=CHUNK_ROWS):
+    """
+    Yearly cumulative births of every region in a PERIOD_DTYPE table (estimate_population_ever_lived).
+    A region's years are evaluated in slices of at most chunk_rows, so no series is held whole.
+    """
+    starts = np.append(region_starts(table), len(table)) if len(table) else np.zeros(1, dtype=np.int64)
+
+    def pieces():
+        for lo, hi in zip(starts[:-1], starts[1:]):
+            rows = table[lo:hi]
+            first, last = int(rows["start"].min()), int(rows["end"].max())
+            for year in range(first, last + 1, chunk_rows):
+                years = np.arange(year, min(year + chunk_rows, last + 1))
+                regions, births = region_births_at(rows, years)
+                yield pd.DataFrame({"region": regions[0], "year": years, "total_births_millions": births[0]})
+
+    return _rebatch(pieces(), chunk_rows)
+
+
+def projection_chunks(population_data, chunk_rows=CHUNK_ROWS, years=PROJECTION_YEARS):
+    """
+    Yearly logistic projections of every country, fitted in batches of countries.
+    """
+    from logistic_fit import fit_countries, logistic_growth
+
+    countries = list(population_data)
+    batch = max(chunk_rows // len(years), 1)
+
+    def pieces():
+        for first in range(0, len(countries), batch):
+            params = fit_countries(population_data, countries[first:first + batch])
+            for country, (P0, r, K) in params[["P0", "r", "K"]].iterrows():
+                origin = population_data[country]["years"][0]
+                yield pd.DataFrame({
+                    "country": country,
+                    "year": years,
+                    "projected_population_millions": logistic_growth(years - origin, P0, r, K),
+                })
+
+    return _rebatch(pieces(), chunk_rows)
+
+
+def write_csv(chunks, target):
+    """
+    Write chunks as one CSV with a single header.
+    :param target: path, text buffer or binary file
+    :return: number of rows written
+    """
+    rows = 0
+    for i, chunk in enumerate(chunks):
+        if isinstance(target, str):
+            chunk.to_csv(target, mode="w" if i == 0 else "a", header=i == 0, index=False)
+        elif isinstance(target, io.BufferedIOBase):
+            chunk.to_csv(target, mode="wb", header=i == 0, index=False)
+        else:
+            chunk.to_csv(target, header=i == 0, index=False)
+        rows += len(chunk)
+    return rows
+
+
+def write_parquet(chunks, target):
+    """
+    Write chunks as one Parquet file, one row group per chunk. Requires pyarrow.
+    :param target: path or binary buffer
+    :return: number of rows written
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    rows = 0
+    writer = None
+    try:
+        for chunk in chunks:
+            batch = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(target, batch.schema)
+            writer.write_table(batch)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def export_file(chunks, fmt):
+    """
+    Contents of a download button's file. The chunks are written to an anonymous temporary file,
+    so only the finished file, not every chunk's text or row group, is ever held in memory.
+    :return: the file's bytes
+    """
+    with tempfile.TemporaryFile() as spool:
+        (write_parquet if fmt == "parquet" else write_csv)(chunks, spool)
+        spool.seek(0)
+        return spool.read()
+
+
+def dataset_rows(name):
+    """
+    Number of rows in a named dataset, without generating it.
+    """
+    if name == "global":
+        return int(period_arrays(GLOBAL_PERIODS)[1].sum())
+    from population_data import historical_population_data, store
+    if name == "countries":
+        _, first_years, last_years = region_years(store.period_table())
+        return int((last_years - first_years + 1).sum())
+    if name == "projections":
+        return len(historical_population_data) * len(PROJECTION_YEARS)
+    raise ValueError(f"Unknown dataset: {name!r}")
+
+
+def dataset_chunks(name, chunk_rows=CHUNK_ROWS):
+    """
+    Chunk generator of a named dataset: "global", "countries" or "projections".
+    """
+    if name == "global":
+        return global_chunks(chunk_rows)
+    from population_data import historical_population_data, store
+    if name == "countries":
+        return country_chunks(store.period_table(), chunk_rows)
+    if name == "projections":
+        return projection_chunks(historical_population_data, chunk_rows)
+    raise ValueError(f"Unknown dataset: {name!r}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export simulation and projection series in chunks.")
+    parser.add_argument("dataset", choices=["global", "countries", "projections"])
+    parser.add_argument("output", help="output file path")
+    parser.add_argument("--format", choices=list(FORMATS), help="default: from the output extension, else csv")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="rows per chunk")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("parquet" if args.output.endswith(".parquet") else "csv")
+    writer = write_parquet if fmt == "parquet" else write_csv
+    rows = writer(dataset_chunks(args.dataset, args.chunk_rows), args.output)
+    print(f"Wrote {rows} rows to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,84 +1,113 @@
 import numpy as np
-import pandas as pd
 import streamlit as st
-import matplotlib.pyplot as plt
-from scipy.optimize import curve_fit
-
-# Historical population data (in millions) for the countries
-historical_population_data = {
-    "Brazil": {
-        "years": np.array([1800, 1850, 1900, 1950, 2000, 2023]),
-        "population": np.array([4.5, 9.1, 17.4, 51.9, 174.4, 215.3])  # in millions
-    },
-    "Poland": {
-        "years": np.array([1800, 1850, 1900, 1950, 2000, 2023]),
-        "population": np.array([7.3, 9.2, 20.0, 25.0, 38.6, 38.0])  # in millions
-    },
-    "Sweden": {
-        "years": np.array([1800, 1850, 1900, 1950, 2000, 2023]),
-        "population": np.array([2.3, 3.5, 5.1, 7.0, 8.9, 10.6])  # in millions
-    },
-    "Italy": {
-        "years": np.array([1800, 1850, 1900, 1950, 2000, 2023]),
-        "population": np.array([17.3, 24.7, 33.2, 47.1, 57.3, 59.0])  # in millions
-    },
-    "USA": {
-        "years": np.array([1800, 1850, 1900, 1950, 2000, 2023]),
-        "population": np.array([5.3, 23.1, 76.2, 151.3, 282.2, 336.0])  # in millions
-    },
-    "China": {
-        "years": np.array([1800, 1850, 1900, 1950, 2000, 2023]),
-        "population": np.array([381.0, 430.0, 400.0, 544.0, 1267.4, 1412.0])  # in millions
-    },
-    "India": {
-        "years": np.array([1800, 1850, 1900, 1950, 2000, 2023]),
-        "population": np.array([169.0, 208.0, 238.0, 376.3, 1053.6, 1420.0])  # in millions
-    }
-}
-
-# Logistic growth model for population projection
-def logistic_growth(t, P0, r, K):
-    """
-    Logistic growth model function.
-    :param t: time (years)
-    :param P0: initial population (at t=0)
-    :param r: growth rate
-    :param K: carrying capacity (maximum population)
-    :return: population at time t
-    """
-    return K / (1 + ((K - P0) / P0) * np.exp(-r * t))
+from growth_models import (
+    CRITERIA, DEFAULT_CRITERION, DEFAULT_MODEL, GROWTH_MODELS, best_models, eligible, information_criteria,
+)
+from logistic_fit import FITTED
+from instrumentation import FIT, FIGURE, SIMULATION, instrumented_page, stage
+from population_data import historical_population_data
+from projection_cache import array_key, figure_to_png
+from resources import growth_model_fits, projection_cache
 
 # Streamlit UI
-st.title("Future Population Projection by Country")
+with instrumented_page("future_population_projection"):
+    st.title("Future Population Projection by Country")
+
+    # Select country
+    country = st.selectbox('Select a Country', list(historical_population_data.keys()))
+
+    # Growth model: the logistic by default, chosen explicitly, or picked by an information criterion
+    # among the bounded models the data can support
+    AUTOMATIC = "Best by information criterion"
+    model_options = [AUTOMATIC, *GROWTH_MODELS]
+    model_choice = st.selectbox('Growth Model', model_options, index=model_options.index(DEFAULT_MODEL))
+    criterion = st.selectbox('Selection Criterion', CRITERIA, index=CRITERIA.index(DEFAULT_CRITERION))
+
+    # Define a range of years for projection
+    years_future = np.arange(2023, 2101, 5)  # future years from 2023 to 2100
+
+    # Get historical data for the selected country
+    data = historical_population_data[country]
+    years = data['years']
+    population = data['population']
+
+    # Models the data cannot support are still listed, but only a manual choice shows them
+    manual_only = [name for name, ok in zip(GROWTH_MODELS, eligible(list(GROWTH_MODELS), [len(population)])[0]) if not ok]
+    if manual_only:
+        st.caption(
+            f"Automatic selection considers bounded models with at least two residual degrees of freedom; "
+            f"with {len(population)} observations for {country}, {', '.join(manual_only)} can only be chosen by hand."
+        )
+
+    # Every model is fitted to every country once per server process
+    with stage(FIT):
+        fitted_countries, fits = growth_model_fits()
+    row = fitted_countries.index(country)
+    scores = {
+        name: information_criteria(rss[row:row + 1], [len(population)], GROWTH_MODELS[name].n_params)
+        for name, (_, rss) in fits.items()
+    }
+    best_model = best_models(list(scores), np.array([[s[criterion][0] for s in scores.values()]]), [len(population)])[0]
+    model_name = best_model if model_choice == AUTOMATIC else model_choice
+    params = fits[model_name][0][row:row + 1]
+
+    def project_and_render(country, years, population, model_name, params):
+        # Only cache misses draw, so pyplot is imported on first use
+        import matplotlib.pyplot as plt
+
+        # Project the future population using the fitted model
+        future_population = GROWTH_MODELS[model_name].predict(params, years_future - years[0])[0]
 
-# Select country
-country = st.selectbox('Select a Country', list(historical_population_data.keys()))
+        # Plot the historical and projected population
+        with stage(FIGURE):
+            fig, ax = plt.subplots()
+            ax.plot(years, population, 'o', label='Historical Population', markersize=8)
+            ax.plot(years_future, future_population, '-', label=f'Projected Population ({model_name})', color='green')
+            ax.set_xlabel('Year')
+            ax.set_ylabel('Population (millions)')
+            ax.set_title(f'Population Projection for {country}')
+            ax.legend()
+        return {"future_population": future_population, "figure_png": figure_to_png(fig)}
 
-# Define a range of years for projection
-years_future = np.arange(2023, 2101, 5)  # future years from 2023 to 2100
+    # Repeat views of the same country, model and data reuse the rendered figure
+    key = ("growth_model", country, model_name, array_key(years, population, years_future, params))
+    projection = projection_cache().get_or_compute(key, lambda: project_and_render(country, years, population, model_name, params))
+    future_population = projection["future_population"]
 
-# Get historical data for the selected country
-data = historical_population_data[country]
-years = data['years']
-population = data['population']
+    # Streamlit output
+    st.image(projection["figure_png"])
 
-# Fit the logistic model to the historical data
-popt, _ = curve_fit(logistic_growth, years - years[0], population, bounds=(0, [max(population), 0.05, 1.5 * max(population)]))
+    # Display projected population for 2100
+    st.write(f"Projected population of {country} in 2100: {future_population[-1]:.2f} million people ({model_name} model).")
 
-# Project the future population using the fitted model
-future_population = logistic_growth(years_future - years[0], *popt)
+    # Fit quality and information criteria of every model for the selected country (lower is better)
+    if st.checkbox("Show Model Comparison"):
+        import pandas as pd
 
-# Plot the historical and projected population
-fig, ax = plt.subplots()
-ax.plot(years, population, 'o', label='Historical Population', markersize=8)
-ax.plot(years_future, future_population, '-', label='Projected Population', color='green')
-ax.set_xlabel('Year')
-ax.set_ylabel('Population (millions)')
-ax.set_title(f'Population Projection for {country}')
-ax.legend()
+        comparison = pd.DataFrame(
+            {
+                "Residual Sum of Squares": [fits[name][1][row] for name in fits],
+                **{c: [scores[name][c][0] for name in fits] for c in CRITERIA},
+                "Population in 2100": [
+                    GROWTH_MODELS[name].predict(fits[name][0][row:row + 1], [2100 - years[0]])[0, 0] for name in fits
+                ],
+            },
+            index=pd.Index(list(fits), name="Model"),
+        )
+        st.dataframe(comparison.round(2))
+        st.write(f"Selected by {criterion}: {best_model}")
 
-# Streamlit output
-st.pyplot(fig)
+    # Rolling-origin backtest: fit on the history up to each cutoff year and score the later observations
+    with st.expander("Backtest"):
+        if st.button("Run Backtest"):
+            from backtest import mape_table, run_backtest
 
-# Display projected population for 2100
-st.write(f"Projected population of {country} in 2100: {future_population[-1]:.2f} million people.")
\ No newline at end of file
+            progress_bar = st.progress(0.0)
+            with stage(SIMULATION):
+                countries, cutoffs, models, errors = run_backtest(
+                    progress=lambda done, total: progress_bar.progress(done / total, text=f"{done}/{total} jobs"),
+                )
+            table = mape_table(countries, models, errors)
+            st.write(f"Mean absolute percentage error over {len(cutoffs)} cutoff years, by country and model:")
+            st.dataframe(table.round(2))
+            st.write(f"Backtest MAPE of the fitted projection for {country}: {table.loc[country, FITTED]:.2f}%")
@@ -0,0 +1,126 @@
+import pandas as pd
+import streamlit as st
+from downsample import downsample, pixel_width
+from export import FORMATS, MAX_DOWNLOAD_ROWS, dataset_chunks, dataset_rows, export_file, series_chunks
+from instrumentation import ENCODE, FIGURE, SIMULATION, instrumented_page, stage
+from population_engine import (
+    GLOBAL_PERIODS, IncrementalPeriods, global_period_curve, global_periods, people_ever_lived_series, resolution_indices,
+)
+
+# -----------------------------------------------
+# Global Population Evolution Based on Updated Data
+# -----------------------------------------------
+def people_ever_lived(resolution="yearly"):
+    # Closed-form per-period evaluation; see population_engine.people_ever_lived_series
+    with stage(SIMULATION):
+        return people_ever_lived_series(GLOBAL_PERIODS, resolution=resolution)
+
+# -----------------------------------------------
+# Streamlit Page
+# -----------------------------------------------
+with instrumented_page("global_population_evolution"):
+    st.title("Global Population Evolution")
+
+    resolution_options = {"Yearly": "yearly", "Decadal": "decadal", "1,000 points": 1000}
+    resolution = st.radio("Chart Resolution", list(resolution_options.keys()), index=1, horizontal=True)
+
+    # Editable periods; the engine lives in the session so an edit recomputes only the edited period
+    if "global_periods" not in st.session_state:
+        st.session_state.global_periods = IncrementalPeriods(global_periods(), global_period_curve)
+    global_engine = st.session_state.global_periods
+    with st.expander("Edit Periods"):
+        edited = st.data_editor(pd.DataFrame(global_periods()), num_rows="fixed", disabled=["start", "end"], key="global_period_editor")
+        with stage(SIMULATION):
+            recomputed = global_engine.apply(edited.to_dict("records"))
+        if recomputed:
+            st.caption(f"Recomputed {recomputed} period(s); later periods were shifted by the change in total.")
+
+    if st.button('Start Counting'):
+        # Plotting is only needed after a click, so pyplot is not imported on first paint
+        import matplotlib.pyplot as plt
+
+        if global_engine.periods == global_periods():
+            total_people_estimate, population_data = people_ever_lived(resolution_options[resolution])
+        else:
+            # What-if table: reuse the cached period curves instead of resimulating the history
+            with stage(SIMULATION):
+                years, births = global_engine.series()
+                index = resolution_indices(years, resolution_options[resolution])
+            total_people_estimate = global_engine.total / 1e9
+            population_data = {"years": years[index], "total_population": births[index] / 1e9}
+
+        # Make the result human-readable and display it in billions
+        st.success(f"An Estimated **{total_people_estimate:,.2f} billion** People Have Ever Lived on Earth.")
+
+        # Plot the population evolution
+        with stage(FIGURE):
+            fig, ax = plt.subplots()
+            # Cap the plotted points at the figure width, keeping the period boundaries
+            boundaries = [p["year"] for p in GLOBAL_PERIODS]
+            years, total = downsample(population_data["years"], population_data["total_population"], pixel_width(fig), keep=boundaries)
+            ax.plot(years, total, label="Total People Ever Lived", color='blue')
+            ax.set_xlabel("Year")
+            ax.set_ylabel("Total People (Billions)")
+            ax.set_title("Evolution of Total People Who Have Ever Lived")
+            ax.grid(True)
+            ax.legend()
+        with stage(ENCODE):
+            st.pyplot(fig)
+        plt.close(fig)
+
+    # Which period assumptions drive the total: every perturbed variant in one batched evaluation
+    if st.checkbox("Sensitivity Analysis"):
+        import matplotlib.pyplot as plt
+        from sensitivity import elasticities, plot_tornado, sobol_indices, tornado
+
+        n_samples = st.select_slider("Sobol Samples", options=[1024, 4096, 16384], value=4096, format_func=lambda n: f"{n:,}")
+        spread = st.slider("Parameter Spread (±)", min_value=0.05, max_value=0.5, value=0.2, step=0.05)
+        with stage(SIMULATION):
+            labels, elasticity = elasticities(global_engine.periods)
+            _, first_order, total_order = sobol_indices(global_engine.periods, n_samples=n_samples, spread=spread)
+            tornado_labels, base, low, high = tornado(global_engine.periods, swing=spread)
+        with stage(FIGURE):
+            fig = plot_tornado(tornado_labels, base, low, high)
+        with stage(ENCODE):
+            st.pyplot(fig)
+        plt.close(fig)
+        indices = pd.DataFrame({
+            "Parameter": labels,
+            "Elasticity": elasticity,
+            "First-Order Sobol": first_order,
+            "Total Sobol": total_order,
+        }).sort_values("Total Sobol", ascending=False, ignore_index=True)
+        # Empty periods (end not after start) cannot affect the total
+        st.dataframe(indices[indices["Elasticity"] != 0], width="stretch", hide_index=True)
+
+    # Export: the file is generated chunk by chunk into a temporary file only when the download is clicked
+    with st.expander("Export Data"):
+        export_options = {"Global Population Evolution": "global", "Births by Country": "countries", "Logistic Projections": "projections"}
+        export_dataset = export_options[st.selectbox("Dataset", list(export_options.keys()))]
+        export_format = st.radio("Format", list(FORMATS), horizontal=True)
+        export_rows = dataset_rows(export_dataset)
+        # The global series follows the edited periods, as on the chart; years cannot be edited,
+        # so the row count is the baseline's
+        edited_export = export_dataset == "global" and global_engine.periods != global_periods()
+
+        def export_chunks():
+            if edited_export:
+                years, births = global_engine.series()
+                return series_chunks(years, births / 1e9)
+            return dataset_chunks(export_dataset)
+
+        if edited_export:
+            st.caption("Exports the series of the edited periods.")
+        if export_rows > MAX_DOWNLOAD_ROWS:
+            st.caption(
+                f"{export_rows:,} rows is above the {MAX_DOWNLOAD_ROWS:,}-row download limit; "
+                f"export it with `python export.py {export_dataset} {export_dataset}.{export_format}`."
+            )
+        else:
+            st.download_button(
+                "Download",
+                data=lambda: export_file(export_chunks(), export_format),
+                file_name=f"{export_dataset}.{export_format}",
+                mime=FORMATS[export_format],
+                on_click="ignore",
+            )
@@ -0,0 +1,340 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from logistic_fit import (
+    EPS, levenberg_marquardt, logistic_bounds, logistic_growth, logistic_jacobian, stack_series, warm_start,
+)
+
+# Bounds of the alternative models; wider than the logistic page bounds, which often pin the fit
+ZOO_MAX_GROWTH_RATE = 0.1
+ZOO_MAX_CAPACITY_FACTOR = 3.0
+RICHARDS_SHAPE_BOUNDS = (0.1, 5.0)
+
+# Observations required before and after a piecewise-logistic breakpoint
+PIECEWISE_MIN_BEFORE = 3
+PIECEWISE_MIN_AFTER = 2
+
+# Model shown until the user picks another one or automatic selection
+DEFAULT_MODEL = "Logistic"
+
+CRITERIA = ("AIC", "AICc", "BIC")
+# The small-sample correction matters: most countries have only a handful of observations
+DEFAULT_CRITERION = "AICc"
+
+GROWTH_MODELS = {}
+
+
+def register(model):
+    # Add a model to GROWTH_MODELS under its display name
+    GROWTH_MODELS[model.name] = model
+    return model
+
+
+def _columns(params):
+    return [params[:, i:i + 1] for i in range(params.shape[1])]
+
+
+def _peak(y, mask):
+    return np.where(mask, y, -np.inf).max(axis=1)
+
+
+def _linear_fit(t, z, mask):
+    # Weighted least-squares line z = intercept + slope * t of every row, ignoring masked entries
+    w = mask.astype(float)
+    n = np.maximum(w.sum(axis=1, keepdims=True), 1)
+    t_mean = (w * t).sum(axis=1, keepdims=True) / n
+    z_mean = (w * z).sum(axis=1, keepdims=True) / n
+    var = (w * (t - t_mean) ** 2).sum(axis=1, keepdims=True)
+    slope = (w * (t - t_mean) * (z - z_mean)).sum(axis=1, keepdims=True) / np.where(var > 0, var, 1)
+    return (z_mean - slope * t_mean)[:, 0], slope[:, 0]
+
+
+def _inside(guess, lower, upper):
+    # Keep a guess strictly inside the bounds so every free parameter can move
+    span = upper - lower
+    return np.clip(guess, lower + 0.01 * span, upper - 0.01 * span)
+
+
+class GrowthModel:
+    """
+    A growth curve for the batched fitter: model and analytic Jacobian functions that broadcast
+    parameters of shape (n, 1) against times (n, m), plus per-series bounds and starting guesses.
+    Models without a carrying capacity are marked bounded=False and never selected automatically.
+    """
+
+    def __init__(self, name, parameters, function, jacobian, bounds, guess, bounded=True):
+        self.name = name
+        self.parameters = parameters
+        self.function = function
+        self.jacobian = jacobian
+        self.bounds = bounds
+        self.guess = guess
+        self.bounded = bounded
+
+    @property
+    def n_params(self):
+        return len(self.parameters)
+
+    def problem(self, t, y, mask):
+        """
+        Rows this model adds to a stacked fit of padded series (t, y, mask).
+        :return: (owner series of every row, t, y, mask, start, lower, upper)
+        """
+        lower, upper = self.bounds(y, mask)
+        return np.arange(len(y)), t, y, mask, self.guess(t, y, mask, lower, upper), lower, upper
+
+    def fit(self, series):
+        """
+        Fit every (t, population) series at once.
+        :return: (params array (n, n_params); residual sum of squares (n,)); NaN and inf for
+                 series too short for the model
+        """
+        t, y, mask = stack_series(series)
+        owner, *problem = self.problem(t, y, mask)
+        params = np.full((len(series), self.n_params), np.nan)
+        rss = np.full(len(series), np.inf)
+        if not len(owner):
+            return params, rss
+        with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+            fitted, cost, _ = levenberg_marquardt(self.function, self.jacobian, *problem)
+        # Lowest residual row of every series (several rows per series when breakpoints are tried)
+        order = np.lexsort((cost, owner))
+        best = order[np.r_[True, owner[order][1:] != owner[order][:-1]]]
+        params[owner[best]] = fitted[best]
+        rss[owner[best]] = cost[best]
+        return params, rss
+
+    def predict(self, params, t):
+        """
+        Evaluate fitted parameters (n, n_params) at times t of shape (n, m) or (m,).
+        """
+        return self.function(np.atleast_2d(t), *_columns(np.atleast_2d(params)))
+
+
+# --- Exponential: P0 * exp(r t)
+
+def exponential_growth(t, P0, r):
+    return P0 * np.exp(r * t)
+
+
+def exponential_jacobian(t, P0, r):
+    E = np.exp(r * t)
+    return np.stack(np.broadcast_arrays(E, P0 * t * E), axis=-1)
+
+
+def _exponential_bounds(y, mask):
+    peak = _peak(y, mask)
+    lower = np.column_stack([np.full(len(y), EPS), np.full(len(y), -ZOO_MAX_GROWTH_RATE)])
+    upper = np.column_stack([peak, np.full(len(y), ZOO_MAX_GROWTH_RATE)])
+    return lower, upper
+
+
+def _exponential_guess(t, y, mask, lower, upper):
+    # ln P = ln P0 + r t
+    intercept, slope = _linear_fit(t, np.log(np.where(mask, np.maximum(y, EPS), 1)), mask)
+    return _inside(np.column_stack([np.exp(intercept), slope]), lower, upper)
+
+
+# --- Logistic: the projection pages' model with their bounds
+
+def _logistic_guess(t, y, mask, lower, upper):
+    return warm_start(t, y, mask, lower, upper)
+
+
+# --- Gompertz: K * exp(ln(P0 / K) * exp(-r t))
+
+def gompertz_growth(t, P0, r, K):
+    return K * np.exp(np.log(P0 / K) * np.exp(-r * t))
+
+
+def gompertz_jacobian(t, P0, r, K):
+    E = np.exp(-r * t)
+    L = np.log(P0 / K)
+    f = K * np.exp(L * E)
+    return np.stack(np.broadcast_arrays(f * E / P0, -f * L * t * E, f * (1 - E) / K), axis=-1)
+
+
+def _capacity_bounds(y, mask, extra_lower=(), extra_upper=()):
+    # (P0, r, K[, extra...]) bounds with the wider zoo limits
+    peak = _peak(y, mask)
+    n = len(y)
+    lower = np.column_stack([np.full(n, EPS), np.full(n, EPS), np.full(n, EPS), *[np.full(n, v) for v in extra_lower]])
+    upper = np.column_stack([peak, np.full(n, ZOO_MAX_GROWTH_RATE), ZOO_MAX_CAPACITY_FACTOR * peak,
+                             *[np.full(n, v) for v in extra_upper]])
+    return lower, upper
+
+
+def _gompertz_guess(t, y, mask, lower, upper):
+    # ln(-ln(P / K)) = ln(-ln(P0 / K)) - r t, with K a little above the largest observation
+    K = 1.2 * upper[:, 0]
+    ratio = np.clip(np.where(mask, y, 1) / K[:, None], EPS, 1 - 1e-6)
+    intercept, slope = _linear_fit(t, np.log(-np.log(ratio)), mask)
+    P0 = K * np.exp(-np.exp(intercept))
+    return _inside(np.column_stack([P0, -slope, K]), lower, upper)
+
+
+# --- Richards (generalized logistic): K / (1 + ((K / P0)^nu - 1) exp(-r t))^(1 / nu)
+
+def richards_growth(t, P0, r, K, nu):
+    Q = np.expm1(nu * np.log(K / P0))
+    return K * (1 + Q * np.exp(-r * t)) ** (-1 / nu)
+
+
+def richards_jacobian(t, P0, r, K, nu):
+    E = np.exp(-r * t)
+    log_ratio = np.log(K / P0)
+    power = np.exp(nu * log_ratio)
+    B = 1 + (power - 1) * E
+    f = K * B ** (-1 / nu)
+    d_P0 = f * E * power / (P0 * B)
+    d_r = f * (power - 1) * t * E / (nu * B)
+    d_K = f * (1 - E * power / B) / K
+    d_nu = f * (np.log(B) / nu ** 2 - E * power * log_ratio / (nu * B))
+    return np.stack(np.broadcast_arrays(d_P0, d_r, d_K, d_nu), axis=-1)
+
+
+def _richards_bounds(y, mask):
+    return _capacity_bounds(y, mask, [RICHARDS_SHAPE_BOUNDS[0]], [RICHARDS_SHAPE_BOUNDS[1]])
+
+
+def _richards_guess(t, y, mask, lower, upper):
+    # nu = 1 is the logistic curve, so start from the logistic warm start
+    guess = np.column_stack([warm_start(t, y, mask, lower[:, :3], upper[:, :3]), np.ones(len(y))])
+    return _inside(guess, lower, upper)
+
+
+# --- Piecewise logistic: one logistic phase up to a breakpoint tau, a second one after it,
+# continuous at tau. tau is chosen from the observation times and held fixed in each fit.
+
+def piecewise_logistic_growth(t, P0, r1, K1, r2, K2, tau):
+    P_tau = logistic_growth(tau, P0, r1, K1)
+    after = logistic_growth(np.maximum(t - tau, 0), P_tau, r2, K2)
+    return np.where(t >= tau, after, logistic_growth(t, P0, r1, K1))
+
+
+def piecewise_logistic_jacobian(t, P0, r1, K1, r2, K2, tau):
+    P_tau = logistic_growth(tau, P0, r1, K1)
+    first = logistic_jacobian(t, P0, r1, K1)
+    at_tau = logistic_jacobian(tau, P0, r1, K1)
+    second = logistic_jacobian(np.maximum(t - tau, 0), P_tau, r2, K2)
+    after = (t >= tau)[..., None]
+    # Chain rule through P_tau for the first phase's parameters
+    phase1 = np.where(after, second[..., :1] * at_tau, first)
+    phase2 = np.where(after, second[..., 1:], 0)
+    return np.concatenate([phase1, phase2, np.zeros_like(phase2[..., :1])], axis=-1)
+
+
+class PiecewiseLogistic(GrowthModel):
+    """
+    Piecewise logistic model; every admissible breakpoint is fitted in the same batch and the
+    best one is kept per series. The breakpoint is chosen from the data, so it counts as a parameter.
+    """
+
+    def __init__(self):
+        super().__init__("Piecewise Logistic", ("P0", "r1", "K1", "r2", "K2", "tau"),
+                         piecewise_logistic_growth, piecewise_logistic_jacobian, None, None)
+
+    def problem(self, t, y, mask):
+        # One row per (series, admissible breakpoint index), with tau fixed by equal bounds
+        owner, index = [], []
+        for i, count in enumerate(mask.sum(axis=1)):
+            for j in range(PIECEWISE_MIN_BEFORE - 1, count - PIECEWISE_MIN_AFTER):
+                owner.append(i)
+                index.append(j)
+        owner = np.array(owner, dtype=np.int64)
+        tau = t[owner, np.array(index, dtype=np.int64)]
+        t, y, mask = t[owner], y[owner], mask[owner]
+        logistic_lower, logistic_upper = _capacity_bounds(y, mask)
+        lower = np.column_stack([logistic_lower, logistic_lower[:, 1:], tau])
+        upper = np.column_stack([logistic_upper, logistic_upper[:, 1:], tau])
+        first = warm_start(t, y, mask, logistic_lower, logistic_upper)
+        start = _inside(np.column_stack([first, first[:, 1:], tau]), lower, upper)
+        start[:, -1] = tau
+        return owner, t, y, mask, start, lower, upper
+
+
+register(GrowthModel("Logistic", ("P0", "r", "K"), logistic_growth, logistic_jacobian, logistic_bounds, _logistic_guess))
+register(GrowthModel("Exponential", ("P0", "r"), exponential_growth, exponential_jacobian,
+                     _exponential_bounds, _exponential_guess, bounded=False))
+register(GrowthModel("Gompertz", ("P0", "r", "K"), gompertz_growth, gompertz_jacobian, _capacity_bounds, _gompertz_guess))
+register(GrowthModel("Richards", ("P0", "r", "K", "nu"), richards_growth, richards_jacobian,
+                     _richards_bounds, _richards_guess))
+register(PiecewiseLogistic())
+
+
+# --- Fitting and selection
+
+def fit_models(series, models=None, max_workers=None):
+    """
+    Fit every model to every series, each model over all series in one batch. The models are
+    fitted concurrently on a thread pool: the batched fits spend their time in numpy, which
+    releases the GIL, and threads need no pickling of the model functions.
+    :param models: model names (default: all of GROWTH_MODELS)
+    :param max_workers: threads (default: one per model, at most the CPU count); 1 fits inline
+    :return: {model name: (params array (n, n_params), residual sum of squares (n,))}
+    """
+    names = list(GROWTH_MODELS) if models is None else list(models)
+    if max_workers is None:
+        max_workers = min(len(names), os.cpu_count() or 1)
+    if max_workers <= 1 or len(names) <= 1:
+        return {name: GROWTH_MODELS[name].fit(series) for name in names}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {name: pool.submit(GROWTH_MODELS[name].fit, series) for name in names}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def information_criteria(rss, n_obs, n_params):
+    """
+    AIC, AICc and BIC of least-squares fits with Gaussian errors. A model needs at least one
+    residual degree of freedom (two for AICc); otherwise, or if it could not be fitted, its score is infinite.
+    :return: {criterion: array}
+    """
+    rss = np.asarray(rss, dtype=float)
+    n = np.asarray(n_obs, dtype=float)
+    k = n_params
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_likelihood_term = n * np.log(np.maximum(rss, EPS) / n)
+        aic = log_likelihood_term + 2 * k
+        aicc = np.where(n - k - 1 > 0, aic + 2 * k * (k + 1) / (n - k - 1), np.inf)
+        bic = log_likelihood_term + k * np.log(n)
+    unfitted = ~np.isfinite(rss) | (n <= k)
+    return {name: np.where(unfitted, np.inf, value) for name, value in (("AIC", aic), ("AICc", aicc), ("BIC", bic))}
+
+
+def eligible(names, n_obs):
+    """
+    Models automatic selection may pick for series of n_obs observations: bounded models (an
+    exponential extrapolated to 2100 has no ceiling) with at least two residual degrees of freedom.
+    With six observations per country this rules out the six-parameter piecewise logistic.
+    :return: bool array (len(n_obs), len(names))
+    """
+    n = np.asarray(n_obs)[:, None]
+    k = np.array([GROWTH_MODELS[name].n_params for name in names])
+    bounded = np.array([GROWTH_MODELS[name].bounded for name in names])
+    return bounded & (n > k + 1)
+
+
+def best_models(names, scores, n_obs):
+    """
+    Lowest-scoring eligible model of every series, or DEFAULT_MODEL where none was fitted.
+    :param scores: criterion values (n, len(names)), lower is better
+    """
+    masked = np.where(eligible(names, n_obs), scores, np.inf)
+    best = np.argmin(masked, axis=1)
+    return [names[i] if np.isfinite(row[i]) else DEFAULT_MODEL for row, i in zip(masked, best)]
+
+
+def select_models(series, models=None, criterion=DEFAULT_CRITERION, max_workers=None):
+    """
+    Fit all models and rank them per series by an information criterion (lower is better).
+    :return: (model names, fits as from fit_models, scores array (n, models), best eligible model name per series)
+    """
+    fits = fit_models(series, models, max_workers)
+    names = list(fits)
+    n_obs = np.array([len(p) for _, p in series])
+    scores = np.column_stack([
+        information_criteria(fits[name][1], n_obs, GROWTH_MODELS[name].n_params)[criterion] for name in names
+    ])
+    return names, fits, scores, best_models(names, scores, n_obs)
@@ -0,0 +1,261 @@
+import collections
+import contextvars
+import json
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger("population.instrumentation")
+if not logger.handlers:
+    # One JSON object per line on stderr, without the usual log prefix
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+# Stage names used by the pages
+SIMULATION = "simulation"  # year loops and engines
+FIT = "fit"  # curve fitting
+FIGURE = "figure"  # matplotlib figure construction and drawing
+ENCODE = "encode"  # PNG encoding / chart payloads (st.pyplot, figure_to_png)
+FRAME = "frame"  # one animation frame pushed to the browser
+SLEEP = "sleep"  # deliberate playback pacing
+
+# Interval between stack samples of the sampling profiler
+PROFILE_INTERVAL = 0.005
+
+_current = contextvars.ContextVar("instrumentation", default=None)
+
+# matplotlib figure hook (rcParams["figure.hooks"]) counting the pyplot figures of the current run
+FIGURE_HOOK = "instrumentation:count_figure"
+_hook_lock = threading.Lock()
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS; None where resource is missing
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def count_figure(fig):
+    # Called by pyplot for every new figure once install_figure_hook has run
+    instrumentation = _current.get()
+    if instrumentation is not None:
+        instrumentation.figures += 1
+
+
+def install_figure_hook():
+    """
+    Register FIGURE_HOOK once matplotlib is loaded. Pages import pyplot lazily, so this does not
+    import it; it runs on every page start and figure stage, which precede any figure creation.
+    """
+    # Only pyplot figures run the hook, and pyplot is imported after matplotlib has finished
+    # initializing; matplotlib alone may still be half-imported by another session's thread
+    if "matplotlib.pyplot" not in sys.modules:
+        return
+    from matplotlib import rcParams
+
+    with _hook_lock:
+        if FIGURE_HOOK not in rcParams["figure.hooks"]:
+            rcParams["figure.hooks"] = [*rcParams["figure.hooks"], FIGURE_HOOK]
+
+
+class SamplingProfiler:
+    """
+    Minimal wall-clock sampling profiler for one thread.
+    A background thread records the innermost frames of the target thread every interval.
+    """
+
+    def __init__(self, thread_id, interval=PROFILE_INTERVAL, depth=3):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.depth = depth
+        self.samples = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and len(stack) < self.depth:
+                code = frame.f_code
+                stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            if stack:
+                self.samples[" <- ".join(stack)] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def top(self, n=10):
+        return self.samples.most_common(n)
+
+
+class Instrumentation:
+    """
+    Per-run timings of the page stages, counters, peak RSS and an optional sampling profile.
+    """
+
+    def __init__(self, page, profile=False, show_panel=False):
+        self.page = page
+        self.show_panel = show_panel
+        self.started = time.perf_counter()
+        self.seconds = collections.defaultdict(float)
+        self.counts = collections.Counter()
+        self.figures = 0
+        self.finished = False
+        self.profiler = SamplingProfiler(threading.get_ident()) if profile else None
+        if self.profiler:
+            self.profiler.start()
+
+    @contextmanager
+    def stage(self, name):
+        if name == FIGURE:
+            install_figure_hook()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - started
+            self.counts[name] += 1
+
+    def sleep(self, seconds):
+        # Drop-in replacement for time.sleep that is accounted as pacing
+        with self.stage(SLEEP):
+            time.sleep(seconds)
+
+    def summary(self):
+        return {
+            "page": self.page,
+            "total_seconds": time.perf_counter() - self.started,
+            "stages": {name: {"seconds": self.seconds[name], "count": self.counts[name]} for name in self.seconds},
+            "figures_created": self.figures,
+            "frames_pushed": self.counts[FRAME],
+            "peak_rss_mb": _peak_rss_mb(),
+            "profile": self.profiler.top() if self.profiler else [],
+        }
+
+    def finish(self, interrupted=False):
+        """
+        Stop profiling and emit the run summary as one JSON log line.
+        :param interrupted: the run was cut short by a rerun, st.stop or an error
+        """
+        if self.profiler:
+            self.profiler.stop()
+        self.finished = True
+        result = {**self.summary(), "interrupted": interrupted}
+        logger.info(json.dumps(result))
+        return result
+
+
+@contextmanager
+def stage(name):
+    """
+    Time a stage on the instrumentation of the current run; a no-op when none is active.
+    """
+    instrumentation = _current.get()
+    if instrumentation is None:
+        yield
+    else:
+        with instrumentation.stage(name):
+            yield
+
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def active(instrumentation):
+    """
+    Make instrumentation the current run's for the with block, e.g. in fragment runs that
+    execute outside the page body.
+    """
+    token = _current.set(instrumentation)
+    try:
+        yield instrumentation
+    finally:
+        _current.reset(token)
+
+
+def sleep(seconds):
+    """
+    time.sleep that is accounted as pacing on the current run.
+    """
+    with stage(SLEEP):
+        time.sleep(seconds)
+
+
+def page_instrumentation(page):
+    """
+    Start instrumentation for one Streamlit run of a page. The sidebar toggles enable the
+    results panel and the sampling profiler for this session only.
+    """
+    import streamlit as st
+
+    show_panel = st.sidebar.checkbox("Show Performance Panel", key="_perf_panel")
+    profile = st.sidebar.checkbox("Enable Sampling Profiler", key="_perf_profile")
+    instrumentation = Instrumentation(page, profile=profile, show_panel=show_panel)
+    _current.set(instrumentation)
+    install_figure_hook()
+    return instrumentation
+
+
+@contextmanager
+def instrumented_page(page):
+    """
+    Instrument the page body run inside the with block. The profiler is stopped, the JSON line
+    logged and the current run cleared even when a rerun or error ends the script early; only a
+    completed run draws the performance panel. A page may call finish_page itself before st.stop.
+    """
+    instrumentation = page_instrumentation(page)
+    completed = False
+    try:
+        yield instrumentation
+        completed = True
+    finally:
+        if completed and not instrumentation.finished:
+            finish_page(instrumentation)
+        elif not instrumentation.finished:
+            instrumentation.finish(interrupted=True)
+            _current.set(None)
+
+
+def finish_page(instrumentation):
+    """
+    Emit the JSON log line and, when enabled, render the sidebar performance panel.
+    """
+    import streamlit as st
+
+    result = instrumentation.finish()
+    _current.set(None)
+    if instrumentation.show_panel:
+        with st.sidebar:
+            st.subheader("Performance")
+            peak = "n/a" if result["peak_rss_mb"] is None else f"{result['peak_rss_mb']:.1f} MB"
+            st.write(f"Total: {result['total_seconds'] * 1000:.1f} ms, peak RSS {peak}")
+            st.write(f"Figures created: {result['figures_created']}, frames pushed: {result['frames_pushed']}")
+            st.table({
+                "stage": list(result["stages"]),
+                "ms": [round(s["seconds"] * 1000, 2) for s in result["stages"].values()],
+                "calls": [s["count"] for s in result["stages"].values()],
+            })
+            if result["profile"]:
+                st.caption("Hottest sampled stacks")
+                st.table({"stack": [s for s, _ in result["profile"]], "samples": [n for _, n in result["profile"]]})
+    return result
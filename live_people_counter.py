@@ -1,115 +1,215 @@
-import time
+import io
 import streamlit as st
 from datetime import datetime
-import matplotlib.pyplot as plt
-import matplotlib.ticker as ticker
+import numpy as np
+import pandas as pd
+from downsample import downsample, pixel_width
+from instrumentation import ENCODE, FIGURE, SIMULATION, count_figure, instrumented_page, stage
+from playback import DEFAULT_FPS, Playback, frame_indices, run_playback, start_playback
+from population_engine import (
+    LIVE_INITIAL_BIRTHS, LIVE_PERIODS, BirthsIndex, IncrementalPeriods, births_timeline, extend_timeline, live_period_curve,
+    live_plot_mask,
+)
+from resources import live_lod
 
-# Define historical population estimates and births between benchmarks based on updated projections
-def people_ever_lived():
-    periods = [
-        {"start": -190000, "end": -50000, "population": 2, "birth_rate": 80, "births_between": 7856100000},  # 190,000 AC to 50,000 AC
-        {"start": -50000, "end": -8000, "population": 2000000, "birth_rate": 80, "births_between": 1137789769},  # 50,000 AC to 8,000 AC
-        {"start": -8000, "end": 1, "population": 5000000, "birth_rate": 80, "births_between": 46025332354},  # 8,000 AC to 1 DC
-        {"start": 1, "end": 1200, "population": 300000000, "birth_rate": 80, "births_between": 26591343000},  # 1 DC to 1200 DC
-        {"start": 1200, "end": 1650, "population": 450000000, "birth_rate": 60, "births_between": 12782002453},  # 1200 DC to 1650 DC
-        {"start": 1650, "end": 1750, "population": 500000000, "birth_rate": 60, "births_between": 3171931513},  # 1650 DC to 1750 DC
-        {"start": 1750, "end": 1850, "population": 795000000, "birth_rate": 50, "births_between": 4046240009},  # 1750 DC to 1850 DC
-        {"start": 1850, "end": 1900, "population": 1265000000, "birth_rate": 40, "births_between": 2900237856},  # 1850 DC to 1900 DC
-        {"start": 1900, "end": 1950, "population": 1656000000, "birth_rate": 31, "births_between": 3390198215},  # 1900 DC to 1950 DC
-        {"start": 1950, "end": 2000, "population": 2499000000, "birth_rate": 22, "births_between": 6064994884},  # 1950 DC to 2000 DC
-        {"start": 2000, "end": 2022, "population": 6149000000, "birth_rate": 17, "births_between": 1690275115},  # 2000 DC to 2022 DC
-        {"start": 2023, "end": 2024, "population": 8050000000, "birth_rate": 17, "births_between": 1090000000},  # 2023 DC to 2024 DC
-    ]
-
-    total_births = 2  # Start with the smallest initial value to reflect early humanity
-    population_data = {"years": [], "total_population": []}  # To store years and population for plotting
-    plot_data = {"years": [], "total_population": []}  # Plot specific years for visualization
-
-    # Streamlit display for the live counter and plot
-    counter_placeholder = st.empty()
-    plot_placeholder = st.empty()
-
-    # Hardcoded adjustment to reach the exact number for 2024
-    adjustment_factor = 117020448575 - 115930445170  # Adjust to reach 117 billion in 2024
-    adjustment_per_year = adjustment_factor / 2  # Spread adjustment across 2023 and 2024
-
-    # Calculate the total number of years and determine the sleep time per year
-    total_years = sum(period["end"] - period["start"] + 1 for period in periods)
-    total_duration = 10  # 10 seconds for the entire simulation
-    sleep_time = total_duration / total_years  # Time to sleep for each year to fit within 10 seconds
-
-    # Initialize a figure for live plotting
-    fig, ax = plt.subplots()
-    ax.set_xlabel("Year")
-    ax.set_ylabel("Total Births")
-    ax.set_title("Evolution of Total Births")
-    ax.grid(True)
-
-    # Loop through each period and accumulate the total number of births based on the data provided
-    for period in periods:
-        births_between = period["births_between"]
-
-        # Simulate the population count for each year in the period
-        for year in range(period["start"], period["end"] + 1):
-            # Calculate the average yearly births during the period
-            yearly_births = births_between / (period["end"] - period["start"] + 1)
-
-            # Apply the adjustment factor in the final two years (2023-2024)
-            if year == 2023 or year == 2024:
-                yearly_births += adjustment_per_year
-
-            total_births += yearly_births  # Add yearly births incrementally
-            population_data["years"].append(year)
-            population_data["total_population"].append(total_births)
-
-            # Display years as AC for years before 0 and DC for years after 0
-            display_year = f"{abs(year)} AC" if year < 0 else f"{year} DC"
-            
-            # Update the live counter for all years
-            counter_placeholder.markdown(f"### Year: {display_year}, Total Births So Far: **{total_births:,.0f}.**".replace(',', '.'))
-
-            # Plot every 10,000 years until year 0, then every 10 years after year 1 DC
-            if (year % 10000 == 0 and year <= 0) or (year % 10 == 0 and year > 0):
-                plot_data["years"].append(year)
-                plot_data["total_population"].append(total_births)
-
-                # Update the plot live
-                ax.clear()
-                ax.plot(plot_data["years"], plot_data["total_population"], label="Total Births", color='blue')
-                ax.set_xlabel("Year")
-                ax.set_ylabel("Total Births")
-                ax.set_title("Evolution of Total Births")
-
-                # Adapt the scale to better visualize years after year 0 (DC)
-                if year >= 0:
-                    ax.set_xlim([0, 2024])  # Focus on the years from year 0 to 2024
-                else:
-                    ax.set_xlim([-190000, 0])  # For years before 0 AC
-
-                ax.grid(True)
-
-                # Improve readability of numbers in the plot
-                ax.yaxis.set_major_formatter(ticker.FuncFormatter(lambda x, pos: f'{x:,.0f}'.replace(',', '.')))
-                ax.xaxis.set_major_locator(ticker.MaxNLocator(10))  # Set a maximum of 10 ticks on the x-axis
-                plt.xticks(rotation=45, ha="right")  # Rotate year labels by 45 degrees for better readability
-                ax.legend()
-
-                # Display the updated plot
-                plot_placeholder.pyplot(fig)
-
-            time.sleep(sleep_time)  # Ensure the sleep time fits within the 10 seconds
-
-    return total_births, population_data
+# Seconds between updates of the wall-clock counter
+TICK_SECONDS = 1.0
 
-# Streamlit UI
-st.title("Live Counter: People Who Have Ever Lived")
-st.write("This app simulates a live counter of the estimated number of people who have ever been born since the emergence of Homo sapiens.")
 
-# Start the simulation
-if st.button('Start Counting'):
-    total_people_estimate, population_data = people_ever_lived()
-    st.success(f"We estimate that {total_people_estimate:,.0f} people have ever been born on this planet.".replace(',', '.'))
+# Define historical population estimates and births between benchmarks based on updated projections
+def people_ever_lived(speed=1.0, start_year=None, fps=DEFAULT_FPS, periods=None):
+    """
+    Playback of the counter and chart over the whole timeline (see playback.start_playback).
+    Its result is (total births, {"years", "total_population"}).
+    """
+    # Plotting starts only after a click, so matplotlib is not imported on first paint
+    import matplotlib.ticker as ticker
+    from matplotlib.artist import setp
+    from matplotlib.figure import Figure
+
+    # Build the whole timeline once (or reuse an edited table's cached periods), then play it back at a fixed frame rate
+    with stage(SIMULATION):
+        years, total_births = births_timeline(LIVE_PERIODS) if periods is None else periods.series()
+    population_data = {"years": years, "total_population": total_births}  # To store years and population for plotting
+    plot_years = years[live_plot_mask(years)]  # Plot specific years for visualization
+    plot_births = total_births[live_plot_mask(years)]
+
+    total_duration = 10 / speed  # 10 seconds for the entire simulation at normal speed
+    start = 0 if start_year is None else int(np.searchsorted(years, start_year))
+    frames = frame_indices(len(years), total_duration, fps=fps, start=start)
+
+    # One figure for the whole playback; frames only update the line data. It is not registered
+    # with pyplot, so a session that disconnects mid-playback does not leak it.
+    with stage(FIGURE):
+        fig = Figure()
+        count_figure(fig)
+        ax = fig.subplots()
+        line, = ax.plot([], [], label="Total Births", color='blue')
+        ax.set_xlabel("Year")
+        ax.set_ylabel("Total Births")
+        ax.set_title("Evolution of Total Births")
+        ax.grid(True)
+
+        # Improve readability of numbers in the plot
+        ax.yaxis.set_major_formatter(ticker.FuncFormatter(lambda x, pos: f'{x:,.0f}'.replace(',', '.')))
+        ax.xaxis.set_major_locator(ticker.MaxNLocator(10))  # Set a maximum of 10 ticks on the x-axis
+        setp(ax.get_xticklabels(), rotation=45, ha="right")  # Rotate year labels by 45 degrees for better readability
+        ax.legend()
+        # Fixed margins that fit the widest labels: a tight bounding box would draw every frame twice
+        fig.subplots_adjust(left=0.23, bottom=0.2)
+    max_points = pixel_width(fig)
+    boundaries = [p["start"] for p in LIVE_PERIODS]
+
+    def prepare(index):
+        # Runs on the playback executor: counter text and the chart as PNG bytes, no Streamlit calls
+        year = int(years[index])
+
+        # Display years as AC for years before 0 and DC for years after 0
+        display_year = f"{abs(year)} AC" if year < 0 else f"{year} DC"
+        counter = f"### Year: {display_year}, Total Births So Far: **{total_births[index]:,.0f}.**".replace(',', '.')
+
+        shown = np.searchsorted(plot_years, year, side="right")
+        if shown == 0:
+            return counter, None
+        line.set_data(*downsample(plot_years[:shown], plot_births[:shown], max_points, keep=boundaries))
+
+        # Adapt the scale to better visualize years after year 0 (DC)
+        if year >= 0:
+            ax.set_xlim([0, 2024])  # Focus on the years from year 0 to 2024
+            visible = plot_births[(plot_years[:shown] >= 0).argmax():shown]
+        else:
+            ax.set_xlim([-190000, 0])  # For years before 0 AC
+            visible = plot_births[:shown]
+        ax.set_ylim(visible.min() * 0.95, visible.max() * 1.05)
+
+        with stage(ENCODE):
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format="png")
+        return counter, buffer.getvalue()
+
+    def show(frame):
+        counter, png = frame
+        st.markdown(counter)
+        if png is not None:
+            # Display the updated plot
+            st.image(png)
+
+    return Playback("live_people_counter", frames, prepare, show, fps=fps, result=(total_births[-1], population_data))
 
-# Footer section
-st.markdown("***")
-st.markdown("Developed by [Jair Ribeiro](https://www.linkedin.com/in/jairribeiro/). For more details, read the full article on [How Many Humans Have Ever Lived on Our Planet?](https://jairribeiro.medium.com/how-many-humans-have-ever-lived-on-our-planet-306f770fc2c4)")
+# Streamlit UI
+with instrumented_page("live_people_counter"):
+    st.title("Live Counter: People Who Have Ever Lived")
+    st.write("This app simulates a live counter of the estimated number of people who have ever been born since the emergence of Homo sapiens.")
+
+    # Playback controls
+    speed = st.select_slider("Playback Speed", options=[0.5, 1.0, 2.0, 5.0, 10.0], value=1.0, format_func=lambda s: f"{s:g}x")
+    start_year = st.slider("Start From Year", min_value=LIVE_PERIODS[0]["start"], max_value=LIVE_PERIODS[-1]["end"], value=LIVE_PERIODS[0]["start"], step=10)
+
+    # Editable periods; the engine lives in the session so an edit recomputes only the edited period
+    if "live_periods" not in st.session_state:
+        st.session_state.live_periods = IncrementalPeriods(LIVE_PERIODS, live_period_curve, LIVE_INITIAL_BIRTHS)
+    live_engine = st.session_state.live_periods
+    with st.expander("Edit Periods"):
+        edited = st.data_editor(pd.DataFrame(LIVE_PERIODS)[["start", "end", "births_between"]], num_rows="fixed", disabled=["start", "end"], key="live_period_editor")
+        with stage(SIMULATION):
+            recomputed = live_engine.apply(edited.to_dict("records"))
+        if recomputed:
+            st.caption(f"Recomputed {recomputed} period(s); later periods were shifted by the change in total.")
+    births_index = BirthsIndex(live_engine.periods)
+
+    # Wall-clock counter: each tick is one binary search over the periods, no timeline replay
+    @st.fragment(run_every=TICK_SECONDS)
+    def live_now():
+        now = datetime.now().astimezone()
+        with stage(SIMULATION):
+            births = births_index.births_now(now)
+        st.markdown(f"### {now:%Y-%m-%d %H:%M:%S}: **{births:,.0f}** people born so far".replace(',', '.'))
+        st.caption(f"About {births_index.births_per_second:.1f} births per second at the current birth rate.")
+
+    if st.checkbox("Show Live Counter For Right Now"):
+        live_now()
+
+    # Zoomable timeline: every view reads one level of a min/max/mean pyramid, a few hundred buckets
+    # whatever the span; years after the table continue at the current birth rate
+    EXPLORE_START = LIVE_PERIODS[0]["start"]
+    EXPLORE_END = 2050
+    MIN_SPAN = 10
+
+    def explorer_pyramid():
+        if live_engine.recomputed == len(LIVE_PERIODS):
+            return live_lod(EXPLORE_END)
+        # An edited table gets its own pyramid, rebuilt only after the next edit
+        cached = st.session_state.get("live_lod")
+        if cached is None or cached[0] != live_engine.recomputed:
+            from lod import LODPyramid
+
+            years, births = live_engine.series()
+            cached = (live_engine.recomputed, LODPyramid(*extend_timeline(years, births, births_index, EXPLORE_END)))
+            st.session_state.live_lod = cached
+        return cached[1]
+
+    def set_span(centre, width):
+        width = min(max(width, MIN_SPAN), EXPLORE_END - EXPLORE_START)
+        lo = int(round(min(max(centre - width / 2, EXPLORE_START), EXPLORE_END - width)))
+        st.session_state.timeline_span = (lo, int(lo + width))
+
+    def zoom(factor):
+        lo, hi = st.session_state.timeline_span
+        set_span((lo + hi) / 2, (hi - lo) * factor)
+
+    def pan(fraction):
+        lo, hi = st.session_state.timeline_span
+        set_span((lo + hi) / 2 + (hi - lo) * fraction, hi - lo)
+
+    @st.fragment
+    def timeline_explorer():
+        import matplotlib.pyplot as plt
+        import matplotlib.ticker as ticker
+        from projection_cache import figure_to_png
+
+        if "timeline_span" not in st.session_state:
+            st.session_state.timeline_span = (EXPLORE_START, EXPLORE_END)
+        st.slider("Visible Years", min_value=EXPLORE_START, max_value=EXPLORE_END, key="timeline_span")
+        controls = st.columns(4)
+        controls[0].button("Zoom In", on_click=zoom, args=(0.25,))
+        controls[1].button("Zoom Out", on_click=zoom, args=(4.0,))
+        controls[2].button("Pan Left", on_click=pan, args=(-0.5,))
+        controls[3].button("Pan Right", on_click=pan, args=(0.5,))
+        lo, hi = st.session_state.timeline_span
+
+        with stage(FIGURE):
+            fig, ax = plt.subplots()
+            view = explorer_pyramid().view(lo, hi, pixel_width(fig))
+            centres = (view["x_start"] + view["x_end"]) / 2
+            ax.fill_between(centres, view["min"], view["max"], color='blue', alpha=0.25, label="Min-Max per Bucket")
+            ax.plot(centres, view["mean"], color='blue', label="Total Births")
+            table_end = LIVE_PERIODS[-1]["end"]
+            if hi > table_end:
+                ax.axvspan(max(lo, table_end), hi, color='grey', alpha=0.15, label="At Current Birth Rate")
+            ax.set_xlim(lo, hi)
+            if len(view["mean"]):
+                ax.set_ylim(view["min"].min() * 0.95, view["max"].max() * 1.05)
+            ax.set_xlabel("Year")
+            ax.set_ylabel("Total Births")
+            ax.yaxis.set_major_formatter(ticker.FuncFormatter(lambda x, pos: f'{x:,.0f}'.replace(',', '.')))
+            plt.setp(ax.get_xticklabels(), rotation=45, ha="right")
+            ax.grid(True)
+            ax.legend()
+        st.image(figure_to_png(fig))
+        st.caption(f"{len(view['mean'])} buckets of up to {2 ** view['level']:,} years (level {view['level']}).")
+
+    if st.checkbox("Explore the Timeline"):
+        timeline_explorer()
+
+    # Start the simulation; frames are prepared by the playback event loop and shown by a fragment,
+    # so no script thread waits between frames
+    if st.button('Start Counting'):
+        start_playback("live_playback", people_ever_lived(speed=speed, start_year=start_year, periods=live_engine))
+    finished = run_playback("live_playback")
+    if finished is not None:
+        total_people_estimate, population_data = finished
+        st.success(f"We estimate that {total_people_estimate:,.0f} people have ever been born on this planet.".replace(',', '.'))
+
+    # Footer section
+    st.markdown("***")
+    st.markdown("Developed by [Jair Ribeiro](https://www.linkedin.com/in/jairribeiro/). For more details, read the full article on [How Many Humans Have Ever Lived on Our Planet?](https://jairribeiro.medium.com/how-many-humans-have-ever-lived-on-our-planet-306f770fc2c4)")
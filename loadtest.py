@@ -0,0 +1,292 @@
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+PAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# The server mode talks to `streamlit run` the way the browser does, with Streamlit's own
+# BackMsg/ForwardMsg protobufs over its websocket. That protocol is internal to Streamlit, so the
+# mode is tied to the version pinned in requirements.txt (which also brings the websockets client).
+STREAMLIT_VERSION = "1.65.0"
+
+# Latency percentiles reported for every run
+PERCENTILES = (50, 95, 99)
+
+# Label of the button that starts a page's animation
+START_BUTTON = "Start Counting"
+
+
+def latency_summary(values):
+    values = np.asarray(values, dtype=np.float64)
+    return {f"p{p}_ms": float(np.percentile(values, p) * 1000) for p in PERCENTILES} | {"max_ms": float(values.max() * 1000)}
+
+
+# ---------------------------------------------------------------------------
+# Real server: `streamlit run` plus websocket viewers that behave like the browser
+# ---------------------------------------------------------------------------
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def server_threads(pid):
+    # Live threads of the server process (Linux only; None elsewhere)
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            return next(int(line.split()[1]) for line in status if line.startswith("Threads:"))
+    except OSError:
+        return None
+
+
+def server_cpu_seconds(pid):
+    # User plus system CPU time of the server process (Linux only; None elsewhere)
+    try:
+        with open(f"/proc/{pid}/stat") as stat:
+            fields = stat.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except OSError:
+        return None
+
+
+def start_server(page, port, timeout=60):
+    """
+    Start `streamlit run page` headless on port and wait until it answers its health check.
+    :return: the server process
+    """
+    process = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", os.path.join(PAGE_DIR, page), "--server.headless", "true",
+         "--server.port", str(port), "--browser.gatherUsageStats", "false"],
+        cwd=PAGE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1):
+                return process
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError(f"streamlit exited with code {process.returncode}")
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"streamlit did not start within {timeout} s")
+
+
+class Viewer:
+    """
+    One browser tab on the page: runs it, presses the start button, and re-runs fragments on
+    the auto_rerun timers the server asks for, the way the frontend does. Records the fragment
+    runs (animation frames) and how long the animation took.
+    """
+
+    def __init__(self, url):
+        self.url = url
+        self.frames = 0
+        self.started = None
+        self.finished = None
+        self._timers = {}
+        self._button = None
+        self._fragment_run = False
+
+    async def _rerun(self, ws, fragment_id="", trigger=None):
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.fragment_id = fragment_id
+        msg.rerun_script.is_auto_rerun = bool(fragment_id)
+        if trigger is not None:
+            widget = msg.rerun_script.widget_states.widgets.add()
+            widget.id = trigger
+            widget.trigger_value = True
+        await ws.send(msg.SerializeToString())
+
+    async def _every(self, ws, interval, fragment_id):
+        while True:
+            await asyncio.sleep(interval)
+            await self._rerun(ws, fragment_id)
+
+    def _clear_timers(self, fragment_ids=None):
+        for fragment_id in list(self._timers if fragment_ids is None else fragment_ids):
+            timer = self._timers.pop(fragment_id, None)
+            if timer is not None:
+                timer.cancel()
+
+    async def run(self):
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+        from websockets.asyncio.client import connect
+
+        async with connect(self.url, subprotocols=["streamlit"], max_size=None) as ws:
+            await self._rerun(ws)
+            try:
+                async for data in ws:
+                    msg = ForwardMsg()
+                    msg.ParseFromString(data)
+                    kind = msg.WhichOneof("type")
+                    if kind == "new_session":
+                        self._fragment_run = bool(msg.new_session.fragment_ids_this_run)
+                        if not self._fragment_run:
+                            # A full run drops every fragment timer; the fragments it calls register them again
+                            self._clear_timers()
+                    elif kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+                        element = msg.delta.new_element
+                        if element.WhichOneof("type") == "button" and element.button.label == START_BUTTON:
+                            self._button = element.button.id
+                    elif kind == "auto_rerun":
+                        fragment_id = msg.auto_rerun.fragment_id
+                        self._clear_timers([fragment_id])
+                        self._timers[fragment_id] = asyncio.create_task(self._every(ws, msg.auto_rerun.interval, fragment_id))
+                    elif kind == "stop_auto_rerun":
+                        self._clear_timers(msg.stop_auto_rerun.fragment_ids)
+                    elif kind == "script_finished":
+                        if self._fragment_run:
+                            self.frames += 1
+                        elif self.started is None:
+                            if self._button is None:
+                                raise RuntimeError(f"No {START_BUTTON!r} button on the page")
+                            self.started = time.monotonic()
+                            await self._rerun(ws, trigger=self._button)
+                        elif not self._timers:
+                            # The full run after the last frame: the animation is over
+                            self.finished = time.monotonic()
+                            return self
+            finally:
+                self._clear_timers()
+
+
+async def _run_viewers(url, n_sessions, process, samples):
+    viewers = [Viewer(url) for _ in range(n_sessions)]
+    running = asyncio.gather(*(viewer.run() for viewer in viewers))
+    while not running.done():
+        samples.append(server_threads(process.pid))
+        await asyncio.wait([running], timeout=0.1)
+    await running
+    return viewers
+
+
+def run_server(page, n_sessions, timeout):
+    """
+    Serve page with `streamlit run` and play its animation in n_sessions concurrent viewers.
+    :return: dict with frames per second, session latency and server thread counts
+    """
+    import streamlit
+
+    if streamlit.__version__ != STREAMLIT_VERSION:
+        raise RuntimeError(f"--mode server speaks the websocket protocol of streamlit {STREAMLIT_VERSION}, "
+                           f"found {streamlit.__version__}; use --mode apptest")
+    port = _free_port()
+    process = start_server(page, port)
+    try:
+        idle_threads = server_threads(process.pid)
+        idle_cpu = server_cpu_seconds(process.pid)
+        samples = []
+        started = time.monotonic()
+        viewers = asyncio.run(asyncio.wait_for(
+            _run_viewers(f"ws://127.0.0.1:{port}/_stcore/stream", n_sessions, process, samples), timeout
+        ))
+        elapsed = time.monotonic() - started
+        cpu = server_cpu_seconds(process.pid)
+    finally:
+        process.terminate()
+        process.wait()
+    frames = sum(viewer.frames for viewer in viewers)
+    samples = [s for s in samples if s is not None]
+    return {
+        "mode": "server",
+        "page": page,
+        "sessions": n_sessions,
+        "seconds": elapsed,
+        "sessions_per_second": n_sessions / elapsed,
+        "frames_per_second": frames / elapsed,
+        "frames_per_session": frames / n_sessions,
+        "server_cpu_seconds_per_session": (cpu - idle_cpu) / n_sessions if cpu is not None else None,
+        "server_threads_idle": idle_threads,
+        "server_threads_max": max(samples) if samples else None,
+        "server_threads_mean": float(np.mean(samples)) if samples else None,
+        "session_latency": latency_summary([viewer.finished - viewer.started for viewer in viewers]),
+    }
+
+
+# ---------------------------------------------------------------------------
+# AppTest: the page script alone, without the server
+# ---------------------------------------------------------------------------
+
+def run_apptest(page, n_sessions, timeout):
+    """
+    Run n_sessions real page scripts concurrently through Streamlit's AppTest, pressing the
+    first button of each, and return the wall time of every session. AppTest does not fire
+    run_every timers, so an animation only draws its first frame.
+    """
+    import streamlit.config
+    import streamlit.logger
+    from streamlit.testing.v1 import AppTest
+
+    # Streamlit sets each of its loggers' level when it parses its config; lower them afterwards
+    streamlit.config.get_config_options()
+    streamlit.logger.set_log_level("error")
+
+    def session():
+        started = time.monotonic()
+        at = AppTest.from_file(os.path.join(PAGE_DIR, page), default_timeout=timeout).run()
+        if at.button:
+            at.button[0].click().run()
+        if at.exception:
+            raise RuntimeError(f"{page}: {at.exception[0].message}")
+        return time.monotonic() - started
+
+    with ThreadPoolExecutor(max_workers=n_sessions) as pool:
+        return list(pool.map(lambda _: session(), range(n_sessions)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure concurrent viewers of the animated pages.")
+    parser.add_argument("--sessions", type=int, default=20, help="number of concurrent sessions")
+    parser.add_argument("--mode", choices=["server", "apptest"], default="server",
+                        help="serve the page with streamlit run and connect websocket viewers, or run the script with AppTest")
+    parser.add_argument("--page", default="live_people_counter.py", help="page script to load")
+    parser.add_argument("--timeout", type=float, default=120, help="timeout of the run (server) or of each session (apptest)")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    if args.mode == "server":
+        result = run_server(args.page, args.sessions, args.timeout)
+    else:
+        started = time.monotonic()
+        latencies = run_apptest(args.page, args.sessions, args.timeout)
+        elapsed = time.monotonic() - started
+        result = {
+            "mode": "apptest",
+            "page": args.page,
+            "sessions": args.sessions,
+            "seconds": elapsed,
+            "sessions_per_second": args.sessions / elapsed,
+            "session_latency": latency_summary(latencies),
+        }
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        line = f"{result['mode']:8s} {result['sessions']:4d} sessions  {result['sessions_per_second']:8.2f} sessions/s"
+        if "frames_per_second" in result:
+            line += (f"  {result['frames_per_second']:8.1f} frames/s  {result['frames_per_session']:6.1f} frames/session"
+                     f"  server threads {result['server_threads_idle']} idle / {result['server_threads_mean']:.1f} mean / {result['server_threads_max']} max")
+            if result["server_cpu_seconds_per_session"] is not None:
+                line += f"  server CPU {result['server_cpu_seconds_per_session']:.2f} s/session"
+        latency = result["session_latency"]
+        line += f"  session p50 {latency['p50_ms']:.0f} / p95 {latency['p95_ms']:.0f} / p99 {latency['p99_ms']:.0f} ms"
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
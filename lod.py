@@ -0,0 +1,70 @@
+import numpy as np
+
+# Buckets drawn per view when no figure width is given
+DEFAULT_MAX_BUCKETS = 640
+
+
+class LODPyramid:
+    """
+    Level-of-detail pyramid over a long series sorted by x. Level 0 is the series itself; level k
+    summarises buckets of 2**k consecutive samples by their x range and the min, max and mean of y.
+    A view of any span reads only the buckets of one level that overlap it, so its cost depends on
+    the bucket budget, not on the length of the span.
+    """
+
+    def __init__(self, x, y):
+        y = np.asarray(y, dtype=np.float64)
+        level = {
+            "x_start": np.asarray(x),
+            "x_end": np.asarray(x),
+            "min": y,
+            "max": y,
+            "sum": y,
+            "count": np.ones(len(y), dtype=np.int64),
+        }
+        self.levels = [level]
+        # Each level merges neighbouring pairs of the one below; an odd last bucket carries over alone
+        while len(level["sum"]) > 1:
+            pairs = np.arange(0, len(level["sum"]), 2)
+            last = np.minimum(pairs + 1, len(level["sum"]) - 1)
+            level = {
+                "x_start": level["x_start"][pairs],
+                "x_end": level["x_end"][last],
+                "min": np.minimum.reduceat(level["min"], pairs),
+                "max": np.maximum.reduceat(level["max"], pairs),
+                "sum": np.add.reduceat(level["sum"], pairs),
+                "count": np.add.reduceat(level["count"], pairs),
+            }
+            self.levels.append(level)
+
+    def __len__(self):
+        return len(self.levels[0]["sum"])
+
+    def level_for(self, lo, hi, max_buckets=DEFAULT_MAX_BUCKETS):
+        """
+        Finest level at which the samples with lo <= x <= hi fit in about max_buckets buckets.
+        """
+        x = self.levels[0]["x_start"]
+        samples = int(np.searchsorted(x, hi, side="right") - np.searchsorted(x, lo, side="left"))
+        level = int(np.ceil(np.log2(max(samples, 1) / max_buckets))) if samples > max_buckets else 0
+        return min(level, len(self.levels) - 1)
+
+    def view(self, lo, hi, max_buckets=DEFAULT_MAX_BUCKETS):
+        """
+        Buckets overlapping [lo, hi] at the level chosen by level_for: at most max_buckets + 2 of them,
+        as slices of the stored arrays (only the mean is computed).
+        :return: dict with "level" and x_start, x_end, min, max, mean arrays
+        """
+        k = self.level_for(lo, hi, max_buckets)
+        level = self.levels[k]
+        first = np.searchsorted(level["x_end"], lo, side="left")
+        last = np.searchsorted(level["x_start"], hi, side="right")
+        buckets = slice(first, last)
+        return {
+            "level": k,
+            "x_start": level["x_start"][buckets],
+            "x_end": level["x_end"][buckets],
+            "min": level["min"][buckets],
+            "max": level["max"][buckets],
+            "mean": level["sum"][buckets] / level["count"][buckets],
+        }
@@ -0,0 +1,272 @@
+import numpy as np
+
+# Bounds used by the projection pages: P0 <= max, r <= 0.05, K <= 1.5 * max
+MAX_GROWTH_RATE = 0.05
+MAX_CAPACITY_FACTOR = 1.5
+
+# Lower bound keeping P0 and K strictly positive inside the model
+EPS = 1e-9
+
+# Levenberg-Marquardt iteration cap and relative cost tolerance of the batched fits
+LM_MAX_ITER = 200
+LM_TOL = 1e-10
+# Same for the one-parameter P0 fits of the fixed-rate scenarios
+INITIAL_POPULATION_MAX_ITER = 100
+INITIAL_POPULATION_TOL = 1e-12
+
+# Refined projection scenarios: fixed growth rate and carrying capacity as a multiple of the peak population
+SCENARIOS = {
+    "High Growth": {"r": 0.02, "K_factor": 1.2},  # Faster growth, higher carrying capacity
+    "Moderate Growth": {"r": 0.01, "K_factor": 1.0},  # Moderate growth, current carrying capacity
+    "Low Growth": {"r": 0.005, "K_factor": 0.8},  # Slower growth, reduced carrying capacity
+}
+
+# Scenario name for a free three-parameter fit instead of one of SCENARIOS
+FITTED = "Fitted"
+
+
+# Logistic growth model for population projection
+def logistic_growth(t, P0, r, K):
+    """
+    Logistic growth model function.
+    :param t: time (years)
+    :param P0: initial population (at t=0)
+    :param r: growth rate
+    :param K: carrying capacity (maximum population)
+    :return: population at time t
+    """
+    return K / (1 + ((K - P0) / P0) * np.exp(-r * t))
+
+
+def logistic_jacobian(t, P0, r, K):
+    """
+    Analytic partial derivatives of logistic_growth.
+    Parameters broadcast against t, so batched inputs of shape (n, 1) and t of shape (n, m) work.
+    :return: array of shape t.shape + (3,) with d/dP0, d/dr and d/dK
+    """
+    E = np.exp(-r * t)
+    A = (K - P0) / P0
+    D = 1 + A * E
+    D2 = D * D
+    d_P0 = K * K * E / (P0 * P0 * D2)
+    d_r = K * A * t * E / D2
+    d_K = 1 / D - K * E / (P0 * D2)
+    return np.stack(np.broadcast_arrays(d_P0, d_r, d_K), axis=-1)
+
+
+def stack_series(series):
+    """
+    Pad every (t, population) pair to a common length for the batched fitters.
+    :return: (t, y, mask) arrays of shape (len(series), longest series), mask marking real observations
+    """
+    m = max(len(p) for _, p in series)
+    t = np.zeros((len(series), m))
+    y = np.zeros((len(series), m))
+    mask = np.zeros((len(series), m), dtype=bool)
+    for i, (ti, yi) in enumerate(series):
+        t[i, :len(ti)] = ti
+        y[i, :len(yi)] = yi
+        mask[i, :len(yi)] = True
+    return t, y, mask
+
+
+def logistic_bounds(y, mask):
+    """
+    Per-series (P0, r, K) bounds of the projection pages: P0 <= peak, r <= MAX_GROWTH_RATE,
+    K <= MAX_CAPACITY_FACTOR * peak, everything above EPS.
+    :return: (lower, upper) arrays of shape (n, 3)
+    """
+    peak = np.where(mask, y, -np.inf).max(axis=1)
+    lower = np.full((len(y), 3), EPS)
+    upper = np.column_stack([peak, np.full(len(y), MAX_GROWTH_RATE), MAX_CAPACITY_FACTOR * peak])
+    return lower, upper
+
+
+def warm_start(t, y, mask, lower, upper):
+    """
+    Starting guesses from the linearized model ln(K / P - 1) = ln(A) - r t,
+    with K placed a little above the largest observation.
+    """
+    peak = upper[:, 0]
+    K = np.clip(1.2 * peak, lower[:, 2], upper[:, 2])[:, None]
+    z = np.log(np.maximum(K / np.where(mask, y, 1) - 1, EPS))
+    w = mask.astype(float)
+    n = w.sum(axis=1, keepdims=True)
+    t_mean = (w * t).sum(axis=1, keepdims=True) / n
+    z_mean = (w * z).sum(axis=1, keepdims=True) / n
+    cov = (w * (t - t_mean) * (z - z_mean)).sum(axis=1, keepdims=True)
+    var = (w * (t - t_mean) ** 2).sum(axis=1, keepdims=True)
+    slope = cov / np.where(var > 0, var, 1)
+    intercept = z_mean - slope * t_mean
+    r = -slope
+    P0 = K / (1 + np.exp(intercept))
+    guess = np.column_stack([P0[:, 0], r[:, 0], K[:, 0]])
+    # Keep the guess strictly inside the bounds so every parameter can move
+    span = upper - lower
+    return np.clip(guess, lower + 0.01 * span, upper - 0.01 * span)
+
+
+def levenberg_marquardt(function, jacobian, t, y, mask, params, lower, upper, max_iter=LM_MAX_ITER, tol=LM_TOL):
+    """
+    Batched, bounded Levenberg-Marquardt shared by every growth model.
+    Every iteration evaluates residuals and the analytic Jacobian for all series in one
+    array operation and solves the small normal equations of every series together.
+    Parameters whose lower and upper bounds are equal are held fixed.
+    :param function: model(t, *params) with parameters of shape (n, 1) broadcasting against t (n, m)
+    :param jacobian: jacobian(t, *params) returning shape (n, m, p)
+    :param params: starting values (n, p), strictly inside the bounds
+    :return: (params array (n, p); residual sum of squares (n,); function evaluations (n,))
+    """
+    n, k = params.shape
+    params = params.copy()
+    identity = np.eye(k)
+    fixed = lower == upper
+
+    def columns(p):
+        return [p[:, i:i + 1] for i in range(k)]
+
+    def cost(p):
+        r = np.where(mask, function(t, *columns(p)) - y, 0)
+        return r, (r * r).sum(axis=1)
+
+    residual, current = cost(params)
+    damping = np.full(n, 1e-3)
+    nfev = np.ones(n, dtype=np.int64)
+    active = np.ones(n, dtype=bool)
+
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        J = jacobian(t, *columns(params)) * mask[..., None]
+        JTr = np.einsum("nmi,nm->ni", J, residual)
+        # Freeze parameters sitting on a bound whose descent direction points outside it
+        frozen = ((params <= lower) & (JTr > 0)) | ((params >= upper) & (JTr < 0)) | fixed
+        J = J * ~frozen[:, None, :]
+        JTr = JTr * ~frozen
+        JTJ = np.einsum("nmi,nmj->nij", J, J) + frozen[:, :, None] * identity
+        # Scale damping with the diagonal (Marquardt) so parameters of different magnitude are balanced
+        diag = np.einsum("nii->ni", JTJ)
+        A = JTJ + (damping[:, None] * np.maximum(diag, EPS))[:, :, None] * identity
+        step = -np.linalg.solve(A, JTr[..., None])[..., 0]
+        candidate = np.clip(params + step, lower, upper)
+
+        new_residual, new_cost = cost(candidate)
+        nfev += active
+        improved = active & (new_cost < current)
+        params[improved] = candidate[improved]
+        residual[improved] = new_residual[improved]
+        change = np.abs(current - new_cost) / np.maximum(current, EPS)
+        current = np.where(improved, new_cost, current)
+        damping = np.where(improved, damping / 3, damping * 4)
+
+        converged = (improved & (change < tol)) | (damping > 1e12)
+        active &= ~converged
+
+    return params, current, nfev
+
+
+def fit_logistic_batch(series, max_iter=LM_MAX_ITER, tol=LM_TOL):
+    """
+    Fit logistic_growth to many series at once with the batched, bounded Levenberg-Marquardt.
+    :param series: list of (t, population) array pairs, t measured from the first year
+    :return: (params array (n, 3) of P0, r, K; residual sum of squares (n,); function evaluations (n,))
+    """
+    t, y, mask = stack_series(series)
+    lower, upper = logistic_bounds(y, mask)
+    params = warm_start(t, y, mask, lower, upper)
+    return levenberg_marquardt(logistic_growth, logistic_jacobian, t, y, mask, params, lower, upper, max_iter, tol)
+
+
+def fit_initial_population_batch(series, r, K, max_iter=INITIAL_POPULATION_MAX_ITER, tol=INITIAL_POPULATION_TOL):
+    """
+    Fit only P0 of logistic_growth with r and K fixed per series, bounded to (0, max population]
+    like the refined page's curve_fit. A batched Levenberg-Marquardt on the single parameter.
+    :param series: list of (t, population) array pairs, t measured from the first year
+    :param r: growth rate per series
+    :param K: carrying capacity per series
+    :return: P0 array (n,)
+    """
+    t, y, mask = stack_series(series)
+    r = np.asarray(r, dtype=float)[:, None]
+    K = np.asarray(K, dtype=float)[:, None]
+    upper = np.where(mask, y, -np.inf).max(axis=1)
+    P0 = np.clip(np.where(mask[:, 0], y[:, 0], upper), EPS, upper)
+
+    def cost(p):
+        residual = np.where(mask, logistic_growth(t, p[:, None], r, K) - y, 0)
+        return residual, (residual * residual).sum(axis=1)
+
+    residual, current = cost(P0)
+    damping = np.full(len(P0), 1e-3)
+    active = np.ones(len(P0), dtype=bool)
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        J = logistic_jacobian(t, P0[:, None], r, K)[..., 0] * mask
+        JTJ = (J * J).sum(axis=1)
+        step = -(J * residual).sum(axis=1) / np.maximum(JTJ * (1 + damping), EPS)
+        candidate = np.clip(P0 + step, EPS, upper)
+        new_residual, new_cost = cost(candidate)
+        improved = active & (new_cost < current)
+        change = np.abs(current - new_cost) / np.maximum(current, EPS)
+        P0[improved] = candidate[improved]
+        residual[improved] = new_residual[improved]
+        current = np.where(improved, new_cost, current)
+        damping = np.where(improved, damping / 3, damping * 4)
+        active &= ~((improved & (change < tol)) | (damping > 1e12) | (~improved & (step == 0)))
+    return P0
+
+
+def fit_scenario(series, scenario):
+    """
+    Fit every series under one scenario. FITTED fits P0, r and K freely; a SCENARIOS entry
+    fixes r and K (relative to the series peak) and fits P0 only, as the refined projection page does.
+    :param series: list of (t, population) array pairs, t measured from the first year
+    :return: params array (n, 3) of P0, r, K
+    """
+    if scenario == FITTED:
+        params, _, _ = fit_logistic_batch(series)
+        return params
+    preset = SCENARIOS[scenario]
+    r = np.full(len(series), preset["r"])
+    K = preset["K_factor"] * np.array([max(p) for _, p in series])
+    return np.column_stack([fit_initial_population_batch(series, r, K), r, K])
+
+
+def project_series(series, scenario, t):
+    """
+    Fit every series under one scenario (see fit_scenario) and evaluate the fitted curves.
+    :param t: evaluation times of shape (n, m), measured from each series' first year
+    :return: array (n, m) of projected population
+    """
+    params = fit_scenario(series, scenario)
+    return logistic_growth(t, params[:, :1], params[:, 1:2], params[:, 2:])
+
+
+def fit_countries(population_data, countries=None):
+    """
+    Fit the logistic model to every country in a historical_population_data style dict.
+    :param population_data: {country: {"years": array, "population": array}}
+    :param countries: optional subset of country names
+    :return: DataFrame indexed by country with columns P0, r, K, residual, nfev
+    """
+    countries = list(population_data) if countries is None else list(countries)
+    series = [
+        (population_data[c]["years"] - population_data[c]["years"][0], np.asarray(population_data[c]["population"], dtype=float))
+        for c in countries
+    ]
+    import pandas as pd
+
+    params, residual, nfev = fit_logistic_batch(series)
+    table = pd.DataFrame(params, index=pd.Index(countries, name="country"), columns=["P0", "r", "K"])
+    table["residual"] = residual
+    table["nfev"] = nfev
+    return table
+
+
+def fit_logistic(years, population):
+    """
+    Fit a single country; returns (P0, r, K) like curve_fit's popt.
+    """
+    params, _, _ = fit_logistic_batch([(years - years[0], np.asarray(population, dtype=float))])
+    return params[0]
@@ -0,0 +1,96 @@
+import numpy as np
+from logistic_fit import logistic_growth
+
+# Relative standard deviations of the sampled parameters
+GROWTH_RATE_SPREAD = 0.2
+CAPACITY_SPREAD = 0.1
+VITAL_RATE_SPREAD = 0.1
+
+# Number of draws evaluated per array operation; bounds memory at large draw counts
+DEFAULT_CHUNK_SIZE = 20_000
+
+# Histogram resolution used for the streaming percentile reduction
+HISTOGRAM_BINS = 4096
+
+DEFAULT_QUANTILES = (0.05, 0.5, 0.95)
+
+
+def draw_parameters(rng, n, r, K, birth_rate, death_rate, migration_rate):
+    """
+    Sample n parameter sets around the scenario values.
+    Vital rates are per 1000 people and are combined into a net yearly rate deviation
+    from the central estimate.
+    :return: (r, K, net_rate_deviation) arrays of shape (n, 1)
+    """
+    r_draws = rng.normal(r, GROWTH_RATE_SPREAD * abs(r), n)
+    K_draws = np.maximum(rng.normal(K, CAPACITY_SPREAD * abs(K), n), 1e-9)
+    rates = np.array([birth_rate, death_rate, migration_rate])
+    vital = rng.normal(rates, VITAL_RATE_SPREAD * np.abs(rates), (n, 3))
+    net_deviation = ((vital[:, 0] - vital[:, 1] + vital[:, 2]) - (rates[0] - rates[1] + rates[2])) / 1000
+    return r_draws[:, None], K_draws[:, None], net_deviation[:, None]
+
+
+def evaluate_draws(t, P0, r, K, net_deviation, t_now):
+    """
+    Evaluate the logistic projection for every draw in one broadcast operation.
+    Vital-rate deviations compound from t_now onwards as a multiplicative drift.
+    :return: array of shape (draws, len(t))
+    """
+    drift = np.exp(net_deviation * np.maximum(t - t_now, 0))
+    return logistic_growth(t, P0, r, K) * drift
+
+
+class StreamingQuantiles:
+    """
+    Per-column quantiles over rows that arrive in chunks.
+    Bin edges are fixed from the first chunk (with a margin); later values outside
+    the range fall into the edge bins. Memory is O(columns * bins) whatever the row count.
+    """
+
+    def __init__(self, bins=HISTOGRAM_BINS, margin=0.5):
+        self.bins = bins
+        self.margin = margin
+        self.lower = None
+        self.width = None
+        self.counts = None
+
+    def update(self, values):
+        if self.counts is None:
+            low = values.min(axis=0)
+            high = values.max(axis=0)
+            pad = self.margin * np.maximum(high - low, 1e-12)
+            self.lower = low - pad
+            self.width = (high + pad - self.lower) / self.bins
+            self.counts = np.zeros((values.shape[1], self.bins), dtype=np.int64)
+        index = np.clip(((values - self.lower) / self.width).astype(np.int64), 0, self.bins - 1)
+        columns = np.broadcast_to(np.arange(values.shape[1]), index.shape)
+        np.add.at(self.counts, (columns.ravel(), index.ravel()), 1)
+
+    def quantiles(self, qs):
+        cumulative = np.cumsum(self.counts, axis=1)
+        total = cumulative[:, -1:]
+        result = np.empty((len(qs), self.counts.shape[0]))
+        for i, q in enumerate(qs):
+            # First bin whose cumulative count reaches q, reported at its centre
+            bin_index = (cumulative < q * total).sum(axis=1)
+            result[i] = self.lower + (bin_index + 0.5) * self.width
+        return result
+
+
+def projection_bands(t, P0, r, K, birth_rate, death_rate, migration_rate, t_now,
+                     n_draws=100_000, chunk_size=DEFAULT_CHUNK_SIZE, seed=0, quantiles=DEFAULT_QUANTILES):
+    """
+    Monte Carlo uncertainty bands for a logistic projection.
+    :param t: projection times (years since the first historical year)
+    :param t_now: time of the latest observation; vital-rate drift starts here
+    :param seed: seed for numpy.random.default_rng, for reproducible bands
+    :return: array of shape (len(quantiles), len(t))
+    """
+    rng = np.random.default_rng(seed)
+    t = np.asarray(t, dtype=np.float64)
+    reducer = StreamingQuantiles()
+    for start in range(0, n_draws, chunk_size):
+        n = min(chunk_size, n_draws - start)
+        r_draws, K_draws, net_deviation = draw_parameters(rng, n, r, K, birth_rate, death_rate, migration_rate)
+        reducer.update(evaluate_draws(t, P0, r_draws, K_draws, net_deviation, t_now))
+    return reducer.quantiles(quantiles)
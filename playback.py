@@ -0,0 +1,243 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import instrumentation
+
+# Default frame rate of animated pages, about what one frame costs on a single core: a frame is
+# prepared (a live counter PNG takes ~50 ms alone, several times that with other viewers) and then
+# shown by a fragment run (~100 ms of server time), so a few concurrent viewers still keep up
+DEFAULT_FPS = 2
+
+# Threads preparing the frames of every playback in the process; between frames a playback only
+# waits on the event loop
+PLAYBACK_WORKERS = 4
+
+# A playback none of whose frames has been shown for this long has lost its browser and stops
+STALL_SECONDS = 10.0
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def frame_indices(n_items, duration, fps=DEFAULT_FPS, start=0):
+    """
+    Pick the timeline positions shown by a fixed-rate animation.
+    :param n_items: length of the precomputed timeline
+    :param duration: playback length in seconds
+    :param fps: frames per second
+    :param start: first timeline position to show (used for seeking)
+    :return: int array of increasing positions, ending at the last item
+    """
+    n_frames = max(int(duration * fps), 1)
+    remaining = max(n_items - start, 1)
+    return np.unique(np.linspace(start, start + remaining - 1, min(n_frames, remaining)).round().astype(np.int64))
+
+
+def frame_due(n_frames, elapsed, fps=DEFAULT_FPS):
+    """
+    Index of the frame due elapsed seconds into a playback; the last one once time is up.
+    """
+    return min(max(int(elapsed * fps), 0), n_frames - 1)
+
+
+def event_loop():
+    """
+    The process-wide asyncio loop running the frame loop of every session's playback, started on
+    first use in a daemon thread. Frames are prepared on its default executor of PLAYBACK_WORKERS threads.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            loop.set_default_executor(ThreadPoolExecutor(max_workers=PLAYBACK_WORKERS, thread_name_prefix="playback"))
+            threading.Thread(target=loop.run_forever, name="playback-loop", daemon=True).start()
+            _loop = loop
+        return _loop
+
+
+class Playback:
+    """
+    One animation at a fixed frame rate. Each frame is prepared by prepare(frame), which must not
+    call Streamlit (figures are rendered, chart data downsampled), and put on the page by
+    show(payload). step() prepares and shows the frame due by the clock, never going back, so slow
+    frames are skipped instead of stretching the playback.
+
+    On a page, play() is the frame loop (see start_playback): an asyncio task on event_loop() that
+    awaits each frame's preparation and the time until the next one. A fragment re-run every frame
+    interval only shows the newest prepared frame, so a session holds a script thread for the
+    length of one show() per frame, and at most PLAYBACK_WORKERS threads prepare frames for all
+    sessions together.
+    """
+
+    def __init__(self, name, frames, prepare, show, fps=DEFAULT_FPS, result=None, clock=time.monotonic):
+        """
+        :param name: page name, used for the playback's instrumentation log line
+        :param frames: sequence of frame payloads (e.g. timeline positions)
+        :param result: value run_playback returns once the last frame has been shown
+        :param clock: time source in seconds; the playback starts on the first frame prepared
+        """
+        self.frames = frames
+        self.prepare = prepare
+        self.show = show
+        self.fps = fps
+        self.result = result
+        self.clock = clock
+        self.started = None
+        self.shown = -1
+        # Newest prepared frame as (position, payload); the frame loop waits until it is shown
+        self.pending = None
+        self.current = None
+        self.future = None
+        # True until the run that started the playback shows it; later full runs stop it
+        self.fresh = True
+        self._loop = None
+        self._shown_event = None
+        # Frames run outside the page body, so the playback keeps its own timings
+        self.perf = instrumentation.Instrumentation(f"{name}.playback")
+
+    @property
+    def finished(self):
+        return self.shown == len(self.frames) - 1
+
+    def due(self):
+        """
+        Position of the frame due now, never going back; the first call starts the clock.
+        """
+        if self.started is None:
+            self.started = self.clock()
+        return max(self.shown, frame_due(len(self.frames), self.clock() - self.started, self.fps))
+
+    def delay(self):
+        """
+        Seconds until the frame after the one shown is due; 0 when it is already late.
+        """
+        if self.started is None:
+            return 0.0
+        return max((self.shown + 1) / self.fps - (self.clock() - self.started), 0.0)
+
+    def prepare_frame(self, position):
+        with instrumentation.active(self.perf):
+            return position, self.prepare(self.frames[position])
+
+    def show_frame(self, frame):
+        position, payload = frame
+        with instrumentation.active(self.perf), instrumentation.stage(instrumentation.FRAME):
+            self.show(payload)
+        self.shown = position
+        self.current = frame
+
+    def step(self):
+        """
+        Prepare and show the frame due now, synchronously.
+        :return: True once the last frame has been shown
+        """
+        self.show_frame(self.prepare_frame(self.due()))
+        return self.finished
+
+    def show_next(self):
+        """
+        Show the newest prepared frame, or the current one again while the next is not ready
+        (a fragment run replaces everything the previous run drew).
+        :return: True once the last frame has been shown
+        """
+        frame, self.pending = self.pending, None
+        if frame is not None:
+            self.show_frame(frame)
+            self._loop.call_soon_threadsafe(self._shown_event.set)
+        elif self.current is not None:
+            self.show(self.current[1])
+        return self.finished
+
+    async def play(self):
+        """
+        Frame loop: wait for the previous frame to be shown and for the next one to be due, then
+        prepare it on the executor. Ends after the last frame, when cancelled, or when no frame
+        has been shown for STALL_SECONDS (the browser went away or left the page). Emits the
+        playback's JSON log line however it ends.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._shown_event = asyncio.Event()
+        self._shown_event.set()
+        try:
+            while not self.finished:
+                try:
+                    await asyncio.wait_for(self._shown_event.wait(), STALL_SECONDS)
+                except asyncio.TimeoutError:
+                    return
+                if self.finished:
+                    return
+                self._shown_event.clear()
+                await asyncio.sleep(self.delay())
+                self.pending = await asyncio.to_thread(self.prepare_frame, self.due())
+        finally:
+            self.close()
+
+    def stop(self):
+        """
+        Cancel the frame loop.
+        """
+        if self.future is not None:
+            self.future.cancel()
+
+    def close(self):
+        """
+        Emit the playback's JSON log line.
+        """
+        return self.perf.finish(interrupted=not self.finished)
+
+
+def start_playback(key, playback):
+    """
+    Store a new playback under key in the session, stopping one still running, and start its
+    frame loop on event_loop(). run_playback(key), later in the same run, shows it.
+    """
+    import streamlit as st
+
+    stop_playback(key)
+    playback.future = asyncio.run_coroutine_threadsafe(playback.play(), event_loop())
+    st.session_state[key] = playback
+
+
+def stop_playback(key):
+    """
+    Stop and forget the session's playback stored under key, if any.
+    """
+    import streamlit as st
+
+    playback = st.session_state.pop(key, None)
+    if playback is not None:
+        playback.stop()
+
+
+def run_playback(key):
+    """
+    Show the playback stored under key, if any; pages call this on every run, where the
+    animation should appear. Any full run other than the one that started the playback and the
+    one after its last frame stops it, so a rerun cancels the animation.
+    :return: the playback's result on the run after its last frame (that frame is shown once
+             more and the playback removed from the session), else None
+    """
+    import streamlit as st
+
+    playback = st.session_state.get(key)
+    if playback is None:
+        return None
+    if playback.finished:
+        del st.session_state[key]
+        playback.show(playback.current[1])
+        return playback.result
+    if not playback.fresh:
+        stop_playback(key)
+        return None
+    playback.fresh = False
+
+    @st.fragment(run_every=1.0 / playback.fps)
+    def tick():
+        if playback.show_next():
+            # A full rerun no longer calls the fragment, which stops its timer, and shows the result
+            st.rerun()
+
+    tick()
+    return None
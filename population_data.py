@@ -0,0 +1,11 @@
+from population_store import LazyCountryTable, PopulationStore
+
+# Country datasets are compiled from the CSV sources in data/ into memory-mapped columns
+# (see population_store.py); each country's rows are only read when it is first accessed.
+store = PopulationStore.open()
+
+# Historical population data (in millions) plus vital rates (per 1000 people) per country
+historical_population_data = LazyCountryTable(store, "series", store.country_series)
+
+# Historical growth periods used by the births-ever counters
+countries_data = LazyCountryTable(store, "periods", store.country_periods)
@@ -0,0 +1,488 @@
+from datetime import datetime, timezone
+
+import numpy as np
+
+# -----------------------------------------------
+# Period table used by the "Global Population Evolution" page
+# -----------------------------------------------
+GLOBAL_PERIODS = [
+    {"year": 190000, "population": 2, "birth_rate": 80},  # 190,000 BCE
+    {"year": 50000, "population": 2_000_000, "birth_rate": 80},  # 50,000 BCE
+    {"year": 8000, "population": 5_000_000, "birth_rate": 80},  # 8000 BCE
+    {"year": 1, "population": 300_000_000, "birth_rate": 80},  # 1 CE
+    {"year": 1200, "population": 450_000_000, "birth_rate": 60},  # 1200 CE
+    {"year": 1650, "population": 500_000_000, "birth_rate": 60},  # 1650 CE
+    {"year": 1750, "population": 795_000_000, "birth_rate": 50},  # 1750 CE
+    {"year": 1850, "population": 1_265_000_000, "birth_rate": 40},  # 1850 CE
+    {"year": 1900, "population": 1_656_000_000, "birth_rate": 40},  # 1900 CE
+    {"year": 1950, "population": 2_499_000_000, "birth_rate": 31},  # 1950 CE
+    {"year": 2000, "population": 6_149_000_000, "birth_rate": 22},  # 2000 CE
+    {"year": 2022, "population": 7_963_500_000, "birth_rate": 17},  # 2022 CE
+    {"year": 2035, "population": 8_899_000_000, "birth_rate": 16},  # 2035 CE (projection)
+    {"year": 2050, "population": 9_752_000_000, "birth_rate": 14},  # 2050 CE (projection)
+]
+
+# Share of each year's births that is added to the population (see app.py)
+POPULATION_GROWTH_SHARE = 0.5
+
+
+def period_arrays(periods):
+    """
+    Convert a list of period dicts into the arrays used by the closed-form engine.
+    :param periods: list of {"year", "population", "birth_rate"} dicts, in order
+    :return: (start_years, year_counts, initial_population, birth_rate) arrays, one entry per period
+    """
+    start = np.array([p["year"] for p in periods[:-1]], dtype=np.int64)
+    end = np.array([p["year"] for p in periods[1:]], dtype=np.int64)
+    # Periods whose end is not after their start simulate no years, as with range(start, end)
+    counts = np.maximum(end - start, 0)
+    population = np.array([p["population"] for p in periods[:-1]], dtype=np.float64)
+    birth_rate = np.array([p["birth_rate"] for p in periods[:-1]], dtype=np.float64) / 1000
+    return start, counts, population, birth_rate
+
+
+def _sample_indices(total_years, start_years, counts, resolution):
+    # Global year indices (0 .. total_years-1) at which the series is evaluated
+    if total_years == 0:
+        return np.zeros(0, dtype=np.int64)
+    if resolution == "yearly":
+        return np.arange(total_years, dtype=np.int64)
+    if resolution == "decadal":
+        offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        # Keep every year divisible by 10 plus the final year of the series
+        chunks = []
+        for start, offset, count in zip(start_years, offsets, counts):
+            if count == 0:
+                continue
+            first = (-start) % 10
+            chunks.append(offset + np.arange(first, count, 10, dtype=np.int64))
+        chunks.append(np.array([total_years - 1], dtype=np.int64))
+        return np.unique(np.concatenate(chunks))
+    if isinstance(resolution, (int, np.integer)) and resolution > 0:
+        points = min(int(resolution), total_years)
+        return np.unique(np.linspace(0, total_years - 1, points).round().astype(np.int64))
+    raise ValueError(f"Unknown resolution: {resolution!r}")
+
+
+def people_ever_lived_series(periods=GLOBAL_PERIODS, resolution="yearly"):
+    """
+    Closed-form evaluation of the yearly births recurrence used by app.py.
+
+    Within a period the population grows geometrically by g = 1 + share * birth_rate
+    each year, so the births up to year k of the period are p0 * b * (g**k - 1) / (g - 1).
+    Only the requested sample points are evaluated, so the cost does not depend on
+    the number of simulated years.
+
+    :param periods: list of period dicts (see GLOBAL_PERIODS)
+    :param resolution: "yearly", "decadal" or a number of evenly spaced points
+    :return: (total born in billions, {"years": int32 array, "total_population": float64 array in billions})
+    """
+    start_years, counts, population, birth_rate = period_arrays(periods)
+    index = _sample_indices(int(counts.sum()), start_years, counts, resolution)
+    years, cumulative, total = _evaluate_series(start_years, counts, population, birth_rate, index)
+    return total / 1e9, {"years": years, "total_population": cumulative / 1e9}
+
+
+def people_ever_lived_chunks(periods=GLOBAL_PERIODS, chunk_years=100_000):
+    """
+    Yearly people_ever_lived_series in fixed-size chunks, so exports never hold the whole series.
+    :return: generator of (years int32 array, total people in billions) pairs
+    """
+    start_years, counts, population, birth_rate = period_arrays(periods)
+    total_years = int(counts.sum())
+    for first in range(0, total_years, chunk_years):
+        index = np.arange(first, min(first + chunk_years, total_years), dtype=np.int64)
+        years, cumulative, _ = _evaluate_series(start_years, counts, population, birth_rate, index)
+        yield years, cumulative / 1e9
+
+
+def _evaluate_series(start_years, counts, population, birth_rate, index):
+    # Years and cumulative births at global year indices, plus the grand total
+    growth = 1 + POPULATION_GROWTH_SHARE * birth_rate
+
+    # Births in every complete period and the running total before each period starts
+    period_births = geometric_births(population, birth_rate, growth, counts)
+    births_before = np.concatenate(([0.0], np.cumsum(period_births)[:-1]))
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    # Empty periods share their offset with the next one, so search on the period ends
+    period = np.searchsorted(np.cumsum(counts), index, side="right")
+    local_year = index - offsets[period]
+
+    cumulative = births_before[period] + geometric_births(
+        population[period], birth_rate[period], growth[period], local_year + 1
+    )
+    return (start_years[period] + local_year).astype(np.int32), cumulative, float(period_births.sum())
+
+
+def geometric_births(population, birth_rate, growth, years):
+    """
+    Births over the first years of a period whose population grows by a constant factor a year:
+    the sum of population * birth_rate * growth**k for k in 0 .. years-1. Arguments broadcast.
+    :param birth_rate: births per person per year
+    :param growth: yearly population growth factor (1 for a constant population)
+    :return: total births, shaped like the broadcast arguments
+    """
+    rate = growth - 1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        factor = np.where(rate > 0, np.expm1(years * np.log(growth)) / np.where(rate > 0, rate, 1), years)
+    return population * birth_rate * factor
+
+
+# -----------------------------------------------
+# Period table used by the live counter (births between benchmarks)
+# -----------------------------------------------
+LIVE_PERIODS = [
+    {"start": -190000, "end": -50000, "population": 2, "birth_rate": 80, "births_between": 7856100000},  # 190,000 AC to 50,000 AC
+    {"start": -50000, "end": -8000, "population": 2000000, "birth_rate": 80, "births_between": 1137789769},  # 50,000 AC to 8,000 AC
+    {"start": -8000, "end": 1, "population": 5000000, "birth_rate": 80, "births_between": 46025332354},  # 8,000 AC to 1 DC
+    {"start": 1, "end": 1200, "population": 300000000, "birth_rate": 80, "births_between": 26591343000},  # 1 DC to 1200 DC
+    {"start": 1200, "end": 1650, "population": 450000000, "birth_rate": 60, "births_between": 12782002453},  # 1200 DC to 1650 DC
+    {"start": 1650, "end": 1750, "population": 500000000, "birth_rate": 60, "births_between": 3171931513},  # 1650 DC to 1750 DC
+    {"start": 1750, "end": 1850, "population": 795000000, "birth_rate": 50, "births_between": 4046240009},  # 1750 DC to 1850 DC
+    {"start": 1850, "end": 1900, "population": 1265000000, "birth_rate": 40, "births_between": 2900237856},  # 1850 DC to 1900 DC
+    {"start": 1900, "end": 1950, "population": 1656000000, "birth_rate": 31, "births_between": 3390198215},  # 1900 DC to 1950 DC
+    {"start": 1950, "end": 2000, "population": 2499000000, "birth_rate": 22, "births_between": 6064994884},  # 1950 DC to 2000 DC
+    {"start": 2000, "end": 2022, "population": 6149000000, "birth_rate": 17, "births_between": 1690275115},  # 2000 DC to 2022 DC
+    {"start": 2023, "end": 2024, "population": 8050000000, "birth_rate": 17, "births_between": 1090000000},  # 2023 DC to 2024 DC
+]
+
+# Start with the smallest initial value to reflect early humanity
+LIVE_INITIAL_BIRTHS = 2
+
+# Hardcoded adjustment to reach 117 billion in 2024, spread across 2023 and 2024
+LIVE_ADJUSTMENT = 117020448575 - 115930445170
+LIVE_ADJUSTMENT_YEARS = (2023, 2024)
+
+
+def births_timeline(periods=LIVE_PERIODS):
+    """
+    Build the cumulative-births timeline of the live counter in one vectorized pass.
+    Every period spreads births_between evenly over its (inclusive) years, so the
+    timeline is a prefix sum over the repeated yearly births.
+    :param periods: list of {"start", "end", "births_between"} dicts, in order
+    :return: (years int32 array, cumulative births float64 array), one entry per simulated year
+    """
+    start = np.array([p["start"] for p in periods], dtype=np.int64)
+    end = np.array([p["end"] for p in periods], dtype=np.int64)
+    births_between = np.array([p["births_between"] for p in periods], dtype=np.float64)
+    counts = end - start + 1
+
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    period = np.repeat(np.arange(len(periods)), counts)
+    years = start[period] + (np.arange(counts.sum()) - offsets[period])
+    yearly_births = (births_between / counts)[period]
+
+    adjusted = np.isin(years, LIVE_ADJUSTMENT_YEARS)
+    yearly_births[adjusted] += LIVE_ADJUSTMENT / len(LIVE_ADJUSTMENT_YEARS)
+
+    return years.astype(np.int32), LIVE_INITIAL_BIRTHS + np.cumsum(yearly_births)
+
+
+def live_plot_mask(years):
+    """
+    Years that the live counter draws on its chart: every 10,000 years until
+    year 0, then every 10 years after year 1 DC.
+    """
+    return ((years % 10000 == 0) & (years <= 0)) | ((years % 10 == 0) & (years > 0))
+
+
+# Mean Gregorian year, used to turn the yearly birth rate into a per-second rate
+SECONDS_PER_YEAR = 365.2425 * 24 * 3600
+
+
+class BirthsIndex:
+    """
+    Prefix-sum index over a live-counter period table.
+    Answers "births so far at instant t" (t in fractional years; year y spans [y, y + 1))
+    with one binary search over the period starts plus linear interpolation inside the
+    period, so no yearly timeline has to be built or replayed.
+    """
+
+    def __init__(self, periods=LIVE_PERIODS):
+        self.start = np.array([p["start"] for p in periods], dtype=np.float64)
+        counts = np.array([p["end"] - p["start"] + 1 for p in periods], dtype=np.float64)
+        self.end = self.start + counts
+        births = np.array([p["births_between"] for p in periods], dtype=np.float64)
+
+        # Fold the 2023-2024 adjustment into the periods holding those years
+        adjustment_years = np.array(LIVE_ADJUSTMENT_YEARS, dtype=np.float64)
+        inside = (adjustment_years[:, None] >= self.start) & (adjustment_years[:, None] < self.end)
+        births += inside.sum(axis=0) * LIVE_ADJUSTMENT / len(LIVE_ADJUSTMENT_YEARS)
+
+        self.yearly = births / counts
+        self.before = LIVE_INITIAL_BIRTHS + np.concatenate(([0.0], np.cumsum(births)[:-1]))
+        self.total = LIVE_INITIAL_BIRTHS + births.sum()
+
+        # Current birth rate (births per year) used to extend the count past the table
+        last = periods[-1]
+        self.current_rate = last["population"] * last["birth_rate"] / 1000
+
+    def births_as_of(self, t):
+        """
+        Cumulative births at instant t (scalar or array of fractional years).
+        At an integer year y + 1 this equals the timeline value for year y in births_timeline.
+        """
+        t = np.asarray(t, dtype=np.float64)
+        period = np.clip(np.searchsorted(self.start, t, side="right") - 1, 0, len(self.start) - 1)
+        result = self.before[period] + self.yearly[period] * self._elapsed(period, t)
+        # A period may end in the year the next one starts; that shared year holds births of both
+        previous = np.maximum(period - 1, 0)
+        unfinished = (self.end[previous] - self.start[previous]) - self._elapsed(previous, t)
+        result = result - np.where(period > 0, self.yearly[previous] * unfinished, 0.0)
+        # Before the first period nothing but the initial value; after the last, the current rate
+        result = np.where(t < self.start[0], self.before[0], result)
+        result = np.where(t > self.end[-1], self.total + self.current_rate * (t - self.end[-1]), result)
+        return result if result.ndim else float(result)
+
+    def _elapsed(self, period, t):
+        # Years of the period already simulated at instant t
+        return np.clip(t - self.start[period], 0, self.end[period] - self.start[period])
+
+    def births_now(self, now=None):
+        """
+        Births so far at a wall-clock moment (default: now, in UTC).
+        """
+        return self.births_as_of(fractional_year(now))
+
+    @property
+    def births_per_second(self):
+        return self.current_rate / SECONDS_PER_YEAR
+
+
+def extend_timeline(years, births, index, end):
+    """
+    Continue a births_timeline past its last year up to end (inclusive) at the current birth
+    rate, as the wall-clock counter does.
+    :param index: BirthsIndex of the same period table
+    """
+    future = np.arange(int(years[-1]) + 1, end + 1, dtype=np.int32)
+    return np.concatenate((years, future)), np.concatenate((births, index.births_as_of(future + 1.0)))
+
+
+def fractional_year(moment=None):
+    """
+    Convert a datetime (default: now, UTC) into a fractional year such as 2024.5.
+    """
+    moment = moment or datetime.now(timezone.utc)
+    start = moment.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+    end = start.replace(year=start.year + 1)
+    return moment.year + (moment - start).total_seconds() / (end - start).total_seconds()
+
+
+# -----------------------------------------------
+# Multi-region births engine over a structured period table
+# -----------------------------------------------
+# Crude birth rate assumed by the country counters when a period does not give one
+COUNTRY_CRUDE_BIRTH_RATE = 30 / 1000
+
+PERIOD_DTYPE = np.dtype([
+    ("region", "U64"),
+    ("start", np.int32),
+    ("end", np.int32),
+    ("rate", np.float64),
+    ("initial_population", np.float64),
+    ("crude_birth_rate", np.float64),
+])
+
+
+def period_table(countries_data, crude_birth_rate=COUNTRY_CRUDE_BIRTH_RATE):
+    """
+    Flatten a {region: [period dicts]} mapping (the countries_data layout) into one structured array.
+    Rows of a region stay contiguous and in order, as region_births expects.
+    """
+    rows = [
+        (region, p["start"], p["end"], p["growth_rate"], p["initial_population"], p.get("crude_birth_rate", crude_birth_rate))
+        for region, periods in countries_data.items()
+        for p in periods
+    ]
+    return np.array(rows, dtype=PERIOD_DTYPE)
+
+
+def region_starts(table):
+    """
+    Row offsets at which a new region begins in a PERIOD_DTYPE table.
+    """
+    region = table["region"]
+    return np.concatenate(([0], np.flatnonzero(region[1:] != region[:-1]) + 1))
+
+
+def region_years(table):
+    """
+    First and last year of every region, one reduceat per column instead of a mask per region.
+    :return: (region names, first years, last years) in table order
+    """
+    if len(table) == 0:
+        return np.array([], dtype=PERIOD_DTYPE["region"]), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    starts = region_starts(table)
+    return table["region"][starts], np.minimum.reduceat(table["start"], starts), np.maximum.reduceat(table["end"], starts)
+
+
+def _partial_births(table, years_simulated):
+    """
+    Closed-form births of every period after simulating years_simulated of its years (broadcasts).
+    Each year adds population * crude_birth_rate with the population growing by (1 + rate) per year.
+    """
+    growth = 1 + table["rate"]
+    first_year_births = table["initial_population"] * table["crude_birth_rate"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        geometric = (growth ** years_simulated - 1) / table["rate"]
+    # Zero growth degenerates to a linear sum
+    geometric = np.where(table["rate"] == 0, years_simulated, geometric)
+    return first_year_births * geometric
+
+
+def region_births(table):
+    """
+    Total births per region in one vectorized pass, without expanding years.
+    :param table: structured array with PERIOD_DTYPE, rows grouped by region
+    :return: (region names, total births per region) in table order
+    """
+    if len(table) == 0:
+        return np.array([], dtype=PERIOD_DTYPE["region"]), np.zeros(0)
+    # Periods are inclusive of both ends, matching the year-by-year counters
+    per_period = _partial_births(table, (table["end"] - table["start"] + 1).astype(np.float64))
+    starts = region_starts(table)
+    return table["region"][starts], np.add.reduceat(per_period, starts)
+
+
+def region_births_at(table, years):
+    """
+    Cumulative births of every region by the end of each requested year.
+    Matches the last value of country_births_series at that year, including years shared by
+    the end of one period and the start of the next.
+    :param years: 1-D array of years
+    :return: (region names, array of shape (regions, years))
+    """
+    if len(table) == 0:
+        return np.array([], dtype=PERIOD_DTYPE["region"]), np.zeros((0, len(years)))
+    years = np.asarray(years)
+    counts = (table["end"] - table["start"] + 1)[:, None]
+    simulated = np.clip(years[None, :] - table["start"][:, None] + 1, 0, counts).astype(np.float64)
+    per_period = _partial_births(table[:, None], simulated)
+    starts = region_starts(table)
+    return table["region"][starts], np.add.reduceat(per_period, starts, axis=0)
+
+
+# -----------------------------------------------
+# Incremental recomputation for editable period tables
+# -----------------------------------------------
+def global_periods(rows=GLOBAL_PERIODS):
+    """
+    Periods of a GLOBAL_PERIODS style table as editable rows: every row runs from its year
+    until (excluding) the next row's year with its own population and birth rate.
+    """
+    return [
+        {"start": a["year"], "end": b["year"], "population": a["population"], "birth_rate": a["birth_rate"]}
+        for a, b in zip(rows[:-1], rows[1:])
+    ]
+
+
+def global_period_curve(period):
+    # Years of range(start, end) and the births accumulated inside the period by each of them
+    years = np.arange(period["start"], max(period["end"], period["start"]), dtype=np.int64)
+    birth_rate = period["birth_rate"] / 1000
+    growth = 1 + POPULATION_GROWTH_SHARE * birth_rate
+    return years, geometric_births(period["population"], birth_rate, growth, np.arange(1, len(years) + 1))
+
+
+def live_period_curve(period):
+    # Inclusive years with births_between spread evenly, plus the hardcoded 2023-2024 adjustment
+    years = np.arange(period["start"], period["end"] + 1, dtype=np.int64)
+    yearly = np.full(len(years), period["births_between"] / len(years), dtype=np.float64)
+    yearly[np.isin(years, LIVE_ADJUSTMENT_YEARS)] += LIVE_ADJUSTMENT / len(LIVE_ADJUSTMENT_YEARS)
+    return years, np.cumsum(yearly)
+
+
+def country_period_curve(period, crude_birth_rate=COUNTRY_CRUDE_BIRTH_RATE):
+    # Inclusive years of a countries_data period with births = population * crude birth rate
+    years = np.arange(period["start"], period["end"] + 1, dtype=np.int64)
+    population = period["initial_population"] * (1 + period["growth_rate"]) ** (years - period["start"])
+    return years, np.cumsum(population * crude_birth_rate)
+
+
+def resolution_indices(years, resolution):
+    """
+    Positions of an already materialized yearly series kept at a chart resolution
+    (the same points people_ever_lived_series evaluates).
+    """
+    if len(years) == 0 or resolution == "yearly":
+        return np.arange(len(years), dtype=np.int64)
+    if resolution == "decadal":
+        return np.union1d(np.flatnonzero(years % 10 == 0), [len(years) - 1])
+    if isinstance(resolution, (int, np.integer)) and resolution > 0:
+        return np.unique(np.linspace(0, len(years) - 1, min(int(resolution), len(years))).round().astype(np.int64))
+    raise ValueError(f"Unknown resolution: {resolution!r}")
+
+
+class IncrementalPeriods:
+    """
+    Cumulative births over an editable period table.
+    Every period's local curve (births accumulated inside the period) is cached; the series is
+    the local curves shifted by the running total of all earlier periods. Editing one period
+    recomputes only its curve and moves every later period by the change in its total.
+    """
+
+    def __init__(self, periods, curve, initial=0.0):
+        """
+        :param periods: list of period dicts, in order
+        :param curve: function period dict -> (years, births accumulated inside the period)
+        :param initial: births before the first period
+        """
+        self.periods = [dict(p) for p in periods]
+        self.curve = curve
+        self.initial = initial
+        self._curves = [None] * len(self.periods)
+        self.totals = np.array([self._local(i)[1][-1] if len(self._local(i)[1]) else 0.0 for i in range(len(self.periods))])
+        self.recomputed = len(self.periods)
+        self._series = None
+
+    def _local(self, i):
+        if self._curves[i] is None:
+            self._curves[i] = self.curve(self.periods[i])
+        return self._curves[i]
+
+    def update(self, i, **changes):
+        """
+        Change fields of period i; only that period is recomputed.
+        """
+        if all(self.periods[i].get(k) == v for k, v in changes.items()):
+            return
+        self.periods[i].update(changes)
+        self._curves[i] = None
+        years, births = self._local(i)
+        self.totals[i] = births[-1] if len(births) else 0.0
+        self.recomputed += 1
+        self._series = None
+
+    def apply(self, periods):
+        """
+        Bring the table in line with an edited copy, recomputing only periods that changed.
+        :return: number of periods recomputed
+        """
+        if len(periods) != len(self.periods):
+            raise ValueError("The edited table must keep the number of periods")
+        before = self.recomputed
+        for i, period in enumerate(periods):
+            self.update(i, **period)
+        return self.recomputed - before
+
+    @property
+    def offsets(self):
+        # Births before each period: the prefix sum of the period totals
+        return self.initial + np.concatenate(([0.0], np.cumsum(self.totals)[:-1]))
+
+    @property
+    def total(self):
+        return self.initial + float(self.totals.sum())
+
+    def series(self):
+        """
+        (years int32 array, cumulative births) over all periods, reusing every cached period curve.
+        """
+        if self._series is None:
+            curves = [self._local(i) for i in range(len(self.periods))]
+            years = np.concatenate([y for y, _ in curves] or [np.zeros(0, dtype=np.int64)])
+            births = np.concatenate([b + offset for (_, b), offset in zip(curves, self.offsets)] or [np.zeros(0)])
+            self._series = (years.astype(np.int32), births)
+        return self._series
@@ -0,0 +1,242 @@
+import hashlib
+import json
+import os
+from collections.abc import Mapping
+from contextlib import contextmanager
+
+import numpy as np
+
+from population_engine import COUNTRY_CRUDE_BIRTH_RATE, PERIOD_DTYPE
+
+# CSV sources checked into the repository and the directory of compiled columns
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+STORE_DIR = os.path.join(DATA_DIR, "store")
+SOURCES = {
+    "series": "country_series.csv",  # country, year, population (millions)
+    "rates": "country_rates.csv",  # country, birth_rate, death_rate, migration_rate (per 1000 people)
+    "periods": "country_periods.csv",  # country, start, end, growth_rate, initial_population, label
+}
+STORE_VERSION = 1
+
+# Columns written per table, with their on-disk dtypes
+COLUMNS = {
+    "series": {"year": np.int32, "population": np.float64},
+    "rates": {"birth_rate": np.float64, "death_rate": np.float64, "migration_rate": np.float64},
+    "periods": {"start": np.int32, "end": np.int32, "growth_rate": np.float64, "initial_population": np.float64, "label": str},
+}
+
+
+def source_fingerprint(data_dir=DATA_DIR):
+    """
+    Fingerprint of the CSV sources (size and modification time, not contents, so checking
+    it stays cheap for large sources); the compiled store is rebuilt when it changes.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(STORE_VERSION).encode())
+    for name in sorted(SOURCES.values()):
+        stat = os.stat(os.path.join(data_dir, name))
+        digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()
+
+
+def compiled_fingerprint(store_dir=STORE_DIR):
+    """
+    Source fingerprint the compiled store was built from, or None if there is no store.
+    """
+    try:
+        with open(os.path.join(store_dir, "index.json")) as f:
+            return json.load(f).get("source_fingerprint")
+    except (OSError, ValueError):
+        return None
+
+
+@contextmanager
+def store_lock(store_dir=STORE_DIR):
+    """
+    Exclusive lock over rebuilding the store, held through a lock file next to it, so
+    processes importing population_data at the same time rebuild one after the other.
+    """
+    with open(f"{store_dir}.lock", "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if os.name == "nt":
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def build_store(data_dir=DATA_DIR, store_dir=STORE_DIR, only_if_stale=False):
+    """
+    Compile the CSV sources into one .npy file per column plus an index.json holding the
+    country -> (row offset, row count) index of every table.
+    Rows of a country are stored contiguously so a country is a slice of each column.
+    Runs under store_lock; with only_if_stale, a store that another process brought up to date
+    while this one waited for the lock is kept as it is.
+    """
+    with store_lock(store_dir):
+        if only_if_stale and compiled_fingerprint(store_dir) == source_fingerprint(data_dir):
+            return
+        _build_store(data_dir, store_dir)
+
+
+def _build_store(data_dir, store_dir):
+    import pandas as pd
+
+    tmp_dir = f"{store_dir}.tmp{os.getpid()}"
+    os.makedirs(tmp_dir, exist_ok=True)
+    index = {"version": STORE_VERSION, "source_fingerprint": source_fingerprint(data_dir), "tables": {}}
+    for table, filename in SOURCES.items():
+        frame = pd.read_csv(os.path.join(data_dir, filename), keep_default_na=False)
+        # Stable grouping keeps the first-seen country order and each country's row order
+        order = list(dict.fromkeys(frame["country"]))
+        frame["_order"] = frame["country"].map({c: i for i, c in enumerate(order)})
+        frame = frame.sort_values("_order", kind="stable")
+        counts = frame.groupby("_order", sort=True).size().to_numpy()
+        offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        index["tables"][table] = {
+            "rows": len(frame),
+            "countries": {c: [int(o), int(n)] for c, o, n in zip(order, offsets, counts)},
+        }
+        for column, dtype in COLUMNS[table].items():
+            np.save(os.path.join(tmp_dir, f"{table}.{column}.npy"), frame[column].to_numpy().astype(dtype))
+    with open(os.path.join(tmp_dir, "index.json"), "w") as f:
+        json.dump(index, f)
+
+    # Swap the new store in; store_lock keeps other writers out between the two renames
+    if os.path.exists(store_dir):
+        old_dir = f"{store_dir}.old{os.getpid()}"
+        os.replace(store_dir, old_dir)
+        os.replace(tmp_dir, store_dir)
+        for name in os.listdir(old_dir):
+            os.remove(os.path.join(old_dir, name))
+        os.rmdir(old_dir)
+    else:
+        os.replace(tmp_dir, store_dir)
+
+
+class PopulationStore:
+    """
+    Read-only view of the compiled store.
+    Columns are memory-mapped on first use, so opening the store only reads index.json and
+    every process shares the same page-cache copy of the data.
+    """
+
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, "index.json")) as f:
+            self.index = json.load(f)
+        self._columns = {}
+
+    @classmethod
+    def open(cls, data_dir=DATA_DIR, store_dir=STORE_DIR):
+        """
+        Open the store, compiling it first if it is missing or older than the CSV sources.
+        """
+        if compiled_fingerprint(store_dir) != source_fingerprint(data_dir):
+            build_store(data_dir, store_dir, only_if_stale=True)
+        return cls(store_dir)
+
+    def column(self, table, column):
+        key = (table, column)
+        if key not in self._columns:
+            self._columns[key] = np.load(os.path.join(self.store_dir, f"{table}.{column}.npy"), mmap_mode="r")
+        return self._columns[key]
+
+    def countries(self, table="series"):
+        return list(self.index["tables"][table]["countries"])
+
+    def rows(self, table, country):
+        """
+        Slice of the rows belonging to country in table.
+        """
+        offset, count = self.index["tables"][table]["countries"][country]
+        return slice(offset, offset + count)
+
+    def country_series(self, country):
+        """
+        Population series and vital rates of one country, in the historical_population_data layout.
+        """
+        rows = self.rows("series", country)
+        entry = {
+            "years": self.column("series", "year")[rows],
+            "population": self.column("series", "population")[rows],
+        }
+        if country in self.index["tables"]["rates"]["countries"]:
+            rate_row = self.rows("rates", country).start
+            for column in COLUMNS["rates"]:
+                entry[column] = float(self.column("rates", column)[rate_row])
+        return entry
+
+    def country_periods(self, country):
+        """
+        Period table of one country, in the countries_data layout.
+        """
+        rows = self.rows("periods", country)
+        columns = {c: self.column("periods", c)[rows] for c in COLUMNS["periods"] if c != "label"}
+        return [
+            {
+                "start": int(columns["start"][i]),
+                "end": int(columns["end"][i]),
+                "growth_rate": float(columns["growth_rate"][i]),
+                "initial_population": float(columns["initial_population"][i]),
+            }
+            for i in range(rows.stop - rows.start)
+        ]
+
+    def period_table(self, crude_birth_rate=COUNTRY_CRUDE_BIRTH_RATE):
+        """
+        All period rows as one PERIOD_DTYPE structured array, read column by column
+        (no per-country dicts), for the multi-region births engine.
+        """
+        countries = self.index["tables"]["periods"]["countries"]
+        table = np.empty(self.index["tables"]["periods"]["rows"], dtype=PERIOD_DTYPE)
+        table["region"] = np.repeat(list(countries), [count for _, count in countries.values()])
+        table["start"] = self.column("periods", "start")
+        table["end"] = self.column("periods", "end")
+        table["rate"] = self.column("periods", "growth_rate")
+        table["initial_population"] = self.column("periods", "initial_population")
+        table["crude_birth_rate"] = crude_birth_rate
+        return table
+
+
+class LazyCountryTable(Mapping):
+    """
+    Dict-like view over one store table; a country's rows are read only when it is accessed.
+    """
+
+    def __init__(self, store, table, loader):
+        self._store = store
+        self._table = table
+        self._loader = loader
+        self._cache = {}
+
+    def __getitem__(self, country):
+        if country not in self._cache:
+            if country not in self._store.index["tables"][self._table]["countries"]:
+                raise KeyError(country)
+            self._cache[country] = self._loader(country)
+        return self._cache[country]
+
+    def __iter__(self):
+        return iter(self._store.countries(self._table))
+
+    def __len__(self):
+        return len(self._store.index["tables"][self._table]["countries"])
+
+
+if __name__ == "__main__":
+    build_store()
+    store = PopulationStore()
+    for table, info in store.index["tables"].items():
+        print(f"{table}: {info['rows']} rows, {len(info['countries'])} countries")
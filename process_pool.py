@@ -0,0 +1,87 @@
+import io
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import context, reduction, spawn, util
+
+try:
+    from multiprocessing import forkserver
+    from multiprocessing.popen_forkserver import Popen as ForkServerPopen
+except ImportError:  # Windows
+    forkserver = None
+
+# Workers start from a fresh interpreter rather than a fork of the caller: pages run pools inside
+# the multithreaded Streamlit server, and a fork taken while another thread holds a lock can leave
+# the child deadlocked. forkserver is not available on Windows, where spawn is the default anyway.
+START_METHOD = "forkserver" if forkserver is not None else "spawn"
+
+# Module a worker imports as its __main__ when the caller's __main__ is a Streamlit page
+WORKER_MAIN = "process_pool"
+
+
+def worker_preparation_data(name):
+    """
+    What a new worker process needs from its parent (see multiprocessing.spawn.get_preparation_data).
+    A fresh worker re-runs the parent's __main__; a script the interpreter ran guards itself with
+    `if __name__ == "__main__"`, but under `streamlit run` (or AppTest) __main__ is the page, a
+    module Streamlit builds without a loader, which would run again in every worker. Such workers
+    import WORKER_MAIN instead.
+    """
+    data = spawn.get_preparation_data(name)
+    if getattr(sys.modules["__main__"], "__loader__", None) is None:
+        data.pop("init_main_from_path", None)
+        data["init_main_from_name"] = WORKER_MAIN
+    return data
+
+
+if forkserver is not None:
+    class _WorkerPopen(ForkServerPopen):
+        # popen_forkserver.Popen._launch (unchanged from 3.10 to 3.13), sending worker_preparation_data
+        def _launch(self, process_obj):
+            prep_data = worker_preparation_data(process_obj._name)
+            buf = io.BytesIO()
+            context.set_spawning_popen(self)
+            try:
+                reduction.dump(prep_data, buf)
+                reduction.dump(process_obj, buf)
+            finally:
+                context.set_spawning_popen(None)
+
+            self.sentinel, w = forkserver.connect_to_new_process(self._fds)
+            # The duplicate write end tells the child when the parent goes away
+            _parent_w = os.dup(w)
+            self.finalizer = util.Finalize(self, util.close_fds, (_parent_w, self.sentinel))
+            with open(w, "wb", closefd=True) as f:
+                f.write(buf.getbuffer())
+            self.pid = forkserver.read_signed(self.sentinel)
+
+    class _WorkerProcess(context.ForkServerProcess):
+        @staticmethod
+        def _Popen(process_obj):
+            return _WorkerPopen(process_obj)
+
+    class WorkerContext(context.ForkServerContext):
+        """
+        forkserver context whose processes start with worker_preparation_data.
+        """
+        Process = _WorkerProcess
+
+    def worker_context():
+        return WorkerContext()
+else:
+    def worker_context():
+        # spawn workers still re-run a page's __main__ on Windows
+        return multiprocessing.get_context(START_METHOD)
+
+
+class ProcessPool(ProcessPoolExecutor):
+    """
+    ProcessPoolExecutor safe to use from a Streamlit page. Workers are started with START_METHOD,
+    on submit (one per submit while none is idle), and import WORKER_MAIN rather than the page as
+    their __main__; submitted functions must live in importable modules. In a command-line run
+    they import the caller's script as usual, so its functions can be submitted too.
+    """
+
+    def __init__(self, max_workers=None):
+        super().__init__(max_workers=max_workers, mp_context=worker_context())
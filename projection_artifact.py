@@ -0,0 +1,266 @@
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+
+from population_store import DATA_DIR
+from projection_cache import array_key
+
+# Precomputed fits and yearly projections of every country, built offline and memory-mapped
+# read-only by the projection pages, so every server process shares one page-cache copy.
+ARTIFACT_PATH = os.path.join(DATA_DIR, "projections.bin")
+ARTIFACT_VERSION = 1
+
+# File layout: MAGIC, header length (little-endian uint64), JSON header, then the arrays,
+# each starting at a multiple of ALIGNMENT from the start of the data section
+MAGIC = b"POPPROJ\x00"
+ALIGNMENT = 64
+
+# Projected years stored for every country (inclusive)
+YEARS = np.arange(2023, 2101)
+
+
+def _align(n):
+    return -(-n // ALIGNMENT) * ALIGNMENT
+
+
+def _source_digest(functions):
+    # Changes to a starting guess move the fitted optimum, so the guesses' code is part of the definitions
+    return hashlib.blake2b("".join(inspect.getsource(f) for f in functions).encode(), digest_size=8).hexdigest()
+
+
+def definitions_hash(years=YEARS):
+    """
+    Hash of everything besides the input data that the stored numbers depend on: the format
+    version, the scenario presets, the growth-model registry and bounds, the fitter settings
+    (iteration caps, tolerances and warm starts), and the years. A mismatch makes the whole
+    artifact stale.
+    """
+    import growth_models
+    import logistic_fit
+
+    guesses = [model.guess or type(model).problem for model in growth_models.GROWTH_MODELS.values()]
+    definitions = {
+        "version": ARTIFACT_VERSION,
+        "scenarios": logistic_fit.SCENARIOS,
+        "logistic_bounds": [logistic_fit.MAX_GROWTH_RATE, logistic_fit.MAX_CAPACITY_FACTOR],
+        "models": {name: list(model.parameters) for name, model in growth_models.GROWTH_MODELS.items()},
+        "zoo_bounds": [growth_models.ZOO_MAX_GROWTH_RATE, growth_models.ZOO_MAX_CAPACITY_FACTOR,
+                       list(growth_models.RICHARDS_SHAPE_BOUNDS),
+                       growth_models.PIECEWISE_MIN_BEFORE, growth_models.PIECEWISE_MIN_AFTER],
+        "fitter": {
+            "max_iter": logistic_fit.LM_MAX_ITER,
+            "tol": logistic_fit.LM_TOL,
+            "initial_population": [logistic_fit.INITIAL_POPULATION_MAX_ITER, logistic_fit.INITIAL_POPULATION_TOL],
+            "warm_start": _source_digest([logistic_fit.warm_start, *guesses]),
+        },
+        "years": [int(years[0]), int(years[-1])],
+    }
+    return hashlib.blake2b(json.dumps(definitions, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+
+def input_hash(years, population):
+    # Key of one country's entries: they are stale as soon as its series changes
+    return array_key(np.asarray(years, dtype=np.int64), np.asarray(population, dtype=np.float64))
+
+
+def compute_artifact_arrays(population_data, years=YEARS):
+    """
+    Fit every country under every scenario and growth model, in one batch per scenario and model.
+    :return: (countries, scenarios, models, {array name: array})
+    """
+    from growth_models import GROWTH_MODELS, fit_models
+    from logistic_fit import FITTED, SCENARIOS, fit_scenario, logistic_growth
+
+    countries = list(population_data)
+    series = [
+        (population_data[c]["years"] - population_data[c]["years"][0],
+         np.asarray(population_data[c]["population"], dtype=float))
+        for c in countries
+    ]
+    t = years[None, :] - np.array([population_data[c]["years"][0] for c in countries])[:, None]
+
+    scenarios = [FITTED, *SCENARIOS]
+    scenario_params = np.stack([fit_scenario(series, scenario) for scenario in scenarios], axis=1)
+    scenario_projections = logistic_growth(
+        t[:, None, :], scenario_params[..., :1], scenario_params[..., 1:2], scenario_params[..., 2:]
+    )
+
+    models = list(GROWTH_MODELS)
+    fits = fit_models(series, models)
+    width = max(model.n_params for model in GROWTH_MODELS.values())
+    model_params = np.full((len(countries), len(models), width), np.nan)
+    model_rss = np.empty((len(countries), len(models)))
+    model_projections = np.full((len(countries), len(models), len(years)), np.nan)
+    for m, name in enumerate(models):
+        params, rss = fits[name]
+        model_params[:, m, :params.shape[1]] = params
+        model_rss[:, m] = rss
+        fitted = np.isfinite(rss)
+        if fitted.any():
+            model_projections[fitted, m] = GROWTH_MODELS[name].predict(params[fitted], t[fitted])
+    arrays = {
+        "scenario_params": scenario_params,
+        "scenario_projections": scenario_projections,
+        "model_params": model_params,
+        "model_rss": model_rss,
+        "model_projections": model_projections,
+    }
+    return countries, scenarios, models, arrays
+
+
+def build_artifact(population_data=None, path=ARTIFACT_PATH, years=YEARS):
+    """
+    Precompute every country's fits and projections and write them as one artifact file.
+    The file is written next to path and renamed over it, so readers never see a partial file.
+    :return: header dict of the written artifact
+    """
+    if population_data is None:
+        from population_data import historical_population_data as population_data
+
+    countries, scenarios, models, arrays = compute_artifact_arrays(population_data, years)
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = _align(offset)
+        layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += array.nbytes
+    header = {
+        "version": ARTIFACT_VERSION,
+        "definitions_hash": definitions_hash(years),
+        "years": [int(years[0]), int(years[-1])],
+        "countries": countries,
+        "input_hashes": [input_hash(population_data[c]["years"], population_data[c]["population"]) for c in countries],
+        "scenarios": scenarios,
+        "models": models,
+        "arrays": layout,
+    }
+    encoded = json.dumps(header).encode()
+    data_start = _align(len(MAGIC) + 8 + len(encoded))
+
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(encoded)))
+        f.write(encoded)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(np.ascontiguousarray(array).tobytes())
+    os.replace(tmp_path, path)
+    return header
+
+
+class ProjectionArtifact:
+    """
+    Read-only, memory-mapped view of a projection artifact.
+    Entries are looked up per country and only returned while the country's input hash still
+    matches its current series.
+    """
+
+    def __init__(self, path=ARTIFACT_PATH):
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a projection artifact")
+            (length,) = struct.unpack("<Q", f.read(8))
+            self.header = json.loads(f.read(length))
+        data_start = _align(len(MAGIC) + 8 + length)
+        self._buffer = np.memmap(path, dtype=np.uint8, mode="r")
+        self.arrays = {
+            name: np.ndarray(tuple(spec["shape"]), dtype=np.dtype(spec["dtype"]), buffer=self._buffer,
+                             offset=data_start + spec["offset"])
+            for name, spec in self.header["arrays"].items()
+        }
+        start, end = self.header["years"]
+        self.years = np.arange(start, end + 1)
+        self.countries = {country: i for i, country in enumerate(self.header["countries"])}
+        self.scenarios = self.header["scenarios"]
+        self.models = self.header["models"]
+
+    @classmethod
+    def open(cls, path=ARTIFACT_PATH):
+        """
+        Open the artifact, or return None if it is missing, unreadable or built for other
+        definitions (format version, scenarios, models or years).
+        """
+        try:
+            artifact = cls(path)
+        except (OSError, ValueError):
+            return None
+        if artifact.header.get("definitions_hash") != definitions_hash(artifact.years):
+            return None
+        return artifact
+
+    def row(self, country, years, population):
+        """
+        Row of a country whose stored entries were computed from exactly this series, else None.
+        """
+        i = self.countries.get(country)
+        if i is None or self.header["input_hashes"][i] != input_hash(years, population):
+            return None
+        return i
+
+    def scenario_params(self, row, scenario):
+        """
+        Stored (P0, r, K) of one country under one scenario.
+        """
+        return self.arrays["scenario_params"][row, self.scenarios.index(scenario)]
+
+    def scenario_projection(self, row, scenario, years):
+        """
+        Stored projection of one scenario at the requested years (a subset of self.years).
+        """
+        years = np.asarray(years)
+        outside = years[~np.isin(years, self.years)]
+        if outside.size:
+            raise ValueError(f"years {outside.tolist()} are not stored in the artifact "
+                             f"({self.years[0]}-{self.years[-1]})")
+        return self.arrays["scenario_projections"][row, self.scenarios.index(scenario), years - self.years[0]]
+
+    def model_fits(self, rows):
+        """
+        Growth-model fits of several rows in the layout of growth_models.fit_models.
+        """
+        from growth_models import GROWTH_MODELS
+
+        params = self.arrays["model_params"][rows]
+        rss = self.arrays["model_rss"][rows]
+        return {
+            name: (params[:, m, :GROWTH_MODELS[name].n_params], rss[:, m])
+            for m, name in enumerate(self.models)
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute every country's fits and projections into one artifact.")
+    parser.add_argument("--output", default=ARTIFACT_PATH, help="artifact path")
+    parser.add_argument("--check", action="store_true", help="only report whether the artifact is current")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        from population_data import historical_population_data
+
+        artifact = ProjectionArtifact.open(args.output)
+        if artifact is None:
+            print(f"{args.output}: missing or built for other definitions")
+            return 1
+        stale = [c for c in historical_population_data
+                 if artifact.row(c, historical_population_data[c]["years"], historical_population_data[c]["population"]) is None]
+        print(f"{args.output}: {len(artifact.countries)} countries, {len(stale)} stale or missing"
+              + (f" ({', '.join(stale)})" if stale else ""))
+        return 1 if stale else 0
+
+    started = time.perf_counter()
+    header = build_artifact(path=args.output)
+    print(f"Wrote {len(header['countries'])} countries x ({len(header['scenarios'])} scenarios + "
+          f"{len(header['models'])} models) to {args.output} in {time.perf_counter() - started:.2f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
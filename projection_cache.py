@@ -0,0 +1,93 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from instrumentation import ENCODE, stage
+
+# Default number of (country, scenario) results kept per process
+DEFAULT_MAX_ENTRIES = 128
+
+
+def array_key(*values):
+    """
+    Stable cache key for a mix of NumPy arrays and scalars.
+    Arrays are hashed by dtype, shape and raw bytes, so equal data gives equal keys
+    regardless of object identity.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for value in values:
+        if isinstance(value, np.ndarray):
+            array = np.ascontiguousarray(value)
+            digest.update(f"{array.dtype.str}{array.shape}".encode())
+            digest.update(array.tobytes())
+        else:
+            digest.update(repr(value).encode())
+        digest.update(b"|")
+    return digest.hexdigest()
+
+
+class LRUCache:
+    """
+    Thread-safe, size-bounded cache with least-recently-used eviction.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        """
+        Return the cached value for key, computing and storing it on a miss.
+        """
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+
+def figure_to_png(fig, dpi=100):
+    """
+    Render a matplotlib figure to PNG bytes once so cached views skip re-encoding.
+    The figure is closed afterwards to release its memory.
+    """
+    import matplotlib.pyplot as plt
+
+    buffer = io.BytesIO()
+    with stage(ENCODE):
+        fig.savefig(buffer, format="png", dpi=dpi, bbox_inches="tight")
+    plt.close(fig)
+    return buffer.getvalue()
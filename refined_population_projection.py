@@ -1,135 +1,184 @@
 import numpy as np
 import streamlit as st
-import matplotlib.pyplot as plt
-from scipy.optimize import curve_fit
-
-# Historical population data (in millions) for the countries
-historical_population_data = {
-    "Brazil": {
-        "years": np.array([1800, 1850, 1900, 1950, 2000, 2023]),
-        "population": np.array([4.5, 9.1, 17.4, 51.9, 174.4, 215.3]),  # in millions
-        "birth_rate": 14.2,  # per 1000 people
-        "death_rate": 6.7,   # per 1000 people
-        "migration_rate": 0.3  # net migration per 1000 people
-    },
-    "Poland": {
-        "years": np.array([1800, 1850, 1900, 1950, 2000, 2023]),
-        "population": np.array([7.3, 9.2, 20.0, 25.0, 38.6, 38.0]),  # in millions
-        "birth_rate": 9.5,   # per 1000 people
-        "death_rate": 10.7,  # per 1000 people
-        "migration_rate": -0.4  # net migration per 1000 people
-    },
-    "Sweden": {
-        "years": np.array([1800, 1850, 1900, 1950, 2000, 2023]),
-        "population": np.array([2.3, 3.5, 5.1, 7.0, 8.9, 10.6]),  # in millions
-        "birth_rate": 11.4,  # per 1000 people
-        "death_rate": 9.3,   # per 1000 people
-        "migration_rate": 5.3  # net migration per 1000 people
-    },
-    "Italy": {
-        "years": np.array([1800, 1850, 1900, 1950, 2000, 2023]),
-        "population": np.array([17.3, 24.7, 33.2, 47.1, 57.3, 59.0]),  # in millions
-        "birth_rate": 7.6,   # per 1000 people
-        "death_rate": 10.7,  # per 1000 people
-        "migration_rate": 2.2  # net migration per 1000 people
-    },
-    "USA": {
-        "years": np.array([1800, 1850, 1900, 1950, 2000, 2023]),
-        "population": np.array([5.3, 23.1, 76.2, 151.3, 282.2, 336.0]),  # in millions
-        "birth_rate": 12.4,  # per 1000 people
-        "death_rate": 8.4,   # per 1000 people
-        "migration_rate": 3.0  # net migration per 1000 people
-    },
-    "China": {
-        "years": np.array([1800, 1850, 1900, 1950, 2000, 2023]),
-        "population": np.array([381.0, 430.0, 400.0, 544.0, 1267.4, 1412.0]),  # in millions
-        "birth_rate": 10.5,  # per 1000 people
-        "death_rate": 7.3,   # per 1000 people
-        "migration_rate": -0.3  # net migration per 1000 people
-    },
-    "India": {
-        "years": np.array([1800, 1850, 1900, 1950, 2000, 2023]),
-        "population": np.array([169.0, 208.0, 238.0, 376.3, 1053.6, 1420.0]),  # in millions
-        "birth_rate": 17.4,  # per 1000 people
-        "death_rate": 7.3,   # per 1000 people
-        "migration_rate": -0.1  # net migration per 1000 people
-    }
-}
-
-# Logistic growth model function without migration
-def logistic_growth(t, P0, r, K):
-    """
-    Logistic growth model function without migration.
-    :param t: time (years)
-    :param P0: initial population (at t=0)
-    :param r: growth rate
-    :param K: carrying capacity (maximum population)
-    :return: population at time t
-    """
-    return K / (1 + ((K - P0) / P0) * np.exp(-r * t))
+from logistic_fit import SCENARIOS, logistic_growth
+from instrumentation import ENCODE, FIGURE, FIT, SIMULATION, finish_page, instrumented_page, stage
+from population_data import historical_population_data
+from projection_cache import array_key, figure_to_png
+from resources import projection_artifact, projection_cache
 
 # Streamlit UI
-st.title("Refined Population Projection by Country with Different Scenarios")
-
-# Select country
-country = st.selectbox('Select a Country', list(historical_population_data.keys()))
-
-# Get historical data for the selected country
-data = historical_population_data[country]
-years = data['years']
-population = data['population']
-birth_rate = data['birth_rate']
-death_rate = data['death_rate']
-migration_rate = data['migration_rate']
-current_population = population[-1]
-
-# Define future scenarios
-scenarios = {
-    "High Growth": {"r": 0.02, "K": 1.2 * max(population)},  # Faster growth, higher carrying capacity
-    "Moderate Growth": {"r": 0.01, "K": max(population)},    # Moderate growth, current carrying capacity
-    "Low Growth": {"r": 0.005, "K": 0.8 * max(population)},  # Slower growth, reduced carrying capacity
-}
-
-# User selects growth scenario
-scenario = st.selectbox("Select a Future Growth Scenario", list(scenarios.keys()))
-
-# Get scenario parameters
-growth_rate = scenarios[scenario]['r']
-carrying_capacity = scenarios[scenario]['K']
-
-# Define future years for projection
-years_future = np.arange(2023, 2101, 5)
-
-# Fit the logistic model to historical data to estimate the initial population (P0)
-popt, _ = curve_fit(
-    lambda t, P0: logistic_growth(t, P0, growth_rate, carrying_capacity), 
-    years - years[0], 
-    population, 
-    bounds=(0, [max(population)])
-)
-
-# Extract fitted initial population (P0)
-P0_fitted = popt[0]
-
-# Project the future population using the manually applied scenario parameters
-future_population = logistic_growth(years_future - years[0], P0_fitted, growth_rate, carrying_capacity)
-
-# Calculate percentage growth from the current population to the 2100 projection
-growth_percentage = ((future_population[-1] - current_population) / current_population) * 100
-
-# Plot the historical and projected population
-fig, ax = plt.subplots()
-ax.plot(years, population, 'o-', label='Historical Population', markersize=8, color='blue')  # Connect historical population with line
-ax.plot(np.append(years[-1], years_future), np.append(population[-1], future_population), '-', label=f'Projected Population ({scenario})', color='green')
-ax.set_xlabel('Year')
-ax.set_ylabel('Population (millions)')
-ax.set_title(f'Population Projection for {country} ({scenario})')
-ax.legend()
-
-# Streamlit output
-st.pyplot(fig)
-
-# Display projected population for 2100 with more information
-st.write(f"Current population of {country}: {current_population:.2f} million people.")
-st.write(f"Projected population of {country} in 2100 under {scenario} scenario: {future_population[-1]:.2f} million people.")
-st.write(f"Percentage change from 2023 to 2100: {growth_percentage:.2f}%.")
\ No newline at end of file
+with instrumented_page("refined_population_projection") as perf:
+    st.title("Refined Population Projection by Country with Different Scenarios")
+
+    # Select country
+    country = st.selectbox('Select a Country', list(historical_population_data.keys()))
+
+    # Get historical data for the selected country
+    data = historical_population_data[country]
+    years = data['years']
+    population = data['population']
+    birth_rate = data['birth_rate']
+    death_rate = data['death_rate']
+    migration_rate = data['migration_rate']
+    current_population = population[-1]
+
+    # Define future scenarios (shared with the projection service)
+    scenarios = {name: {"r": s["r"], "K": s["K_factor"] * max(population)} for name, s in SCENARIOS.items()}
+
+    # User selects growth scenario
+    scenario = st.selectbox("Select a Future Growth Scenario", list(scenarios.keys()))
+
+    # Get scenario parameters
+    growth_rate = scenarios[scenario]['r']
+    carrying_capacity = scenarios[scenario]['K']
+
+    # Define future years for projection
+    years_future = np.arange(2023, 2101, 5)
+
+    # Alternative model: age-structured cohort-component projection
+    model = st.radio("Projection Model", ["Logistic", "Cohort-Component"], horizontal=True)
+
+    if model == "Cohort-Component":
+        import matplotlib.pyplot as plt
+        from cohort_model import project_countries
+
+        # Every country and scenario is projected in one batched run, then reused for all selections
+        cohort_key = ("cohort", array_key(*[np.append(d["population"], [d["birth_rate"], d["death_rate"], d["migration_rate"]]) for d in historical_population_data.values()]))
+        with stage(SIMULATION):
+            cohort_countries, cohort_scenarios, cohort_years, cohort_totals = projection_cache().get_or_compute(
+                cohort_key, lambda: project_countries(historical_population_data, start_year=years[-1], end_year=2100)
+            )
+        cohort_population = cohort_totals[cohort_scenarios.index(scenario), cohort_countries.index(country)]
+        growth_percentage = ((cohort_population[-1] - current_population) / current_population) * 100
+
+        with stage(FIGURE):
+            fig, ax = plt.subplots()
+            ax.plot(years, population, 'o-', label='Historical Population', markersize=8, color='blue')
+            ax.plot(cohort_years, cohort_population, '-', label=f'Cohort-Component Projection ({scenario})', color='purple')
+            ax.set_xlabel('Year')
+            ax.set_ylabel('Population (millions)')
+            ax.set_title(f'Population Projection for {country} ({scenario})')
+            ax.legend()
+        with stage(ENCODE):
+            st.pyplot(fig)
+        plt.close(fig)
+
+        st.write(f"Current population of {country}: {current_population:.2f} million people.")
+        st.write(f"Projected population of {country} in 2100 under {scenario} scenario (cohort-component): {cohort_population[-1]:.2f} million people.")
+        st.write(f"Percentage change from {years[-1]} to 2100: {growth_percentage:.2f}%.")
+        finish_page(perf)
+        st.stop()
+
+    # Precomputed fits and projections, used while the country's data matches the artifact
+    artifact = projection_artifact()
+    artifact_row = artifact.row(country, years, population) if artifact else None
+
+    def project_and_render(country, scenario, years, population, growth_rate, carrying_capacity, artifact_row=None):
+        # Only cache misses fit and draw, so scipy and pyplot are imported on first use;
+        # artifact_row is the country's row in the artifact, or None to fit with curve_fit
+        import matplotlib.pyplot as plt
+
+        if artifact_row is not None:
+            # Read from the memory-mapped artifact: no fit, and scipy is never imported
+            P0_fitted = artifact.scenario_params(artifact_row, scenario)[0]
+            future_population = artifact.scenario_projection(artifact_row, scenario, years_future)
+        else:
+            from scipy.optimize import curve_fit
+
+            # Fit the logistic model to historical data to estimate the initial population (P0)
+            with stage(FIT):
+                popt, _ = curve_fit(
+                    lambda t, P0: logistic_growth(t, P0, growth_rate, carrying_capacity),
+                    years - years[0],
+                    population,
+                    bounds=(0, [max(population)])
+                )
+
+            # Extract fitted initial population (P0)
+            P0_fitted = popt[0]
+
+            # Project the future population using the manually applied scenario parameters
+            future_population = logistic_growth(years_future - years[0], P0_fitted, growth_rate, carrying_capacity)
+
+        # Plot the historical and projected population
+        with stage(FIGURE):
+            fig, ax = plt.subplots()
+            ax.plot(years, population, 'o-', label='Historical Population', markersize=8, color='blue')  # Connect historical population with line
+            ax.plot(np.append(years[-1], years_future), np.append(population[-1], future_population), '-', label=f'Projected Population ({scenario})', color='green')
+            ax.set_xlabel('Year')
+            ax.set_ylabel('Population (millions)')
+            ax.set_title(f'Population Projection for {country} ({scenario})')
+            ax.legend()
+        return {"P0": P0_fitted, "future_population": future_population, "figure_png": figure_to_png(fig)}
+
+    # Cache key: the country's data arrays plus the scenario's (r, K), and whether the artifact served the fit
+    key = ("refined", country, scenario, artifact_row is not None,
+           array_key(years, population, years_future, growth_rate, carrying_capacity))
+    projection = projection_cache().get_or_compute(
+        key, lambda: project_and_render(country, scenario, years, population, growth_rate, carrying_capacity, artifact_row)
+    )
+    future_population = projection["future_population"]
+
+    # Calculate percentage growth from the current population to the 2100 projection
+    growth_percentage = ((future_population[-1] - current_population) / current_population) * 100
+
+    # Streamlit output
+    st.image(projection["figure_png"])
+
+    # Optional stochastic mode: percentile bands over sampled r, K and vital rates
+    if st.checkbox("Show Uncertainty Bands (Monte Carlo)"):
+        from monte_carlo import projection_bands
+
+        n_draws = st.select_slider("Number of Draws", options=[10_000, 100_000, 1_000_000], value=100_000, format_func=lambda n: f"{n:,}")
+        seed = st.number_input("Random Seed", min_value=0, value=0, step=1)
+
+        def render_bands():
+            import matplotlib.pyplot as plt
+
+            with stage(SIMULATION):
+                low, median, high = projection_bands(
+                    years_future - years[0], projection["P0"], growth_rate, carrying_capacity,
+                    birth_rate, death_rate, migration_rate, years[-1] - years[0], n_draws=n_draws, seed=int(seed)
+                )
+            with stage(FIGURE):
+                fig, ax = plt.subplots()
+                ax.plot(years, population, 'o-', label='Historical Population', markersize=8, color='blue')
+                ax.fill_between(years_future, low, high, color='green', alpha=0.25, label='5%-95% Range')
+                ax.plot(years_future, median, '-', color='green', label=f'Median Projection ({scenario})')
+                ax.set_xlabel('Year')
+                ax.set_ylabel('Population (millions)')
+                ax.set_title(f'Projection Uncertainty for {country} ({scenario})')
+                ax.legend()
+            return {"bands": (low, median, high), "figure_png": figure_to_png(fig)}
+
+        bands = projection_cache().get_or_compute(key + ("bands", n_draws, int(seed)), render_bands)
+        low, median, high = bands["bands"]
+        st.image(bands["figure_png"])
+        st.write(f"2100 projection range (5%-95%): {low[-1]:.2f} to {high[-1]:.2f} million people (median {median[-1]:.2f}).")
+
+    # Scenario grid sweep across all countries, run on a process pool
+    with st.expander("Scenario Grid Sweep"):
+        from scenario_sweep import DEFAULT_CAPACITY_MULTIPLIERS, DEFAULT_RATES, plot_sweep_heatmap, run_sweep
+
+        grid_size = st.slider("Grid Size (growth rates x capacity multipliers)", min_value=10, max_value=50, value=20, step=5)
+        if st.button("Run Sweep"):
+            import matplotlib.pyplot as plt
+
+            rates = np.linspace(DEFAULT_RATES[0], DEFAULT_RATES[-1], grid_size)
+            multipliers = np.linspace(DEFAULT_CAPACITY_MULTIPLIERS[0], DEFAULT_CAPACITY_MULTIPLIERS[-1], grid_size)
+            progress_bar = st.progress(0.0)
+            with stage(SIMULATION):
+                countries, sweep = run_sweep(
+                    rates=rates, capacity_multipliers=multipliers,
+                    progress=lambda done, total: progress_bar.progress(done / total, text=f"{done}/{total} rows"),
+                )
+            with stage(FIGURE):
+                fig = plot_sweep_heatmap(sweep[countries.index(country)], country, rates, multipliers)
+            with stage(ENCODE):
+                st.pyplot(fig)
+            plt.close(fig)
+
+    # Display projected population for 2100 with more information
+    st.write(f"Current population of {country}: {current_population:.2f} million people.")
+    st.write(f"Projected population of {country} in 2100 under {scenario} scenario: {future_population[-1]:.2f} million people.")
+    st.write(f"Percentage change from 2023 to 2100: {growth_percentage:.2f}%.")
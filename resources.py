@@ -0,0 +1,104 @@
+import numpy as np
+import streamlit as st
+
+# -----------------------------------------------
+# Engines and datasets shared by every session of the server process
+# -----------------------------------------------
+# Heavy modules are imported inside the loaders, so a page pays for them only on first use.
+
+
+@st.cache_resource
+def projection_cache():
+    """
+    Size-bounded LRU cache of projection results and rendered figures; callers namespace their keys.
+    """
+    from projection_cache import LRUCache
+
+    return LRUCache()
+
+
+@st.cache_resource
+def live_timeline():
+    """
+    Cumulative-births timeline of the unedited live-counter table (read-only).
+    """
+    from population_engine import LIVE_PERIODS, births_timeline
+
+    years, births = births_timeline(LIVE_PERIODS)
+    years.flags.writeable = False
+    births.flags.writeable = False
+    return years, births
+
+
+@st.cache_resource
+def live_lod(end):
+    """
+    Level-of-detail pyramid of the unedited live-counter timeline, extended to end at the
+    current birth rate.
+    """
+    from lod import LODPyramid
+    from population_engine import BirthsIndex, extend_timeline
+
+    years, births = live_timeline()
+    return LODPyramid(*extend_timeline(years, births, BirthsIndex(), end))
+
+
+@st.cache_resource
+def country_period_table(crude_birth_rate):
+    """
+    Structured period table of every country for the multi-region births engine (read-only).
+    """
+    from population_data import store
+
+    table = store.period_table(crude_birth_rate)
+    table.flags.writeable = False
+    return table
+
+
+@st.cache_resource
+def projection_artifact():
+    """
+    Precomputed fits and projections, memory-mapped read-only (see projection_artifact.py),
+    or None when the artifact is missing or was built for other definitions.
+    """
+    from projection_artifact import ProjectionArtifact
+
+    return ProjectionArtifact.open()
+
+
+@st.cache_resource
+def growth_model_fits():
+    """
+    Every growth model fitted to every historical country, so picking a country or a model on
+    the projection page costs no fit. Fits come from the projection artifact; only countries
+    missing from it or with changed data are fitted, one batch per model.
+    :return: (countries, {model name: (params, residual sum of squares)})
+    """
+    from population_data import historical_population_data
+
+    countries = list(historical_population_data)
+    artifact = projection_artifact()
+    rows = [
+        artifact.row(c, historical_population_data[c]["years"], historical_population_data[c]["population"])
+        if artifact else None
+        for c in countries
+    ]
+    stale = [i for i, row in enumerate(rows) if row is None]
+    if not stale:
+        return countries, artifact.model_fits(rows)
+
+    from growth_models import fit_models
+
+    series = [
+        (historical_population_data[countries[i]]["years"] - historical_population_data[countries[i]]["years"][0],
+         np.asarray(historical_population_data[countries[i]]["population"], dtype=float))
+        for i in stale
+    ]
+    fits = fit_models(series)
+    if len(stale) == len(countries):
+        return countries, fits
+    merged = artifact.model_fits([0 if row is None else row for row in rows])
+    for name, (params, rss) in merged.items():
+        params[stale] = fits[name][0]
+        rss[stale] = fits[name][1]
+    return countries, merged
@@ -0,0 +1,154 @@
+import argparse
+import os
+from concurrent.futures import as_completed
+
+import numpy as np
+
+from logistic_fit import logistic_growth
+from population_data import historical_population_data
+from process_pool import ProcessPool
+
+# Default grid: growth rates x carrying-capacity multipliers of the historical maximum
+DEFAULT_RATES = np.linspace(0.001, 0.05, 50)
+DEFAULT_CAPACITY_MULTIPLIERS = np.linspace(0.5, 2.0, 50)
+TARGET_YEAR = 2100
+
+# Completed jobs between checkpoint writes
+CHECKPOINT_EVERY = 10
+
+
+def sweep_row(years, population, r, capacity_multipliers, target_year=TARGET_YEAR):
+    """
+    Fit P0 for one growth rate and every carrying-capacity multiplier, as in the refined
+    projection, and return the projected population in target_year for each multiplier
+    (NaN where the fit does not converge).
+    """
+    from scipy.optimize import curve_fit
+
+    t = years - years[0]
+    row = np.full(len(capacity_multipliers), np.nan)
+    for j, multiplier in enumerate(capacity_multipliers):
+        K = multiplier * max(population)
+        try:
+            popt, _ = curve_fit(lambda t, P0: logistic_growth(t, P0, r, K), t, population, bounds=(0, [max(population)]))
+        except RuntimeError:
+            # One cell without a fit leaves a gap in the heatmap instead of failing the whole sweep
+            continue
+        row[j] = logistic_growth(target_year - years[0], popt[0], r, K)
+    return row
+
+
+def _job(args):
+    # Process-pool entry point; returns the grid position with the row
+    country_index, rate_index, years, population, r, capacity_multipliers, target_year = args
+    return country_index, rate_index, sweep_row(years, population, r, capacity_multipliers, target_year)
+
+
+def _load_checkpoint(path, countries, rates, capacity_multipliers):
+    # Reuse a checkpoint only if it was written for the same grid
+    if not path or not os.path.exists(path):
+        return None
+    with np.load(path) as saved:
+        same_grid = (
+            list(saved["countries"]) == list(countries)
+            and np.array_equal(saved["rates"], rates)
+            and np.array_equal(saved["capacity_multipliers"], capacity_multipliers)
+        )
+        if not same_grid:
+            return None
+        return saved["result"].copy(), saved["done"].copy()
+
+
+def _save_checkpoint(path, countries, rates, capacity_multipliers, result, done):
+    # Write to a temporary file first so an interrupted save never corrupts the checkpoint
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, countries=np.array(countries), rates=rates,
+             capacity_multipliers=capacity_multipliers, result=result, done=done)
+    os.replace(tmp_path, path)
+
+
+def run_sweep(population_data=historical_population_data, countries=None, rates=DEFAULT_RATES,
+              capacity_multipliers=DEFAULT_CAPACITY_MULTIPLIERS, target_year=TARGET_YEAR,
+              max_workers=None, checkpoint=None, progress=None):
+    """
+    Evaluate the scenario grid for every country on a process pool.
+    One job is one (country, growth rate) row of the grid.
+    :param checkpoint: optional .npz path; finished rows are saved there and skipped on resume
+    :param progress: optional callable(done_jobs, total_jobs)
+    :return: (countries, array of shape (countries, rates, capacity multipliers) with target-year population)
+    """
+    countries = list(population_data) if countries is None else list(countries)
+    rates = np.asarray(rates, dtype=float)
+    capacity_multipliers = np.asarray(capacity_multipliers, dtype=float)
+
+    resumed = _load_checkpoint(checkpoint, countries, rates, capacity_multipliers)
+    if resumed is None:
+        result = np.full((len(countries), len(rates), len(capacity_multipliers)), np.nan)
+        done = np.zeros((len(countries), len(rates)), dtype=bool)
+    else:
+        result, done = resumed
+
+    jobs = [
+        (i, k, population_data[c]["years"], population_data[c]["population"], r, capacity_multipliers, target_year)
+        for i, c in enumerate(countries)
+        for k, r in enumerate(rates)
+        if not done[i, k]
+    ]
+    total = done.size
+    completed = int(done.sum())
+    if progress:
+        progress(completed, total)
+
+    with ProcessPool(max_workers=max_workers) as pool:
+        futures = [pool.submit(_job, job) for job in jobs]
+        for n, future in enumerate(as_completed(futures), start=1):
+            i, k, row = future.result()
+            result[i, k] = row
+            done[i, k] = True
+            completed += 1
+            if progress:
+                progress(completed, total)
+            if checkpoint and (n % CHECKPOINT_EVERY == 0 or n == len(futures)):
+                _save_checkpoint(checkpoint, countries, rates, capacity_multipliers, result, done)
+
+    return countries, result
+
+
+def plot_sweep_heatmap(result_for_country, country, rates=DEFAULT_RATES,
+                       capacity_multipliers=DEFAULT_CAPACITY_MULTIPLIERS, target_year=TARGET_YEAR):
+    """
+    Heatmap of the target-year population over the (growth rate, capacity multiplier) grid.
+    """
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots()
+    image = ax.imshow(
+        result_for_country, origin='lower', aspect='auto', cmap='viridis',
+        extent=[capacity_multipliers[0], capacity_multipliers[-1], rates[0], rates[-1]],
+    )
+    fig.colorbar(image, ax=ax, label=f'Population in {target_year} (millions)')
+    ax.set_xlabel('Carrying Capacity (x historical maximum)')
+    ax.set_ylabel('Growth Rate (r)')
+    ax.set_title(f'Scenario Grid for {country}')
+    return fig
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep growth-rate x carrying-capacity scenarios for every country.")
+    parser.add_argument("--rates", type=int, default=len(DEFAULT_RATES), help="number of growth rates in the grid")
+    parser.add_argument("--capacities", type=int, default=len(DEFAULT_CAPACITY_MULTIPLIERS), help="number of capacity multipliers")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    parser.add_argument("--checkpoint", default="scenario_sweep.npz", help="resumable checkpoint file")
+    args = parser.parse_args()
+
+    rates = np.linspace(DEFAULT_RATES[0], DEFAULT_RATES[-1], args.rates)
+    multipliers = np.linspace(DEFAULT_CAPACITY_MULTIPLIERS[0], DEFAULT_CAPACITY_MULTIPLIERS[-1], args.capacities)
+
+    def report(done, total):
+        print(f"\r{done}/{total} rows", end="", flush=True)
+
+    countries, result = run_sweep(rates=rates, capacity_multipliers=multipliers, max_workers=args.workers,
+                                  checkpoint=args.checkpoint, progress=report)
+    print()
+    for country, grid in zip(countries, result):
+        print(f"{country}: {np.nanmin(grid):.2f} - {np.nanmax(grid):.2f} million in {TARGET_YEAR}")
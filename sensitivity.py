@@ -0,0 +1,128 @@
+import numpy as np
+
+from population_engine import POPULATION_GROWTH_SHARE, geometric_births, global_periods
+
+# Relative perturbations used by the one-at-a-time analyses
+ELASTICITY_STEP = 0.01
+TORNADO_SWING = 0.2
+
+# Sobol sampling: multipliers drawn uniformly in [1 - spread, 1 + spread]
+DEFAULT_SAMPLES = 4096
+DEFAULT_SPREAD = 0.2
+
+PARAMETERS = ("population", "birth_rate")
+
+
+def _arrays(periods):
+    # (counts, population, birth rate per person) of global_periods style rows
+    counts = np.array([max(p["end"] - p["start"], 0) for p in periods], dtype=np.float64)
+    population = np.array([p["population"] for p in periods], dtype=np.float64)
+    birth_rate = np.array([p["birth_rate"] for p in periods], dtype=np.float64) / 1000
+    return counts, population, birth_rate
+
+
+def variant_totals(periods, population_factor, birth_rate_factor):
+    """
+    Total born for many perturbed variants at once with the closed-form per-period sums.
+    :param periods: global_periods style rows
+    :param population_factor: multipliers of shape (variants, periods)
+    :param birth_rate_factor: multipliers of shape (variants, periods)
+    :return: totals of shape (variants,)
+    """
+    counts, population, birth_rate = _arrays(periods)
+    rate = birth_rate * birth_rate_factor
+    growth = 1 + POPULATION_GROWTH_SHARE * rate
+    return geometric_births(population * population_factor, rate, growth, counts).sum(axis=1)
+
+
+def parameter_labels(periods):
+    # One label per column of the (population, birth_rate) parameter vector
+    return [f"{p['start']}-{p['end']} {name}" for name in PARAMETERS for p in periods]
+
+
+def _factors(periods, multipliers):
+    # Split (variants, 2 * periods) multipliers into population and birth-rate factors
+    n = len(periods)
+    return multipliers[:, :n], multipliers[:, n:]
+
+
+def _one_at_a_time(periods, step):
+    # Variants with each parameter at 1 - step and 1 + step: rows 2i and 2i + 1
+    k = 2 * len(periods)
+    multipliers = np.ones((2 * k, k))
+    multipliers[np.arange(0, 2 * k, 2), np.arange(k)] = 1 - step
+    multipliers[np.arange(1, 2 * k, 2), np.arange(k)] = 1 + step
+    totals = variant_totals(periods, *_factors(periods, multipliers))
+    return totals[0::2], totals[1::2]
+
+
+def elasticities(periods=None, step=ELASTICITY_STEP):
+    """
+    Elasticity of the total with respect to every period's population and birth rate
+    (percent change of the total per percent change of the parameter), by central differences.
+    :return: (labels, elasticities) with population parameters first
+    """
+    periods = global_periods() if periods is None else periods
+    base = variant_totals(periods, np.ones((1, len(periods))), np.ones((1, len(periods))))[0]
+    low, high = _one_at_a_time(periods, step)
+    return parameter_labels(periods), (high - low) / (2 * step * base)
+
+
+def tornado(periods=None, swing=TORNADO_SWING):
+    """
+    Total born with each parameter moved down and up by swing, all others at their base value.
+    :return: (labels, base total, low totals, high totals), sorted by decreasing range
+    """
+    periods = global_periods() if periods is None else periods
+    base = variant_totals(periods, np.ones((1, len(periods))), np.ones((1, len(periods))))[0]
+    low, high = _one_at_a_time(periods, swing)
+    order = np.argsort(-np.abs(high - low), kind="stable")
+    labels = parameter_labels(periods)
+    return [labels[i] for i in order], base, low[order], high[order]
+
+
+def sobol_indices(periods=None, n_samples=DEFAULT_SAMPLES, spread=DEFAULT_SPREAD, seed=0):
+    """
+    First-order and total Sobol indices of every parameter with the Saltelli sampling scheme
+    and the Jansen estimators. All n_samples * (k + 2) model runs are one batched evaluation.
+    :return: (labels, first-order indices, total indices)
+    """
+    periods = global_periods() if periods is None else periods
+    k = 2 * len(periods)
+    rng = np.random.default_rng(seed)
+    A = rng.uniform(1 - spread, 1 + spread, (n_samples, k))
+    B = rng.uniform(1 - spread, 1 + spread, (n_samples, k))
+    # AB[i] is A with column i taken from B
+    AB = np.repeat(A[None], k, axis=0)
+    AB[np.arange(k), :, np.arange(k)] = B.T
+    multipliers = np.concatenate([A, B, AB.reshape(-1, k)])
+    totals = variant_totals(periods, *_factors(periods, multipliers))
+
+    f_A, f_B = totals[:n_samples], totals[n_samples:2 * n_samples]
+    f_AB = totals[2 * n_samples:].reshape(k, n_samples)
+    variance = np.var(np.concatenate([f_A, f_B]))
+    if variance == 0:
+        return parameter_labels(periods), np.zeros(k), np.zeros(k)
+    first = np.mean(f_B * (f_AB - f_A), axis=1) / variance
+    total = 0.5 * np.mean((f_A - f_AB) ** 2, axis=1) / variance
+    return parameter_labels(periods), first, total
+
+
+def plot_tornado(labels, base, low, high, top=10):
+    """
+    Horizontal bars of the top parameters' swings around the base total.
+    """
+    import matplotlib.pyplot as plt
+
+    labels, low, high = labels[:top][::-1], low[:top][::-1], high[:top][::-1]
+    fig, ax = plt.subplots()
+    y = np.arange(len(labels))
+    ax.barh(y, low - base, left=base, color="tab:blue", label="Parameter decreased")
+    ax.barh(y, high - base, left=base, color="tab:orange", label="Parameter increased")
+    ax.axvline(base, color="black", linewidth=1)
+    ax.set_yticks(y)
+    ax.set_yticklabels(labels)
+    ax.set_xlabel("Total People Ever Lived")
+    ax.set_title("Sensitivity of the Total to Each Period's Assumptions")
+    ax.legend()
+    return fig
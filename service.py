@@ -0,0 +1,279 @@
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from logistic_fit import FITTED, SCENARIOS, project_series
+from population_engine import BirthsIndex
+from projection_cache import LRUCache
+
+DEFAULT_PORT = 8765
+
+# Projection results kept in memory, one entry per (country, scenario, start, end)
+CACHE_ENTRIES = 4096
+
+# How long the batcher waits for more requests after the first one, and the largest batch it forms
+BATCH_WINDOW = 0.002
+MAX_BATCH = 1024
+
+# Request limits: values per births series, projected years per request and POST body size
+MAX_BIRTHS_POINTS = 100_000
+MAX_PROJECTION_YEARS = 1000
+MAX_BODY_BYTES = 1_000_000
+
+
+def compute_projections(population_data, countries, scenario, years):
+    """
+    Project several countries under one scenario with a single batched fit and evaluation.
+    :return: array (countries, years) of projected population in millions
+    """
+    series = [
+        (population_data[c]["years"] - population_data[c]["years"][0], np.asarray(population_data[c]["population"], dtype=float))
+        for c in countries
+    ]
+    origin = np.array([population_data[c]["years"][0] for c in countries])[:, None]
+    return project_series(series, scenario, years[None, :] - origin)
+
+
+class ProjectionService:
+    """
+    Projection results with an LRU cache, coalescing of identical in-flight requests and a
+    micro-batcher that fits all pending countries of the same scenario and years together.
+    """
+
+    def __init__(self, population_data, cache_entries=CACHE_ENTRIES, window=BATCH_WINDOW, max_batch=MAX_BATCH):
+        self.population_data = population_data
+        self.cache = LRUCache(cache_entries)
+        self.window = window
+        self.max_batch = max_batch
+        self.births_index = BirthsIndex()
+        self.batches = 0
+        self.coalesced = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        threading.Thread(target=self._batch_loop, daemon=True).start()
+
+    def validate(self, countries, scenario, start, end):
+        if not isinstance(countries, list) or not all(isinstance(c, str) for c in countries):
+            raise ValueError("countries must be a list of country names")
+        unknown = [c for c in countries if c not in self.population_data]
+        if unknown:
+            raise ValueError(f"Unknown countries: {', '.join(unknown)}")
+        if scenario != FITTED and scenario not in SCENARIOS:
+            raise ValueError(f"Unknown scenario: {scenario!r} (choose from {', '.join([*SCENARIOS, FITTED])})")
+        if not start <= end:
+            raise ValueError("start must not be after end")
+        if end - start + 1 > MAX_PROJECTION_YEARS:
+            raise ValueError(f"At most {MAX_PROJECTION_YEARS} projected years per request")
+
+    def projections(self, countries, scenario, start, end):
+        """
+        Projected population of every country from start to end (inclusive, yearly).
+        :return: {country: list of values}
+        """
+        self.validate(countries, scenario, start, end)
+        pending = {}
+        for country in dict.fromkeys(countries):
+            key = (country, scenario, start, end)
+            cached = self.cache.get(key)
+            if cached is not None:
+                pending[country] = cached
+                continue
+            with self._lock:
+                # A batch may have finished the key since the check above; it caches before releasing the key
+                if key in self.cache:
+                    cached = self.cache.get(key)
+                    if cached is not None:
+                        pending[country] = cached
+                        continue
+                future = self._inflight.get(key)
+                if future is None:
+                    future = self._inflight[key] = Future()
+                    self._queue.put(key)
+                else:
+                    self.coalesced += 1
+            pending[country] = future
+        return {c: v.result() if isinstance(v, Future) else v for c, v in pending.items()}
+
+    def births(self, start, end, step=1):
+        """
+        Total ever born by the end of each year, from the live-counter period table.
+        """
+        if step <= 0:
+            raise ValueError("step must be positive")
+        if not start <= end:
+            raise ValueError("start must not be after end")
+        if (end - start) // step + 1 > MAX_BIRTHS_POINTS:
+            raise ValueError(f"At most {MAX_BIRTHS_POINTS} years per request; use a larger step")
+        years = np.arange(start, end + 1, step)
+        return years, self.births_index.births_as_of(years + 1.0)
+
+    def _batch_loop(self):
+        while True:
+            keys = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(keys) < self.max_batch:
+                try:
+                    keys.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+            groups = {}
+            for key in keys:
+                groups.setdefault(key[1:], []).append(key[0])
+            for (scenario, start, end), countries in groups.items():
+                self._run_batch(countries, scenario, start, end)
+
+    def _run_batch(self, countries, scenario, start, end):
+        self.batches += 1
+        years = np.arange(start, end + 1)
+        try:
+            outcomes = [(values, None) for values in compute_projections(self.population_data, countries, scenario, years).tolist()]
+        except Exception as error:
+            if len(countries) == 1:
+                outcomes = [(None, error)]
+            else:
+                # Refit one country at a time so only the requests for the failing country get the error
+                outcomes = [self._run_one(country, scenario, years) for country in countries]
+        for country, (values, error) in zip(countries, outcomes):
+            key = (country, scenario, start, end)
+            with self._lock:
+                if error is None:
+                    self.cache.put(key, values)
+                future = self._inflight.pop(key)
+            if error is None:
+                future.set_result(values)
+            else:
+                future.set_exception(error)
+
+    def _run_one(self, country, scenario, years):
+        try:
+            return compute_projections(self.population_data, [country], scenario, years)[0].tolist(), None
+        except Exception as error:
+            return None, error
+
+    def stats(self):
+        return {
+            "cache_entries": len(self.cache),
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+            "batches": self.batches,
+            "coalesced": self.coalesced,
+        }
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        # Keep-alive lets clients reuse one connection for many requests
+        protocol_version = "HTTP/1.1"
+        # Headers and body are separate writes; without TCP_NODELAY each response waits for a delayed ACK
+        disable_nagle_algorithm = True
+
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _respond(self, produce):
+            # Bad input becomes a 400 and anything unexpected a 500, so no request drops the connection
+            try:
+                status, payload = produce()
+            except (KeyError, ValueError, TypeError) as error:
+                status, payload = 400, {"error": str(error)}
+            except Exception as error:
+                status, payload = 500, {"error": f"Internal error ({type(error).__name__})"}
+            self._send(status, payload)
+
+        def _projection_response(self, countries, scenario, start, end):
+            values = service.projections(countries, scenario, start, end)
+            return 200, {"scenario": scenario, "years": list(range(start, end + 1)), "projections": values}
+
+        def _get(self):
+            url = urlparse(self.path)
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            if url.path == "/births":
+                years, births = service.births(int(query.get("start", 1)), int(query.get("end", 2024)), int(query.get("step", 1)))
+                return 200, {"years": years.tolist(), "births": births.tolist()}
+            if url.path == "/projection":
+                countries = query["country"].split(",")
+                return self._projection_response(
+                    countries, query.get("scenario", "Moderate Growth"), int(query.get("start", 2023)), int(query.get("end", 2100))
+                )
+            if url.path == "/countries":
+                return 200, {"countries": list(service.population_data), "scenarios": [*SCENARIOS, FITTED]}
+            if url.path == "/stats":
+                return 200, service.stats()
+            return 404, {"error": f"Unknown path: {url.path}"}
+
+        def _post(self):
+            # {"countries": [...], "scenario": ..., "start": ..., "end": ...}; all countries by default
+            if urlparse(self.path).path != "/projections":
+                return 404, {"error": f"Unknown path: {self.path}"}
+            # Whenever the body is not read, the connection cannot be reused
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+            except ValueError:
+                self.close_connection = True
+                return 400, {"error": "Content-Length must be an integer"}
+            if length < 0:
+                # rfile.read(-1) would wait for the client to close the connection
+                self.close_connection = True
+                return 400, {"error": "Content-Length must not be negative"}
+            if length > MAX_BODY_BYTES:
+                self.close_connection = True
+                return 413, {"error": f"Request body larger than {MAX_BODY_BYTES} bytes"}
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(request, dict):
+                raise ValueError("Request body must be a JSON object")
+            return self._projection_response(
+                request.get("countries") or list(service.population_data),
+                request.get("scenario", "Moderate Growth"), int(request.get("start", 2023)), int(request.get("end", 2100))
+            )
+
+        def do_GET(self):
+            self._respond(self._get)
+
+        def do_POST(self):
+            self._respond(self._post)
+
+        def log_message(self, format, *args):
+            # Per-request access logging would dominate at hundreds of requests per second
+            pass
+
+    return Handler
+
+
+def serve(host="127.0.0.1", port=DEFAULT_PORT, population_data=None):
+    if population_data is None:
+        from population_data import historical_population_data as population_data
+    server = ThreadingHTTPServer((host, port), make_handler(ProjectionService(population_data)))
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve births and projection series as JSON over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+    server = serve(args.host, args.port)
+    print(f"Serving on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
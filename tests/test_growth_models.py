@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from growth_models import (
+    DEFAULT_MODEL, GROWTH_MODELS, best_models, eligible, fit_models, information_criteria, select_models,
+)
+
+T = np.arange(0, 200, 10.0)
+
+# Parameters of a noiseless series generated by each model, inside every model's bounds
+TRUTH = {
+    "Logistic": [5, 0.03, 100],
+    "Gompertz": [5, 0.03, 100],
+    "Richards": [5, 0.03, 100, 2.0],
+    "Piecewise Logistic": [5, 0.04, 60, 0.02, 150, 100],
+}
+
+
+def generated(name, params):
+    return T, GROWTH_MODELS[name].predict(np.array([params]), T)[0]
+
+
+@pytest.mark.parametrize("name", list(TRUTH))
+def test_model_recovers_its_own_curve_and_is_selected(name):
+    names, fits, scores, best = select_models([generated(name, TRUTH[name])])
+    np.testing.assert_allclose(fits[name][0][0], TRUTH[name], rtol=1e-6)
+    assert fits[name][1][0] < 1e-12
+    assert best == [name]
+
+
+def test_exponential_is_fitted_but_never_selected():
+    names, fits, scores, best = select_models([generated("Exponential", [5, 0.01])])
+    np.testing.assert_allclose(fits["Exponential"][0][0], [5, 0.01], rtol=1e-6)
+    # Its score is the best, but an exponential has no ceiling to extrapolate towards
+    assert names[np.argmin(scores[0])] == "Exponential"
+    assert best[0] != "Exponential"
+    assert GROWTH_MODELS[best[0]].bounded
+
+
+def test_eligibility_needs_two_residual_degrees_of_freedom():
+    names = list(GROWTH_MODELS)
+    short, long = eligible(names, [6, 20])
+    assert dict(zip(names, short)) == {
+        "Logistic": True, "Exponential": False, "Gompertz": True, "Richards": True, "Piecewise Logistic": False,
+    }
+    assert dict(zip(names, long))["Piecewise Logistic"]
+
+
+def test_best_models_falls_back_to_the_default():
+    names = list(GROWTH_MODELS)
+    scores = np.full((2, len(names)), np.inf)
+    scores[1, names.index("Exponential")] = -100.0
+    scores[1, names.index("Gompertz")] = 3.0
+    assert best_models(names, scores, [6, 6]) == [DEFAULT_MODEL, "Gompertz"]
+
+
+def test_information_criteria_reject_saturated_fits():
+    scores = information_criteria([1.0, 1.0, 1.0, np.inf], [3, 4, 10, 10], 3)
+    assert np.isinf(scores["AIC"][0]) and np.isinf(scores["BIC"][0])
+    # AICc needs n - k - 1 > 0
+    assert np.isinf(scores["AICc"][1]) and np.isfinite(scores["AIC"][1])
+    assert all(np.isfinite(scores[c][2]) for c in scores)
+    assert all(np.isinf(scores[c][3]) for c in scores)
+
+
+def test_short_series_are_left_unfitted():
+    params, rss = GROWTH_MODELS["Piecewise Logistic"].fit([(T[:4], np.linspace(1, 4, 4))])
+    assert np.isnan(params).all() and np.isinf(rss).all()
+
+
+def test_concurrent_fits_match_inline_fits():
+    series = [generated(name, params) for name, params in TRUTH.items()]
+    inline = fit_models(series, max_workers=1)
+    threaded = fit_models(series, max_workers=4)
+    assert list(inline) == list(threaded) == list(GROWTH_MODELS)
+    for name in inline:
+        np.testing.assert_array_equal(inline[name][0], threaded[name][0])
+        np.testing.assert_array_equal(inline[name][1], threaded[name][1])
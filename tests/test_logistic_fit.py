@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from logistic_fit import (
+    FITTED, MAX_CAPACITY_FACTOR, MAX_GROWTH_RATE, SCENARIOS, fit_logistic, fit_logistic_batch, fit_scenario,
+    logistic_growth,
+)
+from population_data import historical_population_data
+
+scipy_optimize = pytest.importorskip("scipy.optimize")
+
+
+def country_series():
+    return [
+        (data["years"] - data["years"][0], np.asarray(data["population"], dtype=float))
+        for data in historical_population_data.values()
+    ]
+
+
+def rss(t, y, params):
+    return float(((logistic_growth(t, *params) - y) ** 2).sum())
+
+
+def test_batched_fit_matches_curve_fit():
+    # The pages used curve_fit with these bounds before the batched Levenberg-Marquardt replaced it
+    series = country_series()
+    params, residuals, _ = fit_logistic_batch(series)
+    for (t, y), fitted, residual in zip(series, params, residuals):
+        popt, _ = scipy_optimize.curve_fit(
+            logistic_growth, t, y, bounds=(0, [max(y), MAX_GROWTH_RATE, MAX_CAPACITY_FACTOR * max(y)])
+        )
+        assert residual == pytest.approx(rss(t, y, fitted), rel=1e-9)
+        assert residual <= rss(t, y, popt) * (1 + 1e-6)
+
+
+def test_fits_stay_within_bounds():
+    series = country_series()
+    params, _, _ = fit_logistic_batch(series)
+    peaks = np.array([y.max() for _, y in series])
+    assert (params > 0).all()
+    assert (params[:, 0] <= peaks).all()
+    assert (params[:, 1] <= MAX_GROWTH_RATE).all()
+    assert (params[:, 2] <= MAX_CAPACITY_FACTOR * peaks).all()
+
+
+def test_batch_does_not_depend_on_its_neighbours():
+    # Series of different lengths are padded into one batch; each must fit as if alone
+    series = country_series()
+    series[1] = (series[1][0][:4], series[1][1][:4])
+    batched, _, _ = fit_logistic_batch(series)
+    for (t, y), params in zip(series, batched):
+        np.testing.assert_allclose(fit_logistic_batch([(t, y)])[0][0], params, rtol=1e-6)
+
+
+def test_fit_logistic_is_one_row_of_the_batch():
+    data = next(iter(historical_population_data.values()))
+    params, _, _ = fit_logistic_batch([(data["years"] - data["years"][0], np.asarray(data["population"], dtype=float))])
+    np.testing.assert_array_equal(fit_logistic(data["years"], data["population"]), params[0])
+
+
+@pytest.mark.parametrize("scenario", list(SCENARIOS))
+def test_scenarios_fix_rate_and_capacity(scenario):
+    series = country_series()
+    params = fit_scenario(series, scenario)
+    np.testing.assert_allclose(params[:, 1], SCENARIOS[scenario]["r"])
+    np.testing.assert_allclose(params[:, 2], [SCENARIOS[scenario]["K_factor"] * y.max() for _, y in series])
+    for (t, y), (P0, r, K) in zip(series, params):
+        popt, _ = scipy_optimize.curve_fit(lambda t, P0: logistic_growth(t, P0, r, K), t, y, p0=[y[0]])
+        assert rss(t, y, (P0, r, K)) <= rss(t, y, (popt[0], r, K)) * (1 + 1e-6)
+
+
+def test_fitted_scenario_is_the_free_fit():
+    series = country_series()
+    np.testing.assert_array_equal(fit_scenario(series, FITTED), fit_logistic_batch(series)[0])
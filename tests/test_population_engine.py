@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from population_engine import GLOBAL_PERIODS, people_ever_lived_chunks, people_ever_lived_series
+
+
+def naive_people_ever_lived(periods):
+    # The year-by-year loop of the original app, which the closed form replaces
+    total = 0
+    years, totals = [], []
+    for i in range(len(periods) - 1):
+        population = periods[i]["population"]
+        birth_rate = periods[i]["birth_rate"]
+        for year in range(periods[i]["year"], periods[i + 1]["year"]):
+            births = population * birth_rate / 1000
+            population += births * 0.5
+            total += births
+            years.append(year)
+            totals.append(total / 1e9)
+    return total / 1e9, np.array(years), np.array(totals)
+
+
+SMALL_PERIODS = [
+    {"year": -500, "population": 1_000_000, "birth_rate": 40},
+    {"year": -100, "population": 3_000_000, "birth_rate": 35},
+    {"year": -100, "population": 5_000_000, "birth_rate": 30},  # empty period
+    {"year": 300, "population": 20_000_000, "birth_rate": 25},
+    {"year": 350, "population": 0, "birth_rate": 0},
+]
+
+
+@pytest.mark.parametrize("periods", [GLOBAL_PERIODS, SMALL_PERIODS])
+def test_closed_form_matches_yearly_loop(periods):
+    expected_total, expected_years, expected_series = naive_people_ever_lived(periods)
+    total, data = people_ever_lived_series(periods, resolution="yearly")
+    np.testing.assert_array_equal(data["years"], expected_years)
+    np.testing.assert_allclose(data["total_population"], expected_series, rtol=1e-9)
+    assert total == pytest.approx(expected_total, rel=1e-9)
+
+
+@pytest.mark.parametrize("resolution", ["decadal", 1000, 7])
+def test_resolutions_sample_the_yearly_series(resolution):
+    _, yearly = people_ever_lived_series(SMALL_PERIODS, resolution="yearly")
+    total, sampled = people_ever_lived_series(SMALL_PERIODS, resolution=resolution)
+    index = np.searchsorted(yearly["years"], sampled["years"])
+    np.testing.assert_array_equal(yearly["years"][index], sampled["years"])
+    np.testing.assert_allclose(sampled["total_population"], yearly["total_population"][index], rtol=1e-12)
+    # Every resolution ends on the final year, so its last point is the total
+    assert sampled["total_population"][-1] == pytest.approx(total)
+
+
+def test_unknown_resolution():
+    with pytest.raises(ValueError):
+        people_ever_lived_series(SMALL_PERIODS, resolution="hourly")
+
+
+def test_chunks_concatenate_to_the_yearly_series():
+    _, yearly = people_ever_lived_series(SMALL_PERIODS, resolution="yearly")
+    chunks = list(people_ever_lived_chunks(SMALL_PERIODS, chunk_years=128))
+    assert max(len(years) for years, _ in chunks) == 128
+    np.testing.assert_array_equal(np.concatenate([years for years, _ in chunks]), yearly["years"])
+    np.testing.assert_allclose(np.concatenate([total for _, total in chunks]), yearly["total_population"], rtol=1e-12)
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+import logistic_fit
+from growth_models import GROWTH_MODELS
+from logistic_fit import FITTED, SCENARIOS, logistic_growth
+from population_data import historical_population_data
+from projection_artifact import ProjectionArtifact, build_artifact
+
+YEARS = np.arange(2023, 2041)
+COUNTRIES = list(historical_population_data)[:3]
+
+
+@pytest.fixture
+def population_data():
+    return {c: {k: np.array(v) for k, v in historical_population_data[c].items()} for c in COUNTRIES}
+
+
+@pytest.fixture
+def artifact_path(tmp_path, population_data):
+    path = str(tmp_path / "projections.bin")
+    build_artifact(population_data, path=path, years=YEARS)
+    return path
+
+
+def test_round_trip(artifact_path, population_data):
+    artifact = ProjectionArtifact.open(artifact_path)
+    assert artifact is not None
+    np.testing.assert_array_equal(artifact.years, YEARS)
+    assert list(artifact.countries) == COUNTRIES
+    assert artifact.scenarios == [FITTED, *SCENARIOS]
+    assert artifact.models == list(GROWTH_MODELS)
+    for country, data in population_data.items():
+        row = artifact.row(country, data["years"], data["population"])
+        for scenario in artifact.scenarios:
+            P0, r, K = artifact.scenario_params(row, scenario)
+            expected = logistic_growth(YEARS[::5] - data["years"][0], P0, r, K)
+            np.testing.assert_allclose(artifact.scenario_projection(row, scenario, YEARS[::5]), expected, rtol=1e-12)
+        fits = artifact.model_fits([row])
+        assert {name: params.shape[1] for name, (params, _) in fits.items()} == {
+            name: model.n_params for name, model in GROWTH_MODELS.items()
+        }
+
+
+def test_fitted_scenario_matches_a_fresh_fit(artifact_path, population_data):
+    artifact = ProjectionArtifact.open(artifact_path)
+    data = population_data[COUNTRIES[0]]
+    row = artifact.row(COUNTRIES[0], data["years"], data["population"])
+    np.testing.assert_allclose(
+        artifact.scenario_params(row, FITTED), logistic_fit.fit_logistic(data["years"], data["population"]), rtol=1e-12
+    )
+
+
+def test_changed_series_is_stale(artifact_path, population_data):
+    artifact = ProjectionArtifact.open(artifact_path)
+    data = population_data[COUNTRIES[0]]
+    population = data["population"].astype(float)
+    population[-1] += 0.1
+    assert artifact.row(COUNTRIES[0], data["years"], population) is None
+    assert artifact.row("Atlantis", data["years"], data["population"]) is None
+
+
+def test_changed_definitions_make_the_artifact_stale(artifact_path, monkeypatch):
+    monkeypatch.setattr(logistic_fit, "LM_MAX_ITER", logistic_fit.LM_MAX_ITER + 1)
+    assert ProjectionArtifact.open(artifact_path) is None
+    monkeypatch.undo()
+    monkeypatch.setitem(SCENARIOS, "Moderate Growth", {"r": 0.011, "K_factor": 1.0})
+    assert ProjectionArtifact.open(artifact_path) is None
+
+
+def test_missing_or_foreign_file(tmp_path):
+    assert ProjectionArtifact.open(str(tmp_path / "missing.bin")) is None
+    foreign = tmp_path / "foreign.bin"
+    foreign.write_bytes(b"not an artifact at all")
+    assert ProjectionArtifact.open(str(foreign)) is None
+
+
+def test_years_outside_the_artifact(artifact_path):
+    artifact = ProjectionArtifact.open(artifact_path)
+    with pytest.raises(ValueError, match="2050"):
+        artifact.scenario_projection(0, FITTED, [2030, 2050])
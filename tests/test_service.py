@@ -0,0 +1,121 @@
+import http.client
+import json
+import threading
+
+import numpy as np
+import pytest
+
+import service
+from logistic_fit import FITTED
+from population_data import historical_population_data
+from service import MAX_BIRTHS_POINTS, MAX_BODY_BYTES, MAX_PROJECTION_YEARS, ProjectionService, compute_projections
+
+COUNTRY = next(iter(historical_population_data))
+
+
+@pytest.fixture(scope="module")
+def projection_service():
+    return ProjectionService(historical_population_data)
+
+
+@pytest.fixture(scope="module")
+def server(projection_service):
+    httpd = service.ThreadingHTTPServer(("127.0.0.1", 0), service.make_handler(projection_service))
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd.server_address
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def request(address, method, path, body=None, headers=None):
+    connection = http.client.HTTPConnection(*address, timeout=10)
+    try:
+        connection.request(method, path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+@pytest.mark.parametrize("countries, scenario, start, end, message", [
+    ("Brazil", FITTED, 2023, 2030, "list of country names"),
+    ([COUNTRY, 1], FITTED, 2023, 2030, "list of country names"),
+    (["Atlantis"], FITTED, 2023, 2030, "Unknown countries: Atlantis"),
+    ([COUNTRY], "Runaway Growth", 2023, 2030, "Unknown scenario"),
+    ([COUNTRY], FITTED, 2030, 2023, "start must not be after end"),
+    ([COUNTRY], FITTED, 2023, 2023 + MAX_PROJECTION_YEARS, f"At most {MAX_PROJECTION_YEARS}"),
+])
+def test_projection_requests_are_validated(projection_service, countries, scenario, start, end, message):
+    with pytest.raises(ValueError, match=message):
+        projection_service.projections(countries, scenario, start, end)
+
+
+@pytest.mark.parametrize("start, end, step, message", [
+    (1, 10, 0, "step must be positive"),
+    (10, 1, 1, "start must not be after end"),
+    (0, MAX_BIRTHS_POINTS, 1, f"At most {MAX_BIRTHS_POINTS}"),
+])
+def test_births_requests_are_validated(projection_service, start, end, step, message):
+    with pytest.raises(ValueError, match=message):
+        projection_service.births(start, end, step)
+
+
+def test_projections_match_a_direct_computation(projection_service):
+    countries = list(historical_population_data)[:3]
+    result = projection_service.projections(countries, FITTED, 2023, 2030)
+    expected = compute_projections(historical_population_data, countries, FITTED, np.arange(2023, 2031))
+    for country, values in zip(countries, expected):
+        np.testing.assert_allclose(result[country], values, rtol=1e-9)
+
+
+def test_a_failing_country_does_not_fail_its_batch(monkeypatch):
+    def compute(population_data, countries, scenario, years):
+        if "Broken" in countries:
+            raise FloatingPointError("no fit")
+        return compute_projections(population_data, countries, scenario, years)
+
+    monkeypatch.setattr(service, "compute_projections", compute)
+    data = dict(historical_population_data, Broken=historical_population_data[COUNTRY])
+    # A long window puts both requests in one batch
+    projections = ProjectionService(data, window=0.2)
+    results = {}
+
+    def run(country):
+        try:
+            results[country] = projections.projections([country], FITTED, 2023, 2030)[country]
+        except FloatingPointError as error:
+            results[country] = error
+
+    threads = [threading.Thread(target=run, args=(country,)) for country in (COUNTRY, "Broken")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results[COUNTRY]) == 8
+    assert isinstance(results["Broken"], FloatingPointError)
+
+
+@pytest.mark.parametrize("headers, body, status", [
+    ({"Content-Length": "abc"}, None, 400),
+    ({"Content-Length": "-1"}, None, 400),
+    ({"Content-Length": str(MAX_BODY_BYTES + 1)}, None, 413),
+    (None, b"[1, 2]", 400),
+    (None, b"{not json", 400),
+    (None, json.dumps({"countries": ["Atlantis"]}).encode(), 400),
+    (None, json.dumps({"countries": [COUNTRY], "start": 2023, "end": 2025}).encode(), 200),
+])
+def test_post_bodies(server, headers, body, status):
+    code, payload = request(server, "POST", "/projections", body=body, headers=headers)
+    assert code == status
+    if status == 200:
+        assert payload["years"] == [2023, 2024, 2025]
+        assert len(payload["projections"][COUNTRY]) == 3
+    else:
+        assert payload["error"]
+
+
+def test_get_errors(server):
+    assert request(server, "GET", "/births?step=0")[0] == 400
+    assert request(server, "GET", "/projection?scenario=Fitted")[0] == 400
+    assert request(server, "GET", "/nowhere")[0] == 404